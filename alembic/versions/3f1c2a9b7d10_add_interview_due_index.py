@@ -0,0 +1,28 @@
+"""Add composite (status, reservation_time) index for scheduler due-check
+
+Revision ID: 3f1c2a9b7d10
+Revises: 6ebdeed2a97a
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '3f1c2a9b7d10'
+down_revision: Union[str, Sequence[str], None] = '6ebdeed2a97a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_interviews_status_reservation_time', 'interviews', ['status', 'reservation_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_interviews_status_reservation_time', table_name='interviews')
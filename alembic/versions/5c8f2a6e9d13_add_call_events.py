@@ -0,0 +1,39 @@
+"""Add call_events table
+
+Revision ID: 5c8f2a6e9d13
+Revises: 9b3e7d5a1c48
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '5c8f2a6e9d13'
+down_revision: Union[str, Sequence[str], None] = '9b3e7d5a1c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('call_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('interview_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('call_sid', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('detail', sa.JSON(), nullable=True),
+    sa.Column('at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['interview_id'], ['interviews.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_call_events_interview_id_at', 'call_events', ['interview_id', 'at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_call_events_interview_id_at', table_name='call_events')
+    op.drop_table('call_events')
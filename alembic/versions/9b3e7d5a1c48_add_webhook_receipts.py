@@ -0,0 +1,39 @@
+"""Add webhook_receipts table
+
+Revision ID: 9b3e7d5a1c48
+Revises: 4d6a1f9c2e75
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '9b3e7d5a1c48'
+down_revision: Union[str, Sequence[str], None] = '4d6a1f9c2e75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('webhook_receipts',
+    sa.Column('call_sid', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('step', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('recording_sid', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('interview_id', sa.Integer(), nullable=False),
+    sa.Column('response', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['interview_id'], ['interviews.id'], ),
+    sa.PrimaryKeyConstraint('call_sid', 'step', 'recording_sid')
+    )
+    op.create_index(op.f('ix_webhook_receipts_interview_id'), 'webhook_receipts', ['interview_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_webhook_receipts_interview_id'), table_name='webhook_receipts')
+    op.drop_table('webhook_receipts')
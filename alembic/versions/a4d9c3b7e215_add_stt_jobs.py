@@ -0,0 +1,51 @@
+"""Add stt_jobs table
+
+Revision ID: a4d9c3b7e215
+Revises: 5c8f2a6e9d13
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = 'a4d9c3b7e215'
+down_revision: Union[str, Sequence[str], None] = '5c8f2a6e9d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stt_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('review_id', sa.Integer(), nullable=False),
+    sa.Column('interview_id', sa.Integer(), nullable=False),
+    sa.Column('recording_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('audio', sa.LargeBinary(), nullable=True),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('worker', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['interview_id'], ['interviews.id'], ),
+    sa.ForeignKeyConstraint(['review_id'], ['interview_reviews.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stt_jobs_status_run_at', 'stt_jobs', ['status', 'run_at'], unique=False)
+    op.create_index(op.f('ix_stt_jobs_interview_id'), 'stt_jobs', ['interview_id'], unique=False)
+    op.create_index(op.f('ix_stt_jobs_review_id'), 'stt_jobs', ['review_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stt_jobs_review_id'), table_name='stt_jobs')
+    op.drop_index(op.f('ix_stt_jobs_interview_id'), table_name='stt_jobs')
+    op.drop_index('ix_stt_jobs_status_run_at', table_name='stt_jobs')
+    op.drop_table('stt_jobs')
@@ -0,0 +1,34 @@
+"""Add indexes used by chunked retention cleanup
+
+Revision ID: c7d91e3a5f02
+Revises: 8a4e6c2d1b57
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = 'c7d91e3a5f02'
+down_revision: Union[str, Sequence[str], None] = '8a4e6c2d1b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_interviews_created_at'), 'interviews', ['created_at'], unique=False)
+    op.create_index(op.f('ix_interviews_candidate_id'), 'interviews', ['candidate_id'], unique=False)
+    op.create_index(op.f('ix_interview_reviews_interview_id'), 'interview_reviews', ['interview_id'], unique=False)
+    op.create_index(op.f('ix_communication_logs_candidate_id'), 'communication_logs', ['candidate_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_communication_logs_candidate_id'), table_name='communication_logs')
+    op.drop_index(op.f('ix_interview_reviews_interview_id'), table_name='interview_reviews')
+    op.drop_index(op.f('ix_interviews_candidate_id'), table_name='interviews')
+    op.drop_index(op.f('ix_interviews_created_at'), table_name='interviews')
@@ -0,0 +1,35 @@
+"""Add booking_slots capacity table and interviews.slot_time
+
+Revision ID: e2b5f8a40c13
+Revises: c7d91e3a5f02
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = 'e2b5f8a40c13'
+down_revision: Union[str, Sequence[str], None] = 'c7d91e3a5f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('booking_slots',
+    sa.Column('slot_time', sa.DateTime(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('booked', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('slot_time')
+    )
+    op.add_column('interviews', sa.Column('slot_time', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('interviews', 'slot_time')
+    op.drop_table('booking_slots')
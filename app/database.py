@@ -1,4 +1,7 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 import os
 from dotenv import load_dotenv
 
@@ -23,9 +26,34 @@ else:
 
 engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
 
+def _async_database_url(url: str):
+    """Same database through an async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    url = make_url(url.replace("postgres://", "postgresql://", 1))
+    async_connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes ssl as a connect arg instead of libpq's sslmode
+        sslmode = url.query.get("sslmode")
+        if sslmode:
+            url = url.difference_update_query(["sslmode"])
+            async_connect_args["ssl"] = sslmode not in ("disable", "allow", "prefer")
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+        async_connect_args = {"check_same_thread": False}
+    return url, async_connect_args
+
+ASYNC_DATABASE_URL, async_connect_args = _async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, connect_args=async_connect_args)
+
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    # expire_on_commit=False: handlers read attributes after commit, which
+    # would otherwise trigger an implicit (sync) refresh
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
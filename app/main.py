@@ -2,7 +2,10 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from app.database import create_db_and_tables
 from app.routers import admin, candidate, voice, admin_view
-from app.services.scheduler import start_scheduler
+from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.call_state import call_state
+from app.services.call_events import call_events
+from app.services.stt_queue import stt_workers, STT_WORKER_IN_WEB
 import os
 
 app = FastAPI(title="AI Interview System (Logic C)")
@@ -17,8 +20,22 @@ app.include_router(voice.router)
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    call_state.start()
+    call_events.start()
+    if STT_WORKER_IN_WEB != "off":
+        stt_workers.start()
     start_scheduler()
 
+@app.on_event("shutdown")
+def on_shutdown():
+    # Hand the scheduler lease to another worker right away
+    stop_scheduler()
+    # Write out call state still waiting for the next batch
+    call_state.stop()
+    call_events.stop()
+    # Let transcriptions in progress finish; anything cut off is retaken after its lease
+    stt_workers.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "AI Interview System (Logic C) is running"}
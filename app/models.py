@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from sqlmodel import Field, SQLModel, Relationship, JSON
-from sqlalchemy import Column
+from sqlalchemy import Column, Index, LargeBinary
 import uuid
 
 # Models
@@ -43,15 +43,20 @@ class Candidate(SQLModel, table=True):
 
 class Interview(SQLModel, table=True):
     __tablename__ = "interviews"
+    __table_args__ = (
+        # Scheduler due-check: WHERE status = 'scheduled' AND reservation_time <= now
+        Index("ix_interviews_status_reservation_time", "status", "reservation_time"),
+    )
     id: int = Field(default=None, primary_key=True)
-    candidate_id: int = Field(foreign_key="candidates.id")
+    candidate_id: int = Field(foreign_key="candidates.id", index=True)
     reservation_time: datetime
     status: str = Field(default="scheduled") # scheduled, in_progress, completed, failed, interrupted
     session_snapshot: List[dict] = Field(sa_column=Column(JSON)) # snapshot of questions at start
     resume_count: int = Field(default=0)
     retry_count: int = Field(default=0)
     last_completed_q_id: Optional[int] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    slot_time: Optional[datetime] = None # booking slot this interview holds capacity in
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True) # retention cleanup
     
     # New fields for Logic C Flow
     current_stage: str = Field(default="scheduled") # scheduled, greeting, main_qa, reverse_qa, ending
@@ -63,12 +68,17 @@ class Interview(SQLModel, table=True):
 class InterviewReview(SQLModel, table=True):
     __tablename__ = "interview_reviews"
     id: int = Field(default=None, primary_key=True)
-    interview_id: int = Field(foreign_key="interviews.id")
+    interview_id: int = Field(foreign_key="interviews.id", index=True)
     question_id: int # ID from Snapshot (not FK to question table to preserve history)
     question_text: str # Text from snapshot
     recording_url: Optional[str] = None
     transcript: Optional[str] = None
+    # Long recordings are transcribed in pieces: [{"start": sec, "end": sec, "text": ...}] for seeking in the recording
+    transcript_segments: Optional[List[dict]] = Field(sa_column=Column(JSON), default=None)
     duration: Optional[int] = None
+    # Set by the STT preprocessing: share of the recording that was speech, silence cut before upload
+    speech_ratio: Optional[float] = None
+    trimmed_seconds: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     interview: Interview = Relationship(back_populates="reviews")
@@ -76,7 +86,7 @@ class InterviewReview(SQLModel, table=True):
 class CommunicationLog(SQLModel, table=True):
     __tablename__ = "communication_logs"
     id: int = Field(default=None, primary_key=True)
-    candidate_id: Optional[int] = Field(foreign_key="candidates.id", default=None)
+    candidate_id: Optional[int] = Field(foreign_key="candidates.id", default=None, index=True)
     type: str # sms, email
     direction: str # outbound, inbound
     status: str # sent, delivered, failed, received
@@ -91,3 +101,67 @@ class Setting(SQLModel, table=True):
     key: str = Field(primary_key=True)
     value: str
     description: Optional[str] = None
+
+class SchedulerLease(SQLModel, table=True):
+    __tablename__ = "scheduler_leases"
+    name: str = Field(primary_key=True) # ex: "scheduler"
+    holder: str # host:pid:nonce of the current leader
+    expires_at: datetime
+    heartbeat_at: datetime = Field(default_factory=datetime.utcnow)
+
+class BookingSlot(SQLModel, table=True):
+    __tablename__ = "booking_slots"
+    slot_time: datetime = Field(primary_key=True) # start of the slot
+    capacity: int # max interviews in this slot
+    booked: int = Field(default=0) # maintained on book/cancel
+
+class LLMCacheEntry(SQLModel, table=True):
+    __tablename__ = "llm_cache"
+    key: str = Field(primary_key=True) # sha256 of operation + model + normalized input
+    operation: str # ex: "extract_topic", "transcribe"
+    value: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class WebhookReceipt(SQLModel, table=True):
+    __tablename__ = "webhook_receipts"
+    # Primary key = unique constraint: one receipt per Twilio delivery, however often it is retried
+    call_sid: str = Field(primary_key=True)
+    step: str = Field(primary_key=True) # ex: "record:2", "reverse_qa:1"
+    recording_sid: str = Field(default="", primary_key=True)
+    interview_id: int = Field(foreign_key="interviews.id", index=True)
+    response: str # TwiML returned the first time, replayed to retries
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CallEvent(SQLModel, table=True):
+    __tablename__ = "call_events"
+    __table_args__ = (
+        # Timeline: WHERE interview_id = ? ORDER BY at
+        Index("ix_call_events_interview_id_at", "interview_id", "at"),
+    )
+    id: int = Field(default=None, primary_key=True)
+    interview_id: int = Field(foreign_key="interviews.id")
+    kind: str # webhook_received, twiml_returned, status_callback, recording_ready, stage, stream
+    call_sid: Optional[str] = None
+    detail: dict = Field(sa_column=Column(JSON), default={})
+    at: datetime = Field(default_factory=datetime.utcnow) # when it happened, not when it was flushed
+
+class SttJob(SQLModel, table=True):
+    __tablename__ = "stt_jobs"
+    __table_args__ = (
+        # Claim: WHERE status IN ('queued', 'running') AND run_at <= now ORDER BY run_at
+        Index("ix_stt_jobs_status_run_at", "status", "run_at"),
+    )
+    id: int = Field(default=None, primary_key=True)
+    review_id: int = Field(foreign_key="interview_reviews.id", index=True)
+    interview_id: int = Field(foreign_key="interviews.id", index=True) # retention cleanup
+    recording_url: Optional[str] = None # record mode: Twilio recording to download
+    audio: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary)) # stream mode: 8 kHz μ-law, cleared once done
+    status: str = Field(default="queued") # queued, running, done, dead
+    attempts: int = Field(default=0)
+    # queued: not before this time (backoff). running: lease expiry, after which another worker may take it
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    worker: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
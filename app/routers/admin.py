@@ -2,7 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlmodel import Session, select
 from app.database import get_session
-from app.models import Candidate, QuestionSet, Question, Interview
+from app.models import Candidate, QuestionSet, Question, Interview, BookingSlot
+from app.services.scheduler import dialer
+from app.services.slots import set_slot_capacity
+from app.services.call_state import call_state
+from app.services.call_events import call_events
+from app.services.stt_queue import stt_queue_metrics, requeue_dead_jobs
+from app.services.llm_client import provider as llm_provider
+from datetime import datetime
 import secrets
 import csv
 import codecs
@@ -120,6 +127,75 @@ def list_candidates(session: Session = Depends(get_session), username: str = Dep
 def list_interviews(session: Session = Depends(get_session), username: str = Depends(get_current_username)):
     return session.exec(select(Interview)).all()
 
+@router.get("/interviews/{interview_id}/timeline")
+def interview_timeline(interview_id: int, session: Session = Depends(get_session), username: str = Depends(get_current_username)):
+    """
+    Everything recorded during the interview's calls, oldest first: webhooks,
+    TwiML returned, stage changes, status callbacks, recordings.
+    """
+    if not session.get(Interview, interview_id):
+        raise HTTPException(status_code=404, detail="Interview not found")
+    return call_events.timeline(session, interview_id)
+
+# --- Booking Slots ---
+
+@router.get("/slots")
+def list_slots(session: Session = Depends(get_session), username: str = Depends(get_current_username)):
+    """
+    Upcoming slots that have bookings or a capacity override.
+    """
+    return session.exec(select(BookingSlot).where(BookingSlot.slot_time >= datetime.utcnow()).order_by(BookingSlot.slot_time)).all()
+
+@router.post("/slots")
+def update_slot_capacity(slot_time: datetime, capacity: int, session: Session = Depends(get_session), username: str = Depends(get_current_username)):
+    if capacity < 0:
+        raise HTTPException(status_code=400, detail="capacity must be >= 0")
+    return set_slot_capacity(session, slot_time, capacity)
+
+@router.get("/scheduler/metrics")
+def scheduler_metrics(username: str = Depends(get_current_username)):
+    """
+    Dialer queue depth, active calls and dial lag (seconds past reservation_time).
+    """
+    return dialer.metrics()
+
+@router.get("/call_state/metrics")
+def call_state_metrics(username: str = Depends(get_current_username)):
+    """
+    Per-call state cache: hit/load counts and writes still waiting to be flushed.
+    """
+    return call_state.metrics()
+
+@router.get("/call_events/metrics")
+def call_events_metrics(username: str = Depends(get_current_username)):
+    """
+    Call event log: events buffered, dropped and written per flush.
+    """
+    return call_events.metrics()
+
+@router.get("/llm/metrics")
+def llm_metrics(username: str = Depends(get_current_username)):
+    """
+    LLM / STT calls per operation: latency, errors, token usage and cache hits.
+    """
+    return llm_provider.metrics()
+
+@router.get("/stt/metrics")
+def stt_metrics(session: Session = Depends(get_session), username: str = Depends(get_current_username)):
+    """
+    STT job queue: depth per status, oldest waiting job, and job latency over the last hour.
+    """
+    return stt_queue_metrics(session)
+
+@router.post("/stt/requeue-dead")
+def stt_requeue_dead(session: Session = Depends(get_session), username: str = Depends(get_current_username)):
+    """
+    Retry every dead-lettered transcription job from scratch.
+    """
+    requeued = requeue_dead_jobs(session)
+    session.commit()
+    return {"requeued": requeued}
+
 @router.get("/recordings/{recording_sid}")
 async def proxy_recording(recording_sid: str, username: str = Depends(get_current_username)):
     """
@@ -5,7 +5,10 @@ from sqlmodel import Session, select
 from app.database import get_session
 from app.models import Candidate, Interview
 from app.services.notification import send_email, send_sms
+from app.services.scheduler import schedule_interview, cancel_interview
+from app.services.slots import list_open_slots, is_valid_slot, reserve_slot, release_slot
 from datetime import datetime
+from typing import Optional
 import os
 
 router = APIRouter(tags=["candidate"])
@@ -20,22 +23,28 @@ def show_booking_page(request: Request, token: str, session: Session = Depends(g
     if not candidate:
         return templates.TemplateResponse("error.html", {"request": request, "message": "無効なトークンです。"}, status_code=404)
     
+    return _render_booking_page(request, candidate, token, session)
+
+def _render_booking_page(request: Request, candidate: Candidate, token: str, session: Session, error: str = None, status_code: int = 200):
     # Get existing interview if any
-    interview = session.exec(select(Interview).where(Interview.candidate_id == candidate.id)).order_by(Interview.reservation_time.desc()).first()
+    interview = session.exec(select(Interview).where(Interview.candidate_id == candidate.id).order_by(Interview.reservation_time.desc())).first()
     
     return templates.TemplateResponse("booking.html", {
         "request": request,
         "candidate": candidate,
         "existing_interview": interview,
+        "open_slots": list_open_slots(session),
+        "error": error,
         "token": token
-    })
+    }, status_code=status_code)
 
 @router.post("/book", response_class=HTMLResponse, summary="予約確定", description="日時を指定して予約を確定します。")
 def submit_booking(
     request: Request,
     token: str = Form(...),
-    date: str = Form(...),
-    time: str = Form(...),
+    slot: Optional[str] = Form(None), # "YYYY-MM-DD HH:MM" from the slot picker
+    date: Optional[str] = Form(None),
+    time: Optional[str] = Form(None),
     session: Session = Depends(get_session)
 ):
     candidate = session.exec(select(Candidate).where(Candidate.token == token)).first()
@@ -44,10 +53,13 @@ def submit_booking(
     
     # Parse datetime
     try:
-        reservation_dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+        reservation_dt = datetime.strptime(slot or f"{date} {time}", "%Y-%m-%d %H:%M")
     except ValueError:
         return templates.TemplateResponse("error.html", {"request": request, "message": "日付形式が不正です。"}, status_code=400)
     
+    if not is_valid_slot(reservation_dt, datetime.utcnow()):
+        return _render_booking_page(request, candidate, token, session, "選択できない日時です。空き枠から選択してください。", 400)
+    
     # Create or update interview
     # Logic C: New interview overwrites logic, but Requirement says "Update (overwrite) but keep history"
     # Keeping history means creating new record or logging change.
@@ -58,14 +70,23 @@ def submit_booking(
     
     # Cancel old scheduled interviews
     old_interviews = session.exec(select(Interview).where(Interview.candidate_id == candidate.id, Interview.status == "scheduled")).all()
+    cancelled_ids = []
     for old in old_interviews:
         old.status = "cancelled_by_update"
         session.add(old)
+        release_slot(session, old.slot_time)
+        cancelled_ids.append(old.id)
+    
+    # Capacity check: the slot counter is updated in this same transaction
+    if not reserve_slot(session, reservation_dt):
+        session.rollback()
+        return _render_booking_page(request, candidate, token, session, "申し訳ありません。その時間帯は満席になりました。別の時間を選択してください。", 409)
         
     # Create new interview
     interview = Interview(
         candidate_id=candidate.id,
         reservation_time=reservation_dt,
+        slot_time=reservation_dt,
         status="scheduled"
     )
     session.add(interview)
@@ -77,6 +98,11 @@ def submit_booking(
     session.commit()
     session.refresh(interview)
     
+    # Keep the in-memory due timer in sync so the call fires at the booked time
+    for old_id in cancelled_ids:
+        cancel_interview(old_id)
+    schedule_interview(interview.id, interview.reservation_time)
+    
     # Notifications
     msg_body = f"{candidate.name}様\n\nAI一次面接の予約を承りました。\n日時: {reservation_dt.strftime('%Y/%m/%d %H:%M')}\n\n予定日時にAIからお電話します。\n変更する場合は同じURLからアクセスしてください。"
     
@@ -1,83 +1,202 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, BackgroundTasks, Form, Query
+from fastapi import APIRouter, Depends, Form, Query, WebSocket, WebSocketDisconnect
 from fastapi.responses import Response
-from sqlmodel import Session, select
-from twilio.twiml.voice_response import VoiceResponse, Gather
-from app.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from twilio.twiml.voice_response import VoiceResponse, Gather, Connect, Start
+from app.database import get_async_session, async_engine
 from app.models import Interview, Candidate, QuestionSet, Question, InterviewReview
-from app.services.stt_service import transcribe_audio_url
-from app.services.llm_service import extract_topic
-from typing import List, Optional
+from app.services.stt_queue import enqueue_stt, release_stt_jobs, stt_workers
+from app.services.answer_detector import AnswerEndDetector, transcribe_tail
+from app.services.stream_relay import parse_twilio
+from app.services.topic_extractor import resolve_topic
+from app.services.intent import classify_yes_no, classify_reverse_qa, INTENT_MIN_CONFIDENCE
+from app.services.scheduler import dialer, schedule_interview
+from app.services.call_retry import handle_call_status, TERMINAL_STATUSES
+from app.services.twiml_cache import TemplateCache, compile_template, fill
+from app.services.call_state import call_state
+from app.services.webhook_receipts import webhook_receipts, receipt_key
+from app.services.call_events import call_events, CallEventRoute
+from typing import Optional
+import asyncio
+import binascii
 import datetime
-from datetime import timedelta
+import os
 
-router = APIRouter(prefix="/voice", tags=["voice"])
+# Environment Variables
+# "record": each answer is a <Record> that ends after 15s of silence
+# "stream": answers stream to /voice/stream and end on 以上です or a short pause
+INTERVIEW_MODE = os.environ.get("INTERVIEW_MODE", "record")
+BASE_URL = os.environ.get("BASE_URL", "").rstrip("/")
+VOICE_STREAM_URL = os.environ.get("VOICE_STREAM_URL") or (BASE_URL.replace("http", "ws", 1) + "/voice/stream" if BASE_URL else None)
 
-def process_stt_background(review_id: int, recording_url: str):
-    from app.database import engine
-    from sqlmodel import Session
-    with Session(engine) as session:
-        review = session.get(InterviewReview, review_id)
-        if review:
-            text = transcribe_audio_url(recording_url)
-            review.transcript = text
-            session.add(review)
-            session.commit()
-            print(f"[INFO] STT Completed for Review {review_id}")
+if INTERVIEW_MODE == "stream" and not VOICE_STREAM_URL:
+    print("[WARN] INTERVIEW_MODE=stream needs BASE_URL or VOICE_STREAM_URL. Using record mode.")
+    INTERVIEW_MODE = "record"
+
+# Every webhook and the TwiML it returned goes to call_events (see /admin/interviews/{id}/timeline)
+router = APIRouter(prefix="/voice", tags=["voice"], route_class=CallEventRoute)
+
+def _twiml(xml: str) -> Response:
+    return Response(content=xml, media_type="application/xml")
+
+# --- TwiML builders ---
+# Prompts that don't depend on the candidate are rendered once at import with
+# the interview id as a placeholder (see twiml_cache); per-question TwiML is
+# cached per (question-set snapshot, q_index).
+
+def _build_greeting(interview_id: str) -> VoiceResponse:
+    resp = VoiceResponse()
+    
+    # Step 5: Greeting
+    resp.say("お電話ありがとうございます。株式会社パインズのAI面接官です。", language="ja-JP", voice="alice")
+    resp.pause(length=1)
+    
+    # Step 6: Time Check
+    resp.say("只今、面接のお時間はよろしいでしょうか？10分から15分程度となります。はい、か、いいえ、でお答えください。", language="ja-JP", voice="alice")
+    gather = Gather(input="speech dtmf", action=f"/voice/time_check?interview_id={interview_id}", timeout=5, language="ja-JP", bargeIn=False)
+    resp.append(gather)
+    
+    # Fallback if no input
+    resp.say("聞き取れませんでした。もう一度お願いします。", language="ja-JP", voice="alice")
+    resp.redirect(f"/voice/call?interview_id={interview_id}")
+    return resp
+
+def _build_closing(interview_id: str) -> VoiceResponse:
+    resp = VoiceResponse()
+    # Step 16: Closing
+    resp.say("ありがとうございます。本日の面接は以上となります。", language="ja-JP", voice="alice")
+    resp.say("合否の結果は、7営業日以内に応募サイトよりご連絡いたします。", language="ja-JP", voice="alice")
+    resp.say("いただいたご質問については、合格された方にのみ、メール、または次回面接時に回答させていただきます。", language="ja-JP", voice="alice")
+    
+    # Step 17: Hangup
+    resp.say("お忙しい中、お時間をいただきありがとうございました。失礼いたします。", language="ja-JP", voice="alice")
+    resp.hangup()
+    return resp
+
+def _build_question(question: dict, q_index: int, total: int):
+    def build(interview_id: str) -> VoiceResponse:
+        remaining = total - q_index
+        resp = VoiceResponse()
+        
+        # Step 11: Countdown
+        if remaining <= 3:
+            if remaining == 1:
+                resp.say("これが最後の質問です。", language="ja-JP", voice="alice")
+            else:
+                resp.say(f"残り、{remaining}問です。", language="ja-JP", voice="alice")
+                
+        # Step 8: Ask
+        resp.say(question["text"], language="ja-JP", voice="alice")
+        
+        if INTERVIEW_MODE == "stream":
+            # Step 9 (stream): /voice/stream listens and closes the socket when
+            # the answer is over, which ends <Connect> -> next question
+            connect = Connect()
+            stream = connect.stream(url=VOICE_STREAM_URL)
+            stream.parameter(name="interview_id", value=interview_id)
+            stream.parameter(name="q_index", value=str(q_index))
+            resp.append(connect)
+            resp.redirect(f"/voice/question?interview_id={interview_id}&q_index={q_index+1}")
+            return resp
+        
+        # Step 9: Record
+        # User wanted "Wait 3 mins", "Trigger 'That's all'".
+        # Record allows silence trigger (timeout) or key. capturing speech while recording is tricky.
+        # We will encourage Key Press (#).
+        # Using trim-silence=true will stop if they stop talking (default 5s silence).
+        # Step 9: Record
+        # Updated: No "trim-silence" (keep recording even if silent for a bit), 
+        # Timeout increased for end detection? Twisted requirement: "wait 3 mins" vs "detect finish".
+        # User said: "No silence rule (deprecated)... trigger on 'That's all' OR 3 mins elapsed"
+        # Twilio Record cannot trigger on 'That's all'.
+        # Compromise: Large timeout (e.g. 10-20s silence) or just max_length.
+        # If we remove trim="trim-silence", it records until max_length or hangup or key.
+        # But user wants "Trigger next on 'That's all'". We CANNOT do that natively in TwiML <Record>.
+        # We would need <Stream> or <Gather input='speech'> (but Gather has limit 60s).
+        # Best MVP approach: Use <Record> with keys or long silence.
+        # User said "Button setting not instructed". ok.
+        # User said "Trigger on 'That's all' OR 3 mins".
+        # Since we can't trigger on word in <Record>, we MUST rely on Silence or Time.
+        # Current best: Max 180s. Stop on Silence (but user said "Ah/Um might trigger").
+        # So we increase silence timeout to say 10-15s?
+        
+        resp.record(
+            action=f"/voice/record?interview_id={interview_id}&q_index={q_index}",
+            max_length=180, # 3 mins hard limit
+            # finish_on_key="#", # Removed as per "button setting not instructed" (though useful)
+            timeout=15, # Wait 15s of silence before assuming done. "Ah..." usually < 5s.
+            trim="trim-silence", # If we don't trim, we get 15s of silence at end. fine.
+            # Transcription starts when Twilio says the file is ready, instead of polling for it
+            recording_status_callback=f"/voice/recording_ready?interview_id={interview_id}&q_index={q_index}",
+            recording_status_callback_event="completed"
+        )
+        return resp
+    return build
+
+def _build_reverse_qa_intro(interview_id: str) -> VoiceResponse:
+    resp = VoiceResponse()
+    # Step 12
+    resp.say("すべての質問が終わりました。逆に、弊社について聞きたいことはありますか？", language="ja-JP", voice="alice")
+    resp.redirect(f"/voice/reverse_qa_listen?interview_id={interview_id}")
+    return resp
+
+# Reverse Q&A turn number in the listen TwiML, so each answer has its own webhook receipt
+TURN_PLACEHOLDER = "__TURN__"
+
+def _build_reverse_qa_listen(first_time: bool):
+    def build(interview_id: str) -> VoiceResponse:
+        resp = VoiceResponse()
+        
+        if not first_time:
+            resp.say("他に何か質問はありますか？なければ、ない、とおっしゃってください。", language="ja-JP", voice="alice")
+            
+        gather = Gather(input="speech", action=f"/voice/reverse_qa_process?interview_id={interview_id}&turn={TURN_PLACEHOLDER}", language="ja-JP", timeout=3, speechTimeout="auto")
+        resp.append(gather)
+        
+        # If no input, assume no more questions? Or prompt again?
+        # Let's prompt once logic
+        resp.say("もし質問がなければ、ない、とおっしゃってください。", language="ja-JP", voice="alice")
+        resp.redirect(f"/voice/reverse_qa_process?interview_id={interview_id}&turn={TURN_PLACEHOLDER}&no_input=true")
+        return resp
+    return build
+
+GREETING_TWIML = compile_template(_build_greeting)
+CLOSING_TWIML = compile_template(_build_closing)
+REVERSE_QA_INTRO_TWIML = compile_template(_build_reverse_qa_intro)
+REVERSE_QA_LISTEN_TWIML = {first_time: compile_template(_build_reverse_qa_listen(first_time)) for first_time in (True, False)}
+question_twiml_cache = TemplateCache()
 
 @router.post("/call")
 async def start_call(
     interview_id: int = Query(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     try:
         print(f"[INFO] Incoming call for interview_id={interview_id}")
-        interview = session.get(Interview, interview_id)
-        if not interview:
+        state = await call_state.aget(interview_id, session)
+        if not state:
             print(f"[ERROR] Interview {interview_id} not found")
             return Response(content=str(VoiceResponse().hangup()), media_type="application/xml")
         
         # Init snapshot logic same as before...
-        if not interview.session_snapshot:
+        if not state.session_snapshot:
             print(f"[INFO] Initializing snapshot for interview {interview_id}")
-            candidate = interview.candidate
-            if not candidate:
-                 # Fetch manually if relationship fails?
-                 candidate = session.get(Candidate, interview.candidate_id)
+            candidate = await session.get(Candidate, state.candidate_id)
             
             q_set_id = candidate.question_set_id
             if not q_set_id:
-                qs = session.exec(select(QuestionSet)).first()
+                qs = (await session.exec(select(QuestionSet))).first()
                 if qs: q_set_id = qs.id
             questions = []
             if q_set_id:
-                questions = session.exec(select(Question).where(Question.set_id == q_set_id).order_by(Question.order)).all()
+                questions = (await session.exec(select(Question).where(Question.set_id == q_set_id).order_by(Question.order))).all()
             
             print(f"[INFO] Questions found: {len(questions)}")
             snapshot = [{"id": q.id, "text": q.text, "max_duration": q.max_duration} for q in questions]
-            interview.session_snapshot = snapshot
-            interview.status = "in_progress"
-            interview.current_stage = "greeting"
-            session.add(interview)
-            session.commit()
-            session.refresh(interview)
-        
-        resp = VoiceResponse()
-        
-        # Step 5: Greeting
-        resp.say("お電話ありがとうございます。株式会社パインズのAI面接官です。", language="ja-JP", voice="alice")
-        resp.pause(length=1)
-        
-        # Step 6: Time Check
-        resp.say("只今、面接のお時間はよろしいでしょうか？10分から15分程度となります。はい、か、いいえ、でお答えください。", language="ja-JP", voice="alice")
-        gather = Gather(input="speech dtmf", action=f"/voice/time_check?interview_id={interview.id}", timeout=5, language="ja-JP", bargeIn=False)
-        resp.append(gather)
-        
-        # Fallback if no input
-        resp.say("聞き取れませんでした。もう一度お願いします。", language="ja-JP", voice="alice")
-        resp.redirect(f"/voice/call?interview_id={interview.id}")
+            await call_state.aupdate(interview_id, session=session, session_snapshot=snapshot, status="in_progress", current_stage="greeting")
         
         print(f"[INFO] Returning TwiML for interview {interview_id}")
-        return Response(content=str(resp), media_type="application/xml")
+        return _twiml(fill(GREETING_TWIML, interview_id))
     
     except Exception as e:
         print(f"[CRITICAL] Detailed Error in start_call: {str(e)}")
@@ -90,55 +209,70 @@ async def time_check(
     interview_id: int = Query(...),
     SpeechResult: Optional[str] = Form(None),
     Digits: Optional[str] = Form(None),
-    session: Session = Depends(get_session)
+    attempt: int = Query(0)
 ):
-    interview = session.get(Interview, interview_id)
     resp = VoiceResponse()
     
-    # Simple Yes/No logic
-    positive = ["はい", "yes", "大丈夫", "いいよ", "ok", "ある"]
-    negative = ["いいえ", "no", "ない", "だめ", "無理"]
-    
-    input_val = (SpeechResult or "").lower()
-    if Digits == "1": input_val = "yes"
-    if Digits == "2": input_val = "no"
-    
-    is_positive = any(w in input_val for w in positive)
-    is_negative = any(w in input_val for w in negative)
+    intent = classify_yes_no(SpeechResult, Digits)
+    print(f"[INFO] Time check for interview {interview_id}: {intent.label} ({intent.confidence}) <- {SpeechResult!r} / {Digits!r}")
+    is_negative = intent.label == "no" and intent.confidence >= INTENT_MIN_CONFIDENCE
+    is_positive = intent.label == "yes" and intent.confidence >= INTENT_MIN_CONFIDENCE
     
-    if is_negative:
+    if not (is_positive or is_negative) and attempt == 0:
+        # Unclear answer: ask once more, then default to Yes as before
+        resp.say("恐れ入ります。面接のお時間はよろしいでしょうか？はい、か、いいえ、でお答えください。", language="ja-JP", voice="alice")
+        resp.append(Gather(input="speech dtmf", action=f"/voice/time_check?interview_id={interview_id}&attempt=1", timeout=5, language="ja-JP", bargeIn=False))
+        resp.redirect(f"/voice/time_check?interview_id={interview_id}&attempt=1")
+        
+    elif is_negative:
         # Step 7 (Alter): No -> Reschedule
         resp.say("左様でございますか。承知いたしました。", language="ja-JP", voice="alice")
         resp.say("それでは、ご都合の良い日時を教えていただけますでしょうか？お話しいただいた内容は録音され、担当者に伝えられます。お話し終わりましたら、電話をお切りください。", language="ja-JP", voice="alice")
         resp.record(
-            action=f"/voice/save_reschedule?interview_id={interview.id}",
+            action=f"/voice/save_reschedule?interview_id={interview_id}",
             max_length=60,
             timeout=10, # Wait 10s for them to start
             trim="trim-silence"
         )
         # If record finishes, it goes to save_reschedule.
         
-    elif is_positive or True: # Default to Yes
+    else: # Yes, or still unclear after asking again
         # Step 7: Yes -> Intro
         resp.say("ありがとうございます。それでは、弊社への志望動機など、いくつかご質問をさせていただきます。", language="ja-JP", voice="alice")
-        resp.say("各質問の回答時間は最大3分です。回答が終わりましたら、無言でお待ちいただくか、次の質問へとお進みください。", language="ja-JP", voice="alice")
-        interview.current_stage = "main_qa"
-        session.add(interview)
-        session.commit()
-        resp.redirect(f"/voice/question?interview_id={interview.id}&q_index=0")
+        if INTERVIEW_MODE == "stream":
+            resp.say("各質問の回答時間は最大3分です。回答が終わりましたら、以上です、とおっしゃってください。", language="ja-JP", voice="alice")
+            # Answers arrive over the stream; this recording is only for playback in the admin
+            start = Start()
+            start.recording(recording_status_callback=f"{BASE_URL}/voice/recording_status?interview_id={interview_id}", recording_status_callback_event="completed")
+            resp.append(start)
+        else:
+            resp.say("各質問の回答時間は最大3分です。回答が終わりましたら、無言でお待ちいただくか、次の質問へとお進みください。", language="ja-JP", voice="alice")
+        await call_state.aupdate(interview_id, current_stage="main_qa")
+        resp.redirect(f"/voice/question?interview_id={interview_id}&q_index=0")
         
     return Response(content=str(resp), media_type="application/xml")
 
 @router.post("/save_reschedule")
 async def save_reschedule(
-    background_tasks: BackgroundTasks,
     interview_id: int = Query(...),
     RecordingUrl: Optional[str] = Form(None),
-    session: Session = Depends(get_session)
+    CallSid: Optional[str] = Form(None),
+    RecordingSid: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    interview = session.get(Interview, interview_id)
-    if interview:
-        interview.status = "reschedule_requested"
+    key = receipt_key(CallSid, "reschedule", RecordingSid)
+    replay = await webhook_receipts.replay(key, session)
+    if replay is not None:
+        return _twiml(replay)
+    
+    resp = VoiceResponse()
+    resp.say("ありがとうございます。担当者より改めてご連絡いたします。失礼いたします。", language="ja-JP", voice="alice")
+    resp.hangup()
+    xml = str(resp)
+    
+    # Written immediately: the admin acts on reschedule requests
+    state = await call_state.aupdate(interview_id, durable=True, session=session, status="reschedule_requested")
+    if state:
         # We store the recording URL in logs or a specific field? 
         # For MVP, let's create a review-like entry or just log.
         # Let's add to communication logs or just print for now as "Note"
@@ -146,7 +280,7 @@ async def save_reschedule(
         # Using CommunicationLog for now using "inbound" type
         from app.models import CommunicationLog
         log = CommunicationLog(
-            candidate_id=interview.candidate_id,
+            candidate_id=state.candidate_id,
             type="voice_reschedule",
             direction="inbound",
             status="received",
@@ -154,171 +288,236 @@ async def save_reschedule(
             error_message="User requested reschedule via voice."
         )
         session.add(log)
-        session.add(interview)
-        session.commit()
+        replay = await webhook_receipts.claim(session, key, interview_id, xml)
+        if replay is not None:
+            return _twiml(replay)
         
         # Optionally trigger STT for this too
-        # background_tasks.add_task(process_stt_background, ...) # 需要にあれば
+        # enqueue_stt(...) # 需要にあれば
         
-    resp = VoiceResponse()
-    resp.say("ありがとうございます。担当者より改めてご連絡いたします。失礼いたします。", language="ja-JP", voice="alice")
-    resp.hangup()
-    return Response(content=str(resp), media_type="application/xml")
+    return _twiml(xml)
 
 @router.post("/question")
 async def ask_question(
     interview_id: int = Query(...),
-    q_index: int = Query(...),
-    session: Session = Depends(get_session)
+    q_index: int = Query(...)
 ):
-    interview = session.get(Interview, interview_id)
-    snapshot = interview.session_snapshot
+    state = await call_state.aget(interview_id)
+    snapshot = state.session_snapshot or []
     
     if q_index >= len(snapshot):
         # Done with main questions -> Reverse QA
         resp = VoiceResponse()
-        resp.redirect(f"/voice/reverse_qa_intro?interview_id={interview.id}")
+        resp.redirect(f"/voice/reverse_qa_intro?interview_id={interview_id}")
         return Response(content=str(resp), media_type="application/xml")
         
-    question = snapshot[q_index]
-    remaining = len(snapshot) - q_index
-    
-    resp = VoiceResponse()
-    
-    # Step 11: Countdown
-    if remaining <= 3:
-        if remaining == 1:
-            resp.say("これが最後の質問です。", language="ja-JP", voice="alice")
-        else:
-            resp.say(f"残り、{remaining}問です。", language="ja-JP", voice="alice")
-            
-    # Step 8: Ask
-    resp.say(question["text"], language="ja-JP", voice="alice")
-    
-    # Step 9: Record
-    # User wanted "Wait 3 mins", "Trigger 'That's all'".
-    # Record allows silence trigger (timeout) or key. capturing speech while recording is tricky.
-    # We will encourage Key Press (#).
-    # Using trim-silence=true will stop if they stop talking (default 5s silence).
-    # Step 9: Record
-    # Updated: No "trim-silence" (keep recording even if silent for a bit), 
-    # Timeout increased for end detection? Twisted requirement: "wait 3 mins" vs "detect finish".
-    # User said: "No silence rule (deprecated)... trigger on 'That's all' OR 3 mins elapsed"
-    # Twilio Record cannot trigger on 'That's all'.
-    # Compromise: Large timeout (e.g. 10-20s silence) or just max_length.
-    # If we remove trim="trim-silence", it records until max_length or hangup or key.
-    # But user wants "Trigger next on 'That's all'". We CANNOT do that natively in TwiML <Record>.
-    # We would need <Stream> or <Gather input='speech'> (but Gather has limit 60s).
-    # Best MVP approach: Use <Record> with keys or long silence.
-    # User said "Button setting not instructed". ok.
-    # User said "Trigger on 'That's all' OR 3 mins".
-    # Since we can't trigger on word in <Record>, we MUST rely on Silence or Time.
-    # Current best: Max 180s. Stop on Silence (but user said "Ah/Um might trigger").
-    # So we increase silence timeout to say 10-15s?
-    
-    resp.record(
-        action=f"/voice/record?interview_id={interview.id}&q_index={q_index}",
-        max_length=180, # 3 mins hard limit
-        # finish_on_key="#", # Removed as per "button setting not instructed" (though useful)
-        timeout=15, # Wait 15s of silence before assuming done. "Ah..." usually < 5s.
-        trim="trim-silence" # If we don't trim, we get 15s of silence at end. fine.
-    )
-    
-    return Response(content=str(resp), media_type="application/xml")
+    # Same question set -> same TwiML for every candidate; only the id differs
+    key = (state.snapshot_hash, q_index)
+    template = question_twiml_cache.get_or_compile(key, _build_question(snapshot[q_index], q_index, len(snapshot)))
+    return _twiml(fill(template, interview_id))
 
 @router.post("/record")
 async def save_recording(
-    background_tasks: BackgroundTasks,
     interview_id: int = Query(...),
     q_index: int = Query(...),
     RecordingUrl: Optional[str] = Form(None),
     RecordingDuration: Optional[str] = Form(None),
-    session: Session = Depends(get_session)
+    CallSid: Optional[str] = Form(None),
+    RecordingSid: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    interview = session.get(Interview, interview_id)
-    if interview:
-        snapshot = interview.session_snapshot
+    # A retry (Twilio timed out waiting for us) gets the same answer and writes nothing
+    key = receipt_key(CallSid, f"record:{q_index}", RecordingSid)
+    replay = await webhook_receipts.replay(key, session)
+    if replay is not None:
+        return _twiml(replay)
+    
+    # Step 10: Loop
+    resp = VoiceResponse()
+    resp.redirect(f"/voice/question?interview_id={interview_id}&q_index={q_index+1}")
+    xml = str(resp)
+    
+    state = await call_state.aget(interview_id, session)
+    if state:
+        snapshot = state.session_snapshot or []
         if 0 <= q_index < len(snapshot):
             question = snapshot[q_index]
             review = InterviewReview(
-                interview_id=interview.id,
+                interview_id=interview_id,
                 question_id=question["id"],
                 question_text=question["text"],
                 recording_url=RecordingUrl,
                 duration=int(RecordingDuration) if RecordingDuration else 0
             )
             session.add(review)
-            interview.last_completed_q_id = question["id"]
-            session.add(interview)
-            session.commit()
-            
             if RecordingUrl:
-                background_tasks.add_task(process_stt_background, review.id, RecordingUrl)
+                # Transcribed by the STT workers; committed with the review so it survives restarts.
+                # Held until /voice/recording_ready says the file can be downloaded.
+                await session.flush()
+                await enqueue_stt(session, review, recording_url=RecordingUrl, wait_for_recording=True)
+            replay = await webhook_receipts.claim(session, key, interview_id, xml)
+            if replay is not None:
+                return _twiml(replay)
+            stt_workers.wake()
+            await call_state.aupdate(interview_id, session=session, last_completed_q_id=question["id"])
     
-    # Step 10: Loop
-    resp = VoiceResponse()
-    resp.redirect(f"/voice/question?interview_id={interview_id}&q_index={q_index+1}")
-    return Response(content=str(resp), media_type="application/xml")
+    return _twiml(xml)
+
+async def _spot_closing_phrase(detector: AnswerEndDetector, pause_at_ms: int):
+    transcript = await asyncio.to_thread(transcribe_tail, detector.tail())
+    detector.spotted(transcript, pause_at_ms)
+
+async def _save_streamed_answer(interview_id: int, q_index: int, detector: AnswerEndDetector):
+    state = await call_state.aget(interview_id)
+    snapshot = (state.session_snapshot or []) if state else []
+    if not 0 <= q_index < len(snapshot):
+        return
+    question = snapshot[q_index]
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        # recording_url is filled in by /voice/recording_status after the call
+        review = InterviewReview(
+            interview_id=interview_id,
+            question_id=question["id"],
+            question_text=question["text"],
+            duration=detector.speech_seconds()
+        )
+        session.add(review)
+        if detector.heard_speech:
+            await session.flush()
+            await enqueue_stt(session, review, audio=bytes(detector.audio))
+        await session.commit()
+        stt_workers.wake()
+        await call_state.aupdate(interview_id, session=session, last_completed_q_id=question["id"])
+
+@router.websocket("/stream")
+async def answer_stream(websocket: WebSocket):
+    """
+    Stream mode: one Media Streams connection per answer. Inbound audio runs
+    through AnswerEndDetector (VAD, plus a closing-phrase check at each
+    pause); closing the socket moves the call on to the next question.
+    """
+    await websocket.accept()
+    detector = None
+    interview_id = q_index = None
+    spotting = set()
+    try:
+        while detector is None or not detector.finished:
+            event_type, data = parse_twilio(await websocket.receive_text())
+            if event_type == "start":
+                params = data["start"].get("customParameters", {})
+                interview_id, q_index = int(params["interview_id"]), int(params["q_index"])
+                state = await call_state.aget(interview_id)
+                snapshot = (state.session_snapshot or []) if state else []
+                max_seconds = snapshot[q_index].get("max_duration") if q_index < len(snapshot) else None
+                detector = AnswerEndDetector(max_seconds=max_seconds or 180)
+                call_events.record(interview_id, "stream", data["start"].get("callSid"), event="start", q_index=q_index)
+            elif event_type == "media" and detector:
+                event = detector.feed(binascii.a2b_base64(data))
+                if event and event.kind == "pause":
+                    task = asyncio.create_task(_spot_closing_phrase(detector, event.at_ms))
+                    spotting.add(task)
+                    task.add_done_callback(spotting.discard)
+            elif event_type == "stop":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in list(spotting):
+            task.cancel()
+    if detector is None:
+        return
+    end = detector.hangup()
+    print(f"[INFO] Answer {interview_id}/{q_index} ended: {end.reason} at {end.at_ms}ms")
+    call_events.record(interview_id, "stream", event="end", q_index=q_index, reason=end.reason, at_ms=end.at_ms)
+    try:
+        await websocket.close()
+    except Exception:
+        pass # Twilio already closed it (hangup)
+    await _save_streamed_answer(interview_id, q_index, detector)
+
+@router.post("/recording_status")
+async def recording_status(
+    interview_id: int = Query(...),
+    RecordingUrl: Optional[str] = Form(None),
+    RecordingStatus: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Stream mode: one recording of the whole Q&A, attached to its answers for playback
+    if RecordingStatus == "completed" and RecordingUrl:
+        reviews = (await session.exec(select(InterviewReview).where(InterviewReview.interview_id == interview_id, InterviewReview.recording_url == None))).all()
+        for review in reviews:
+            review.recording_url = RecordingUrl
+            session.add(review)
+        await session.commit()
+    return {"status": "ok"}
+
+@router.post("/recording_ready")
+async def recording_ready(
+    interview_id: int = Query(...),
+    q_index: int = Query(...),
+    RecordingUrl: Optional[str] = Form(None),
+    RecordingStatus: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Record mode: one answer's recording is downloadable now, so its transcription can start
+    if RecordingStatus == "completed" and RecordingUrl:
+        released = await release_stt_jobs(session, interview_id, RecordingUrl)
+        await session.commit()
+        if released:
+            stt_workers.wake()
+        else:
+            # Already released (retried callback), or it beat /voice/record: then the job runs after STT_RECORDING_WAIT_SECONDS
+            print(f"[INFO] Recording ready for {interview_id}/{q_index}: no transcription job waiting for it")
+    return {"status": "ok"}
 
 @router.post("/reverse_qa_intro")
-async def reverse_qa_intro(interview_id: int = Query(...), session: Session = Depends(get_session)):
-    interview = session.get(Interview, interview_id)
-    interview.current_stage = "reverse_qa"
-    session.add(interview)
-    session.commit()
+async def reverse_qa_intro(interview_id: int = Query(...)):
+    await call_state.aupdate(interview_id, current_stage="reverse_qa")
     
-    resp = VoiceResponse()
-    # Step 12
-    resp.say("すべての質問が終わりました。逆に、弊社について聞きたいことはありますか？", language="ja-JP", voice="alice")
-    resp.redirect(f"/voice/reverse_qa_listen?interview_id={interview.id}")
-    return Response(content=str(resp), media_type="application/xml")
+    return _twiml(fill(REVERSE_QA_INTRO_TWIML, interview_id))
 
 @router.post("/reverse_qa_listen")
-async def reverse_qa_listen(interview_id: int = Query(...), first_time: bool = Query(True)):
-    resp = VoiceResponse()
-    
-    if not first_time:
-        resp.say("他に何か質問はありますか？なければ、ない、とおっしゃってください。", language="ja-JP", voice="alice")
-        
-    gather = Gather(input="speech", action=f"/voice/reverse_qa_process?interview_id={interview_id}", language="ja-JP", timeout=3, speechTimeout="auto")
-    resp.append(gather)
-    
-    # If no input, assume no more questions? Or prompt again?
-    # Let's prompt once logic
-    resp.say("もし質問がなければ、ない、とおっしゃってください。", language="ja-JP", voice="alice")
-    resp.redirect(f"/voice/reverse_qa_process?interview_id={interview_id}&no_input=true")
-    
-    return Response(content=str(resp), media_type="application/xml")
+async def reverse_qa_listen(interview_id: int = Query(...), first_time: bool = Query(True), turn: int = Query(0)):
+    return _twiml(fill(REVERSE_QA_LISTEN_TWIML[first_time], interview_id).replace(TURN_PLACEHOLDER, str(turn)))
 
 @router.post("/reverse_qa_process")
 async def reverse_qa_process(
     interview_id: int = Query(...),
     SpeechResult: Optional[str] = Form(None),
+    CallSid: Optional[str] = Form(None),
     no_input: bool = Query(False),
-    session: Session = Depends(get_session)
+    turn: int = Query(0),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    interview = session.get(Interview, interview_id)
+    # Checked before the topic lookup: a retry must not log the question twice or pay for another LLM call
+    key = receipt_key(CallSid, f"reverse_qa:{turn}")
+    replay = await webhook_receipts.replay(key, session)
+    if replay is not None:
+        return _twiml(replay)
+    
     resp = VoiceResponse()
     
     text = (SpeechResult or "").strip()
     
     # Step 15: Check exit triggers
-    exit_triggers = ["ない", "なし", "大丈夫", "以上", "終わり", "no", "nothing"]
-    if no_input or any(t in text.lower() for t in exit_triggers):
-        resp.redirect(f"/voice/end?interview_id={interview.id}")
+    intent = classify_reverse_qa(text)
+    if no_input or (intent.label == "exit" and intent.confidence >= INTENT_MIN_CONFIDENCE):
+        resp.redirect(f"/voice/end?interview_id={interview_id}")
         return Response(content=str(resp), media_type="application/xml")
     
     # Logic: Valid question
     # Step 13: Repeat topic
-    topic = extract_topic(text)
+    # Local extractor first; the LLM only for unclear questions, time-boxed
+    topic = (await resolve_topic(text)).topic
     resp.say(f"{topic}についてですね。", language="ja-JP", voice="alice")
+    resp.redirect(f"/voice/reverse_qa_listen?interview_id={interview_id}&first_time=false&turn={turn+1}")
+    xml = str(resp)
+    replay = await webhook_receipts.claim(session, key, interview_id, xml)
+    if replay is not None:
+        return _twiml(replay)
     
     # Log it
-    logs = list(interview.reverse_qa_logs) if interview.reverse_qa_logs else []
-    logs.append({"question": text, "topic": topic, "timestamp": str(datetime.datetime.utcnow())})
-    interview.reverse_qa_logs = logs
-    session.add(interview)
-    session.commit()
+    await call_state.aappend_log(interview_id, {"question": text, "topic": topic, "timestamp": str(datetime.datetime.utcnow())}, session=session)
     
     # Step 16 (Part of closing info, user said explained here? No, user said "Questions answered for successful candidates only... via email")
     # Actually Step 16 is closing.
@@ -327,34 +526,39 @@ async def reverse_qa_process(
     # So here just loop? User said "Repeat back topic... Ask if other questions".
     # User didn't imply answering here.
     
-    resp.redirect(f"/voice/reverse_qa_listen?interview_id={interview.id}&first_time=false")
-    return Response(content=str(resp), media_type="application/xml")
+    return _twiml(xml)
 
 @router.post("/end")
-async def end_call(interview_id: int = Query(...), session: Session = Depends(get_session)):
-    interview = session.get(Interview, interview_id)
-    interview.status = "completed"
-    interview.current_stage = "ending"
-    session.add(interview)
-    session.commit()
-    
-    resp = VoiceResponse()
-    # Step 16: Closing
-    resp.say("ありがとうございます。本日の面接は以上となります。", language="ja-JP", voice="alice")
-    resp.say("合否の結果は、7営業日以内に応募サイトよりご連絡いたします。", language="ja-JP", voice="alice")
-    resp.say("いただいたご質問については、合格された方にのみ、メール、または次回面接時に回答させていただきます。", language="ja-JP", voice="alice")
-    
-    # Step 17: Hangup
-    resp.say("お忙しい中、お時間をいただきありがとうございました。失礼いたします。", language="ja-JP", voice="alice")
-    resp.hangup()
+async def end_call(interview_id: int = Query(...)):
+    # Written immediately: the status callback decides completed vs interrupted from it
+    await call_state.aupdate(interview_id, durable=True, status="completed", current_stage="ending")
     
-    return Response(content=str(resp), media_type="application/xml")
+    return _twiml(fill(CLOSING_TWIML, interview_id))
 
 @router.post("/status")
-async def call_status(interview_id: int = Query(...), CallStatus: str = Form(...), session: Session = Depends(get_session)):
-    interview = session.get(Interview, interview_id)
+async def call_status(
+    interview_id: int = Query(...),
+    CallStatus: str = Form(...),
+    CallSid: Optional[str] = Form(None),
+    AnsweredBy: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Twilio redelivers status callbacks; one already handled is not logged or acted on again
+    key = receipt_key(CallSid, f"status:{CallStatus}")
+    if await webhook_receipts.replay(key, session) is not None:
+        return {"status": "ok"}
+    # Make sure anything this process still holds for the call is in the DB first
+    await call_state.aflush(interview_id, session)
+    interview = await session.get(Interview, interview_id)
     if interview:
         print(f"[INFO] Call {interview_id} Status: {CallStatus}")
-        # Update connection status logic (omitted for brevity, keep existing retry logic if needed, but user disabled it)
-        pass 
+        if CallStatus in TERMINAL_STATUSES:
+            dialer.release(interview_id)
+        retry_at = handle_call_status(session, interview, CallStatus, CallSid, AnsweredBy)
+        if await webhook_receipts.claim(session, key, interview_id, "ok") is not None:
+            return {"status": "ok"}
+        if CallStatus in TERMINAL_STATUSES:
+            await call_state.aevict(interview_id, session)
+        if retry_at:
+            schedule_interview(interview_id, retry_at)
     return {"status": "ok"}
@@ -0,0 +1,194 @@
+import io
+import os
+import wave
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from app.services.audio import EnergyVAD, FRAME_BYTES, FRAME_MS, SAMPLE_RATE, ulaw_decode, ulaw_encode
+from app.services.intent import classify_answer_end, INTENT_MIN_CONFIDENCE
+from app.services.llm_client import provider, LLMError
+
+# Environment Variables
+# Silence after speech that ends an answer (Record mode waits 15s)
+ANSWER_END_SILENCE_SECONDS = float(os.environ.get("ANSWER_END_SILENCE_SECONDS", "4"))
+# Pause after which the last words are checked for a closing phrase (以上です)
+ANSWER_PAUSE_SECONDS = float(os.environ.get("ANSWER_PAUSE_SECONDS", "0.8"))
+# No speech at all for this long after the question -> move on
+ANSWER_NO_SPEECH_SECONDS = float(os.environ.get("ANSWER_NO_SPEECH_SECONDS", "15"))
+ANSWER_KEYWORD_SPOTTING = os.environ.get("ANSWER_KEYWORD_SPOTTING", "on") # "on" | "off"
+ANSWER_SPOT_TAIL_SECONDS = float(os.environ.get("ANSWER_SPOT_TAIL_SECONDS", "2.5"))
+ANSWER_SPOT_TIMEOUT_SECONDS = float(os.environ.get("ANSWER_SPOT_TIMEOUT_SECONDS", "2"))
+
+class AnswerEvent(NamedTuple):
+    kind: str # "pause" (check the last words) | "end"
+    reason: str # "pause" | "keyword" | "silence" | "no_speech" | "max_length" | "hangup"
+    at_ms: int # position in the answer audio
+
+class AnswerEndDetector:
+    """
+    Decides when a streamed answer is over, from the audio alone.
+
+    Time is counted in frames, not read from the clock, so feeding a
+    recorded μ-law file gives exactly the events the live call did.
+
+    - feed() every inbound payload. It returns AnswerEvent("pause") once per
+      pause in the speech; the caller may transcribe tail() and pass the
+      text to spotted(), which ends the answer on a closing phrase.
+    - It returns AnswerEvent("end") on long silence after speech, no speech
+      at all, or the length limit.
+    """
+    def __init__(self, max_seconds: float = 180, vad: EnergyVAD = None,
+                 end_silence: float = ANSWER_END_SILENCE_SECONDS, pause: float = ANSWER_PAUSE_SECONDS,
+                 no_speech: float = ANSWER_NO_SPEECH_SECONDS):
+        self.max_ms = int(max_seconds * 1000)
+        self.vad = vad or EnergyVAD()
+        self.end_silence_ms = int(end_silence * 1000)
+        self.pause_ms = int(pause * 1000)
+        self.no_speech_ms = int(no_speech * 1000)
+        self.audio = bytearray()
+        self.elapsed_ms = 0
+        self.heard_speech = False
+        self.silence_ms = 0
+        self.pause_reported = False
+        self.pause_at_ms = 0
+        self.end: Optional[AnswerEvent] = None
+        self._pending = b""
+
+    @property
+    def finished(self) -> bool:
+        return self.end is not None
+
+    def feed(self, payload: bytes) -> Optional[AnswerEvent]:
+        if self.end:
+            return None
+        self.audio += payload
+        data = self._pending + payload
+        usable = len(data) - len(data) % FRAME_BYTES
+        self._pending = data[usable:]
+        # Twilio sends one frame per message; anything longer is decided in one batch
+        if usable == FRAME_BYTES:
+            decisions = (self.vad.push(data[:usable]),)
+        else:
+            decisions = self.vad.process(data[:usable])
+        event = None
+        for speech in decisions:
+            event = self._frame(speech) or event
+            if self.end:
+                return self.end
+        return event
+
+    def _frame(self, speech: bool) -> Optional[AnswerEvent]:
+        self.elapsed_ms += FRAME_MS
+        if speech:
+            self.heard_speech = True
+            self.silence_ms = 0
+            self.pause_reported = False
+        else:
+            self.silence_ms += FRAME_MS
+
+        if self.elapsed_ms >= self.max_ms:
+            return self._finish("max_length")
+        if not self.heard_speech:
+            if self.elapsed_ms >= self.no_speech_ms:
+                return self._finish("no_speech")
+            return None
+        if self.silence_ms >= self.end_silence_ms:
+            return self._finish("silence")
+        if self.silence_ms >= self.pause_ms and not self.pause_reported:
+            self.pause_reported = True
+            self.pause_at_ms = self.elapsed_ms
+            return AnswerEvent("pause", "pause", self.elapsed_ms)
+        return None
+
+    def spotted(self, transcript: str, pause_at_ms: int = None) -> Optional[AnswerEvent]:
+        """
+        Transcript of the words before the pause reported at `pause_at_ms`
+        (default: the latest). Ends the answer if they close it.
+        """
+        if self.end or not self.pause_reported or pause_at_ms not in (None, self.pause_at_ms):
+            # Candidate started talking again while we were transcribing
+            return None
+        intent = classify_answer_end(transcript)
+        if intent.label == "done" and intent.confidence >= INTENT_MIN_CONFIDENCE:
+            print(f"[INFO] Closing phrase spotted ({intent.matched[-1]}) at {self.elapsed_ms}ms")
+            return self._finish("keyword")
+        return None
+
+    def hangup(self) -> AnswerEvent:
+        return self.end or self._finish("hangup")
+
+    def _finish(self, reason: str) -> AnswerEvent:
+        self.end = AnswerEvent("end", reason, self.elapsed_ms)
+        return self.end
+
+    def tail(self, seconds: float = ANSWER_SPOT_TAIL_SECONDS) -> bytes:
+        """The last `seconds` of audio up to the current pause (for keyword spotting)."""
+        speech_end = len(self.audio) - self.silence_ms * SAMPLE_RATE // 1000
+        start = max(0, speech_end - int(seconds * SAMPLE_RATE))
+        return bytes(self.audio[start:])
+
+    def speech_seconds(self) -> int:
+        """Answer length without the trailing silence (what Record's trim-silence kept)."""
+        return max(0, self.elapsed_ms - self.silence_ms) // 1000
+
+def ulaw_to_wav(ulaw: bytes) -> bytes:
+    """8 kHz μ-law -> 16-bit PCM WAV, which Whisper accepts."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(ulaw_decode(ulaw).tobytes())
+    return buf.getvalue()
+
+def transcribe_tail(ulaw: bytes, timeout: float = ANSWER_SPOT_TIMEOUT_SECONDS) -> str:
+    """Short, no-retry transcription for keyword spotting; "" if it fails or isn't configured."""
+    if ANSWER_KEYWORD_SPOTTING != "on" or not provider.available or not ulaw:
+        return ""
+    audio_file = io.BytesIO(ulaw_to_wav(ulaw))
+    audio_file.name = "tail.wav"
+    try:
+        return provider.transcribe("spot_answer_end", audio_file, model="whisper-1", timeout=timeout, max_retries=0, language="ja")
+    except LLMError:
+        return ""
+
+def read_ulaw(path: str) -> bytes:
+    """
+    Load a recorded fixture as 8 kHz μ-law: raw .ulaw/.raw files as they are,
+    .wav files either μ-law or 16-bit PCM at 8 kHz.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(b"RIFF"):
+        return data
+    # The wave module can't read μ-law (format 7), so walk the chunks
+    fmt, pos, body = None, 12, b""
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], int.from_bytes(data[pos + 4:pos + 8], "little")
+        chunk = data[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = (int.from_bytes(chunk[0:2], "little"), int.from_bytes(chunk[2:4], "little"),
+                   int.from_bytes(chunk[4:8], "little"), int.from_bytes(chunk[14:16], "little"))
+        elif chunk_id == b"data":
+            body = chunk
+        pos += 8 + size + size % 2
+    if not fmt or fmt[1] != 1 or fmt[2] != SAMPLE_RATE:
+        raise ValueError(f"{path}: expected mono 8 kHz audio, got {fmt}")
+    if fmt[0] == 7:
+        return body
+    if fmt[0] == 1 and fmt[3] == 16:
+        return ulaw_encode(body).tobytes()
+    raise ValueError(f"{path}: unsupported WAV format {fmt}")
+
+def replay(detector: AnswerEndDetector, payloads: Iterable[bytes], spot: Callable[[bytes], str] = None) -> AnswerEvent:
+    """
+    Run a recording through the detector the way /voice/stream does, with
+    `spot` (tail audio -> transcript) called inline at each pause. Returns
+    the end event ("hangup" if the audio ran out first).
+    """
+    for payload in payloads:
+        event = detector.feed(payload)
+        if event and event.kind == "pause" and spot:
+            event = detector.spotted(spot(detector.tail()))
+        if detector.finished:
+            break
+    return detector.hangup()
@@ -0,0 +1,129 @@
+import os
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+# Environment Variables
+VAD_THRESHOLD = int(os.environ.get("VAD_THRESHOLD", "600")) # RMS of 16-bit PCM
+# Frames in a row above the threshold before it counts as speech (clicks, breath)
+VAD_ONSET_FRAMES = int(os.environ.get("VAD_ONSET_FRAMES", "2"))
+# Frames still counted as speech after the energy drops (bridges short dips between syllables)
+VAD_HANGOVER_FRAMES = int(os.environ.get("VAD_HANGOVER_FRAMES", "5"))
+
+# Twilio Media Streams: 8 kHz μ-law, one byte per sample, 20 ms per frame
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000
+
+Buffer = Union[bytes, bytearray, memoryview, np.ndarray]
+
+# --- G.711 μ-law codec as lookup tables ---
+# Bit-exact with audioop.ulaw2lin / lin2ulaw (which Python 3.13 removes).
+
+def _build_decode_table() -> np.ndarray:
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + 0x84) << ((u & 0x70) >> 4)
+    return np.where(u & 0x80, 0x84 - t, t - 0x84).astype("<i2")
+
+def _build_encode_table() -> np.ndarray:
+    pcm = np.arange(-32768, 32768, dtype=np.int32)
+    val = pcm >> 2 # 14-bit
+    mask = np.where(val < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(val), 8159) + 33
+    seg = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), mag)
+    uval = np.where(seg >= 8, 0x7F, (seg << 4) | ((mag >> np.minimum(seg + 1, 8)) & 0x0F))
+    table = np.empty(65536, dtype=np.uint8)
+    table[pcm.astype(np.int16).view(np.uint16)] = uval ^ mask
+    return table
+
+ULAW_TO_PCM = _build_decode_table() # 256 x int16
+PCM_TO_ULAW = _build_encode_table() # 65536 x uint8, indexed by the sample's bits as uint16
+# Squared sample per μ-law byte: frame energy straight from the encoded bytes
+ULAW_ENERGY = ULAW_TO_PCM.astype(np.float64) ** 2
+
+# take(..., mode="clip") throughout: indices are always in range, and the
+# default "raise" copies through a temporary when given `out`
+
+def _as_ulaw(ulaw: Buffer) -> np.ndarray:
+    return ulaw if isinstance(ulaw, np.ndarray) else np.frombuffer(ulaw, dtype=np.uint8)
+
+def ulaw_decode(ulaw: Buffer, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """μ-law bytes -> int16 samples. Pass `out` to reuse a buffer."""
+    return np.take(ULAW_TO_PCM, _as_ulaw(ulaw), out=out, mode="clip")
+
+def ulaw_encode(pcm: Buffer, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """int16 samples (array or little-endian bytes) -> μ-law bytes as uint8."""
+    samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype="<i2")
+    return np.take(PCM_TO_ULAW, samples.astype(np.int16, copy=False).view(np.uint16), out=out, mode="clip")
+
+def frame_rms(ulaw: Buffer, frame_bytes: int = FRAME_BYTES) -> np.ndarray:
+    """
+    RMS per frame of a μ-law buffer (any whole number of frames), or of a
+    (streams, frame_bytes) array holding one frame from each of many calls.
+    A trailing partial frame is ignored.
+    """
+    data = _as_ulaw(ulaw)
+    if data.ndim == 1:
+        n = len(data) // frame_bytes
+        data = data[:n * frame_bytes].reshape(n, frame_bytes)
+    return np.sqrt(ULAW_ENERGY[data].mean(axis=1))
+
+class EnergyVAD:
+    """
+    Energy VAD for one stream with onset and hangover smoothing. Frames are
+    speech once `onset` in a row exceed the threshold, and stay speech for
+    `hangover` frames after the energy drops. State carries across calls,
+    so feeding a call 20 ms at a time or a second at a time decides the same.
+
+    push() is the per-frame path (a reused scratch buffer, no arrays built);
+    process() decides a whole buffer of frames at once with vectorized ops.
+    """
+    def __init__(self, threshold: float = VAD_THRESHOLD, onset: int = VAD_ONSET_FRAMES, hangover: int = VAD_HANGOVER_FRAMES, frame_bytes: int = FRAME_BYTES):
+        self.threshold = threshold
+        self.onset = onset
+        self.hangover = hangover
+        self.frame_bytes = frame_bytes
+        # Compare energy sums, not RMS: no sqrt / divide per frame
+        self._energy_threshold = threshold * threshold * frame_bytes
+        self._scratch = np.empty(frame_bytes, dtype=np.float64)
+        self.run = 0 # consecutive frames above the threshold
+        self.since_onset = hangover + 1 # frames since the last frame that had `onset` behind it
+        self.rms = 0.0 # of the last frame
+
+    def push(self, frame: Buffer) -> bool:
+        """One frame -> is it speech."""
+        np.take(ULAW_ENERGY, _as_ulaw(frame), out=self._scratch, mode="clip")
+        energy = self._scratch.sum()
+        self.rms = (energy / self.frame_bytes) ** 0.5
+        if energy > self._energy_threshold:
+            self.run += 1
+        else:
+            self.run = 0
+        if self.run >= self.onset:
+            self.since_onset = 0
+        else:
+            self.since_onset += 1
+        return self.since_onset <= self.hangover
+
+    def process(self, ulaw: Buffer) -> np.ndarray:
+        """Whole frames of a buffer -> bool speech decision per frame."""
+        rms = frame_rms(ulaw, self.frame_bytes)
+        n = len(rms)
+        if not n:
+            return np.zeros(0, dtype=bool)
+        loud = rms > self.threshold
+        pos = np.arange(n)
+        # Length of the loud run ending at each frame, continuing the previous call's run
+        last_quiet = np.maximum.accumulate(np.where(loud, -1, pos))
+        run = np.where(last_quiet < 0, pos + 1 + self.run, pos - last_quiet)
+        onset = run >= self.onset
+        last_onset = np.maximum.accumulate(np.where(onset, pos, -1))
+        since = np.where(last_onset < 0, pos + 1 + self.since_onset, pos - last_onset)
+        self.run = int(run[-1]) if loud[-1] else 0
+        self.since_onset = int(since[-1])
+        self.rms = float(rms[-1])
+        return since <= self.hangover
+
+def frames(ulaw: bytes, size: int = FRAME_BYTES) -> Iterator[bytes]:
+    for offset in range(0, len(ulaw), size):
+        yield ulaw[offset:offset + size]
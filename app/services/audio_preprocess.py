@@ -0,0 +1,198 @@
+import io
+import os
+import struct
+import wave
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from app.services.audio import FRAME_MS, SAMPLE_RATE, EnergyVAD, ulaw_decode, ulaw_encode
+
+# Environment Variables
+STT_PREPROCESS = os.environ.get("STT_PREPROCESS", "on") # "off": upload recordings exactly as Twilio serves them
+# Audio kept before the first and after the last speech frame, so word edges aren't clipped
+STT_TRIM_PAD_MS = int(os.environ.get("STT_TRIM_PAD_MS", "300"))
+# "ulaw": 8-bit G.711 WAV, half the size of PCM and lossless for phone audio (it was μ-law on the line). "pcm16": 16-bit WAV.
+STT_UPLOAD_ENCODING = os.environ.get("STT_UPLOAD_ENCODING", "ulaw")
+# Whisper works at 16 kHz: anything recorded above is downsampled, anything below is left as is
+STT_MAX_SAMPLE_RATE = int(os.environ.get("STT_MAX_SAMPLE_RATE", "16000"))
+# Answers longer than this are cut at pauses into pieces transcribed in parallel. 0: never cut
+STT_CHUNK_SECONDS = float(os.environ.get("STT_CHUNK_SECONDS", "30"))
+# No piece is cut shorter than this (except the last): too little context hurts accuracy
+STT_CHUNK_MIN_SECONDS = float(os.environ.get("STT_CHUNK_MIN_SECONDS", "10"))
+
+# A pause at least this long is a sentence break: safe to cut at without losing context
+CUT_PAUSE_MS = 500
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_MULAW = 7
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class AudioChunk(NamedTuple):
+    start: float # seconds from the start of the original audio
+    end: float
+    data: bytes # WAV to upload
+
+class PreparedAudio(NamedTuple):
+    chunks: List[AudioChunk] # in order; empty if no speech was found
+    original_bytes: int
+    original_seconds: float
+    seconds: float # total length of the chunks
+    speech_ratio: float # share of the original frames the VAD counted as speech
+    trimmed_seconds: float # original_seconds - seconds
+
+    @property
+    def upload_bytes(self) -> int:
+        return sum(len(chunk.data) for chunk in self.chunks)
+
+def read_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    WAV bytes -> (int16 samples shaped (frames, channels), sample rate).
+    Reads 16-bit and 8-bit PCM and μ-law; the wave module can't read μ-law
+    (format 7), so the chunks are walked by hand.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a WAV file")
+    fmt, body, pos = None, None, 12
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], int.from_bytes(data[pos + 4:pos + 8], "little")
+        chunk = data[pos + 8:pos + 8 + size] # a streamed WAV may declare more data than it has
+        if chunk_id == b"fmt ":
+            tag, channels, rate = struct.unpack_from("<HHI", chunk, 0)
+            bits = struct.unpack_from("<H", chunk, 14)[0]
+            if tag == WAVE_FORMAT_EXTENSIBLE and len(chunk) >= 26:
+                tag = struct.unpack_from("<H", chunk, 24)[0] # first two bytes of the sub-format GUID
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            body = chunk
+            break
+        pos += 8 + size + size % 2
+    if fmt is None or body is None:
+        raise ValueError("WAV without fmt/data chunk")
+    tag, channels, rate, bits = fmt
+    if not channels or not rate:
+        raise ValueError(f"bad WAV format {fmt}")
+    if tag == WAVE_FORMAT_PCM and bits == 16:
+        samples = np.frombuffer(body[:len(body) // 2 * 2], dtype="<i2")
+    elif tag == WAVE_FORMAT_PCM and bits == 8:
+        samples = ((np.frombuffer(body, dtype=np.uint8).astype(np.int16) - 128) << 8)
+    elif tag == WAVE_FORMAT_MULAW and bits == 8:
+        samples = ulaw_decode(body)
+    else:
+        raise ValueError(f"unsupported WAV format {fmt}")
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels), rate
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """(frames, channels) -> mono int16."""
+    if samples.ndim == 1 or samples.shape[1] == 1:
+        return samples.reshape(-1)
+    return samples.mean(axis=1).astype(np.int16)
+
+def speech_frames(pcm: np.ndarray, rate: int) -> np.ndarray:
+    """
+    Mono int16 -> bool speech decision per FRAME_MS frame, from
+    EnergyVAD.process: the same detector (and threshold) the live calls
+    use, run on the whole buffer at once.
+    """
+    return EnergyVAD(frame_bytes=rate * FRAME_MS // 1000).process(ulaw_encode(pcm))
+
+def speech_bounds(speech: np.ndarray, frame: int, length: int, pad: int) -> Tuple[int, int]:
+    """Sample range from the first to the last speech frame, `pad` samples wider either side."""
+    first = int(np.argmax(speech))
+    last = len(speech) - 1 - int(np.argmax(speech[::-1]))
+    return max(0, first * frame - pad), min(length, (last + 1) * frame + pad)
+
+def split_points(speech: np.ndarray, frame: int, start: int, end: int, max_len: int, min_len: int) -> List[int]:
+    """
+    Sample offsets [start, ..., end] cutting start..end into pieces of at
+    most `max_len` samples, as few as possible. Each cut goes in the middle
+    of the last sentence break (CUT_PAUSE_MS) that leaves the piece at
+    least `min_len` long, else of the longest shorter pause; with no pause
+    in reach, the piece is cut at `max_len`.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], (~speech).astype(np.int8), [0]))))
+    # Pauses as (middle sample, length in frames)
+    middles = (edges[0::2] + edges[1::2]) * frame // 2
+    lengths = edges[1::2] - edges[0::2]
+    points = [start]
+    while end - points[-1] > max_len:
+        pos = points[-1]
+        reach = (middles >= pos + min_len) & (middles <= pos + max_len)
+        breaks = reach & (lengths * FRAME_MS >= CUT_PAUSE_MS)
+        if breaks.any():
+            points.append(int(middles[breaks][-1]))
+        elif reach.any():
+            points.append(int(middles[reach][np.argmax(lengths[reach])]))
+        else:
+            points.append(pos + max_len)
+    points.append(end)
+    return points
+
+def resample(pcm: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """
+    Band-limited resampling of mono int16: the spectrum is cut off at the
+    new Nyquist frequency (an ideal low-pass), so downsampling doesn't alias.
+    """
+    if src_rate == dst_rate or not len(pcm):
+        return pcm
+    n = len(pcm)
+    m = max(1, round(n * dst_rate / src_rate))
+    out = np.fft.irfft(np.fft.rfft(pcm.astype(np.float64)), m) * (m / n)
+    return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+def encode_wav(pcm: np.ndarray, rate: int, encoding: str = STT_UPLOAD_ENCODING) -> bytes:
+    """Mono int16 -> WAV bytes, μ-law ("ulaw") or 16-bit PCM ("pcm16")."""
+    if encoding == "pcm16":
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(pcm.astype("<i2", copy=False).tobytes())
+        return buf.getvalue()
+    if encoding != "ulaw":
+        raise ValueError(f"unknown STT_UPLOAD_ENCODING: {encoding}")
+    body = ulaw_encode(pcm).tobytes()
+    # Non-PCM formats carry cbSize in fmt and a fact chunk with the sample count
+    fmt = struct.pack("<HHIIHHH", WAVE_FORMAT_MULAW, 1, rate, rate, 1, 8, 0)
+    fact = struct.pack("<I", len(body))
+    riff_size = 4 + (8 + len(fmt)) + (8 + len(fact)) + (8 + len(body) + len(body) % 2)
+    return b"".join([
+        b"RIFF", struct.pack("<I", riff_size), b"WAVE",
+        b"fmt ", struct.pack("<I", len(fmt)), fmt,
+        b"fact", struct.pack("<I", len(fact)), fact,
+        b"data", struct.pack("<I", len(body)), body, b"\0" * (len(body) % 2),
+    ])
+
+def prepare_pcm(samples: np.ndarray, rate: int, original_bytes: int, chunk_seconds: float = STT_CHUNK_SECONDS) -> PreparedAudio:
+    """
+    Downmix, trim silence at both ends, split what's left at pauses into
+    pieces of at most `chunk_seconds`, cap the sample rate and re-encode
+    each piece for upload.
+    """
+    pcm = downmix(samples)
+    original_seconds = len(pcm) / rate
+    frame = rate * FRAME_MS // 1000
+    speech = speech_frames(pcm, rate)
+    if not speech.any():
+        return PreparedAudio([], original_bytes, original_seconds, 0.0, 0.0, original_seconds)
+    start, end = speech_bounds(speech, frame, len(pcm), rate * STT_TRIM_PAD_MS // 1000)
+    if chunk_seconds > 0:
+        points = split_points(speech, frame, start, end, int(chunk_seconds * rate), int(min(STT_CHUNK_MIN_SECONDS, chunk_seconds) * rate))
+    else:
+        points = [start, end]
+    upload_rate = min(rate, STT_MAX_SAMPLE_RATE)
+    chunks = [AudioChunk(a / rate, b / rate, encode_wav(resample(pcm[a:b], rate, upload_rate), upload_rate))
+              for a, b in zip(points, points[1:])]
+    seconds = (end - start) / rate
+    return PreparedAudio(chunks, original_bytes, original_seconds, seconds, float(speech.mean()), original_seconds - seconds)
+
+def prepare_wav(data: bytes, chunk_seconds: float = STT_CHUNK_SECONDS) -> PreparedAudio:
+    """A downloaded recording -> PreparedAudio. Raises ValueError if it can't be decoded."""
+    samples, rate = read_wav(data)
+    return prepare_pcm(samples, rate, len(data), chunk_seconds)
+
+def prepare_ulaw(ulaw: bytes, chunk_seconds: float = STT_CHUNK_SECONDS) -> PreparedAudio:
+    """Raw 8 kHz μ-law (a streamed answer) -> PreparedAudio."""
+    return prepare_pcm(ulaw_decode(ulaw), SAMPLE_RATE, len(ulaw), chunk_seconds)
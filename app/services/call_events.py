@@ -0,0 +1,179 @@
+import html
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import CallEvent, Interview
+
+# Environment Variables
+CALL_EVENTS = os.environ.get("CALL_EVENTS", "on") # "off": record nothing
+CALL_EVENTS_FLUSH_SECONDS = float(os.environ.get("CALL_EVENTS_FLUSH_SECONDS", "1.0"))
+# Events held in memory at most; beyond this the oldest are dropped (DB down for a long time)
+CALL_EVENTS_MAX_BUFFER = int(os.environ.get("CALL_EVENTS_MAX_BUFFER", "50000"))
+
+class CallEventLog:
+    """
+    Append-only log of what happened during each call, for debugging.
+
+    record() only appends to an in-memory list, so webhooks pay no commit
+    for it; a flusher thread writes everything buffered with one multi-row
+    INSERT every CALL_EVENTS_FLUSH_SECONDS, and once more on shutdown.
+    Events carry the time they were recorded, so batching doesn't change
+    the timeline. Best effort: a flush that fails on the DB connection is
+    retried next tick, and a crash loses at most one interval of events.
+    Events for an interview that doesn't exist (a bogus interview_id, a
+    status callback arriving after retention cleanup) violate the foreign
+    key; they are dropped and counted as orphaned, never retried.
+    """
+    def __init__(self, enabled: bool = CALL_EVENTS != "off", flush_interval: float = CALL_EVENTS_FLUSH_SECONDS, max_buffer: int = CALL_EVENTS_MAX_BUFFER):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.recorded = 0
+        self.dropped = 0
+        self.orphaned = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def start(self):
+        if self._thread or not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._run, name="call-events-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def record(self, interview_id: Optional[int], kind: str, call_sid: str = None, **detail):
+        if not self.enabled or interview_id is None:
+            return
+        event = {"interview_id": interview_id, "kind": kind, "call_sid": call_sid, "detail": detail, "at": datetime.utcnow()}
+        with self._lock:
+            self._buffer.append(event)
+            self.recorded += 1
+            if len(self._buffer) > self.max_buffer:
+                overflow = len(self._buffer) - self.max_buffer
+                del self._buffer[:overflow]
+                self.dropped += overflow
+
+    def flush(self):
+        """Write everything buffered in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            try:
+                with Session(engine) as session:
+                    try:
+                        session.execute(insert(CallEvent), batch)
+                        session.commit()
+                    except IntegrityError:
+                        session.rollback()
+                        batch = self._drop_orphans(session, batch)
+                        if batch:
+                            session.execute(insert(CallEvent), batch)
+                        session.commit()
+            except Exception as e:
+                print(f"[ERROR] Call event flush failed ({len(batch)} events): {e}")
+                with self._lock:
+                    self._buffer[:0] = batch
+                return
+            self.flushes += 1
+            self.rows_written += len(batch)
+
+    def _drop_orphans(self, session: Session, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ids = {event["interview_id"] for event in batch}
+        existing = set(session.exec(select(Interview.id).where(Interview.id.in_(ids))).all())
+        kept = [event for event in batch if event["interview_id"] in existing]
+        orphaned = len(batch) - len(kept)
+        with self._lock:
+            self.orphaned += orphaned
+        print(f"[WARN] Dropped {orphaned} call events for missing interviews: {sorted(ids - existing)}")
+        return kept
+
+    def timeline(self, session: Session, interview_id: int) -> List[CallEvent]:
+        """Every event of one interview in order (pending events are flushed first)."""
+        self.flush()
+        return session.exec(select(CallEvent).where(CallEvent.interview_id == interview_id).order_by(CallEvent.at, CallEvent.id)).all()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._buffer),
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "orphaned": self.orphaned,
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+call_events = CallEventLog()
+
+# Twilio form fields worth keeping on a webhook_received event
+WEBHOOK_FIELDS = ("CallStatus", "AnsweredBy", "CallDuration", "SpeechResult", "Confidence", "Digits", "RecordingSid", "RecordingStatus", "RecordingDuration")
+# Event kind per webhook path; any other voice webhook is "webhook_received"
+# (recording callbacks: /recording_ready per answer, /recording_status for the whole stream-mode call)
+ROUTE_KINDS = {"/status": "status_callback", "/recording_ready": "recording_ready", "/recording_status": "recording_ready"}
+_TWIML_TARGET = re.compile(rb'<Redirect[^>]*>([^<]+)</Redirect>|action="([^"]+)"')
+
+def _twiml_targets(body: bytes) -> List[str]:
+    """Where the call goes next: every Redirect and action URL in the TwiML."""
+    return [html.unescape((redirect or action).decode()) for redirect, action in _TWIML_TARGET.findall(body)]
+
+class CallEventRoute(APIRoute):
+    """
+    route_class for the voice webhooks: records each request (with the
+    Twilio fields above) and the TwiML returned for it in call_events.
+    """
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        step = self.path_format
+        # From the path, not the form: /voice/record's action callback carries RecordingUrl too
+        kind = next((k for suffix, k in ROUTE_KINDS.items() if step.endswith(suffix)), "webhook_received")
+
+        async def route(request: Request) -> Response:
+            interview_id = request.query_params.get("interview_id")
+            if not call_events.enabled or not (interview_id or "").isdigit():
+                return await handler(request)
+            interview_id = int(interview_id)
+            form = await request.form() # cached on the request; the handler reads the same parsed form
+            detail = {k: v for k, v in request.query_params.items() if k != "interview_id"}
+            detail.update({k: form[k] for k in WEBHOOK_FIELDS if k in form})
+            call_sid = form.get("CallSid")
+            call_events.record(interview_id, kind, call_sid, step=step, **detail)
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+            except Exception as e:
+                call_events.record(interview_id, "webhook_error", call_sid, step=step, error=str(e))
+                raise
+            if response.media_type == "application/xml":
+                call_events.record(interview_id, "twiml_returned", call_sid, step=step, ms=round((time.perf_counter() - started) * 1000, 1),
+                                   bytes=len(response.body), next=_twiml_targets(response.body))
+            return response
+
+        return route
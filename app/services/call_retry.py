@@ -0,0 +1,77 @@
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Interview, CommunicationLog
+
+# Environment Variables
+CALL_MAX_RETRIES = int(os.environ.get("CALL_MAX_RETRIES", "3"))
+CALL_RETRY_BASE_SECONDS = int(os.environ.get("CALL_RETRY_BASE_SECONDS", "300"))
+CALL_RETRY_MAX_SECONDS = int(os.environ.get("CALL_RETRY_MAX_SECONDS", "3600"))
+# +/- fraction of the delay, so retries drift off the 00/30 booking slots
+CALL_RETRY_JITTER = float(os.environ.get("CALL_RETRY_JITTER", "0.3"))
+
+# Twilio CallStatus values meaning the candidate never picked up
+UNANSWERED_STATUSES = ("busy", "no-answer", "failed", "canceled")
+TERMINAL_STATUSES = ("completed",) + UNANSWERED_STATUSES
+# Interview statuses of a call that hasn't been answered yet. 'dialing' too: a
+# fast busy / failed callback can arrive before the dialer's create() returns
+RINGING_STATUSES = ("dialing", "calling")
+
+def retry_delay_seconds(attempt: int) -> float:
+    """Exponential backoff with jitter for the n-th retry (1-based)."""
+    delay = min(CALL_RETRY_MAX_SECONDS, CALL_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay * (1 + random.uniform(-CALL_RETRY_JITTER, CALL_RETRY_JITTER))
+
+def handle_call_status(session: Union[Session, AsyncSession], interview: Interview, call_status: str, call_sid: str = None, answered_by: str = None) -> Optional[datetime]:
+    """
+    Record a Twilio status callback and decide what happens to the interview.
+
+    - Unanswered (busy / no-answer / failed, or 'completed' before the call
+      ever reached /voice/call): back to 'scheduled' with a backed-off
+      reservation_time, so the redial goes through the normal due queue.
+      After CALL_MAX_RETRIES retries the interview is marked 'failed'.
+    - 'completed' while the interview was in progress: 'interrupted'.
+
+    Only interviews still in 'dialing' or 'calling' are rescheduled, so
+    duplicate callbacks leave the interview alone; the /voice/status handler
+    drops them before this is called (webhook receipt per CallSid and
+    status), so they don't add log rows either. The dialer's own 'dialing'
+    -> 'calling' update is conditional, so it never undoes a callback that
+    got here first. Returns the new reservation_time if a retry was
+    scheduled. Only adds objects to the session, so it works with either
+    Session or AsyncSession; the caller commits.
+    """
+    note = f"AnsweredBy: {answered_by}" if answered_by else None
+    retry_at = None
+
+    unanswered = call_status in UNANSWERED_STATUSES or call_status == "completed"
+    if interview.status in RINGING_STATUSES and unanswered:
+        if interview.retry_count < CALL_MAX_RETRIES:
+            interview.retry_count += 1
+            retry_at = datetime.utcnow() + timedelta(seconds=retry_delay_seconds(interview.retry_count))
+            interview.reservation_time = retry_at
+            interview.status = "scheduled"
+            note = f"Retry {interview.retry_count}/{CALL_MAX_RETRIES} at {retry_at:%Y-%m-%d %H:%M:%S} UTC"
+        else:
+            interview.status = "failed"
+            note = f"Gave up after {CALL_MAX_RETRIES} retries"
+        print(f"[INFO] Interview {interview.id}: call {call_status}. {note}")
+        session.add(interview)
+    elif interview.status == "in_progress" and call_status == "completed":
+        interview.status = "interrupted"
+        session.add(interview)
+
+    session.add(CommunicationLog(
+        candidate_id=interview.candidate_id,
+        type="voice_call",
+        direction="outbound",
+        status=call_status,
+        provider_message_id=call_sid,
+        error_message=note,
+    ))
+    return retry_at
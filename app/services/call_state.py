@@ -0,0 +1,323 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import engine, async_engine
+from app.models import Interview
+from app.services.call_events import call_events
+from app.services.twiml_cache import snapshot_hash
+
+# Environment Variables
+# "off": every read and write goes straight to the DB (safe with any number of web workers).
+# "memory": webhooks read/write an in-process copy, flushed in batches. Only for a
+# single web worker, or when Twilio webhooks for a call are routed to one worker:
+# other workers' writes don't invalidate the copy.
+CALL_STATE_CACHE = os.environ.get("CALL_STATE_CACHE", "off")
+CALL_STATE_TTL_SECONDS = int(os.environ.get("CALL_STATE_TTL_SECONDS", "1800"))
+CALL_STATE_FLUSH_SECONDS = float(os.environ.get("CALL_STATE_FLUSH_SECONDS", "0.2"))
+
+# Interview columns the voice webhooks read and write during a call
+STATE_FIELDS = ("candidate_id", "status", "current_stage", "session_snapshot", "reverse_qa_logs", "last_completed_q_id")
+# Written only through append_log(), merged into the row's current value
+APPEND_FIELDS = ("reverse_qa_logs",)
+
+def _logs_for_update(interview_id: int):
+    return select(Interview.reverse_qa_logs).where(Interview.id == interview_id).with_for_update()
+
+class CallState:
+    """Call-scoped view of one Interview row."""
+    __slots__ = STATE_FIELDS + ("interview_id", "snapshot_hash", "touched_at")
+
+    def __init__(self, interview: Interview):
+        self.interview_id = interview.id
+        for field in STATE_FIELDS:
+            setattr(self, field, getattr(interview, field))
+        self.snapshot_hash = snapshot_hash(self.session_snapshot) if self.session_snapshot else None
+        self.touched_at = time.monotonic()
+
+class CallStateCache:
+    """
+    Write-through cache of per-call interview state for the voice webhooks.
+
+    get() serves from memory and loads the row on a miss or after TTL.
+    update() changes the cached copy at once and queues the changed columns;
+    a flusher thread writes everything queued in one transaction every
+    CALL_STATE_FLUSH_SECONDS. durable=True writes before returning, for
+    changes other processes act on (e.g. status 'completed', which the
+    status callback reads). append_log() queues reverse Q&A entries that
+    are appended to the row's current list when flushed (read under a row
+    lock), so an entry another process wrote is never overwritten.
+
+    The DB stays the source of truth: nothing is kept that isn't queued for
+    it, pending writes are flushed on shutdown, and after a restart state is
+    simply reloaded. The cached copies are per process (CallState objects
+    changed in place) and nothing invalidates them when another process
+    writes, which is why CALL_STATE_CACHE=memory is for a single web worker.
+
+    Async handlers use aget()/aupdate(): misses load, and one interview's
+    writes are flushed, on the event loop through the handler's AsyncSession
+    (or a new one). Only the background batch flush, and a durable write
+    that finds it mid-batch, run in a worker thread so the event loop
+    never waits on the DB.
+    """
+    def __init__(
+        self,
+        enabled: bool = CALL_STATE_CACHE != "off",
+        ttl: int = CALL_STATE_TTL_SECONDS,
+        flush_interval: float = CALL_STATE_FLUSH_SECONDS,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._states: Dict[int, CallState] = {}
+        self._dirty: Dict[int, Dict[str, Any]] = {}
+        self._appends: Dict[int, List[dict]] = {}
+        self._lock = threading.RLock()
+        # Serialises flushes so an older batch can never commit over a newer one
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.loads = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def start(self):
+        if self._thread or not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._run, name="call-state-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Flush everything still queued; called on shutdown."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def get(self, interview_id: int) -> Optional[CallState]:
+        state = self._cached(interview_id)
+        if state is not None:
+            return state
+        with Session(engine) as session:
+            return self._remember(interview_id, session.get(Interview, interview_id))
+
+    async def aget(self, interview_id: int, session: AsyncSession = None) -> Optional[CallState]:
+        state = self._cached(interview_id)
+        if state is not None:
+            return state
+        if session is not None:
+            return self._remember(interview_id, await session.get(Interview, interview_id))
+        async with AsyncSession(async_engine) as session:
+            return self._remember(interview_id, await session.get(Interview, interview_id))
+
+    def update(self, interview_id: int, durable: bool = False, **fields) -> Optional[CallState]:
+        state = self._apply(self.get(interview_id), fields)
+        if state is not None and (durable or not self.enabled):
+            self.flush(interview_id)
+        return state
+
+    async def aupdate(self, interview_id: int, durable: bool = False, session: AsyncSession = None, **fields) -> Optional[CallState]:
+        state = self._apply(await self.aget(interview_id, session), fields)
+        if state is not None and (durable or not self.enabled):
+            await self.aflush(interview_id, session)
+        return state
+
+    def append_log(self, interview_id: int, entry: dict, durable: bool = False) -> Optional[CallState]:
+        state = self._append(self.get(interview_id), entry)
+        if state is not None and (durable or not self.enabled):
+            self.flush(interview_id)
+        return state
+
+    async def aappend_log(self, interview_id: int, entry: dict, durable: bool = False, session: AsyncSession = None) -> Optional[CallState]:
+        state = self._append(await self.aget(interview_id, session), entry)
+        if state is not None and (durable or not self.enabled):
+            await self.aflush(interview_id, session)
+        return state
+
+    def _append(self, state: Optional[CallState], entry: dict) -> Optional[CallState]:
+        if state is None:
+            return None
+        with self._lock:
+            state.reverse_qa_logs = list(state.reverse_qa_logs or []) + [entry]
+            self._appends.setdefault(state.interview_id, []).append(entry)
+        return state
+
+    def _apply(self, state: Optional[CallState], fields: Dict[str, Any]) -> Optional[CallState]:
+        unknown = set(fields) - set(STATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Not call state: {', '.join(sorted(unknown))}")
+        appended = set(fields) & set(APPEND_FIELDS)
+        if appended:
+            raise ValueError(f"Use append_log() for: {', '.join(sorted(appended))}")
+        if state is None:
+            return None
+        with self._lock:
+            for field, value in fields.items():
+                setattr(state, field, value)
+            if "session_snapshot" in fields:
+                state.snapshot_hash = snapshot_hash(state.session_snapshot) if state.session_snapshot else None
+            self._dirty.setdefault(state.interview_id, {}).update(fields)
+        stage = {k: fields[k] for k in ("status", "current_stage") if k in fields}
+        if stage:
+            call_events.record(state.interview_id, "stage", **stage)
+        return state
+
+    def evict(self, interview_id: int):
+        """Drop the cached copy (after flushing it), e.g. once the call is over."""
+        self.flush(interview_id)
+        with self._lock:
+            self._states.pop(interview_id, None)
+
+    def flush(self, interview_id: int = None):
+        """Write queued changes (all, or one interview's) in a single transaction."""
+        with self._flush_lock:
+            self._flush(interview_id)
+
+    async def aflush(self, interview_id: int = None, session: AsyncSession = None):
+        """
+        flush() for async handlers. One interview's changes are written on the
+        event loop through `session` (committing it) or a new AsyncSession.
+        Flushing everything, or while the background flusher holds the flush
+        lock, goes to a worker thread instead of blocking the loop on it.
+        """
+        if interview_id is None or not self._flush_lock.acquire(blocking=False):
+            await asyncio.to_thread(self.flush, interview_id)
+            return
+        try:
+            batch, appends = self._take(interview_id)
+            if not batch and not appends:
+                return
+            try:
+                if session is not None:
+                    await self._awrite(session, batch, appends)
+                else:
+                    async with AsyncSession(async_engine) as session:
+                        await self._awrite(session, batch, appends)
+            except Exception as e:
+                if session is not None:
+                    await session.rollback()
+                self._requeue(batch, appends, e)
+                return
+            self._written(batch, appends)
+        finally:
+            self._flush_lock.release()
+
+    async def aevict(self, interview_id: int, session: AsyncSession = None):
+        await self.aflush(interview_id, session)
+        with self._lock:
+            self._states.pop(interview_id, None)
+
+    def _flush(self, interview_id: int = None):
+        batch, appends = self._take(interview_id)
+        if not batch and not appends:
+            return
+        try:
+            with Session(engine) as session:
+                for iid, values in batch.items():
+                    session.execute(update(Interview).where(Interview.id == iid).values(**values))
+                for iid, entries in appends.items():
+                    # Merge with the row as it is now, not with this process's copy of it
+                    current = session.execute(_logs_for_update(iid)).scalar_one_or_none()
+                    session.execute(update(Interview).where(Interview.id == iid).values(reverse_qa_logs=list(current or []) + entries))
+                session.commit()
+        except Exception as e:
+            self._requeue(batch, appends, e)
+            return
+        self._written(batch, appends)
+
+    async def _awrite(self, session: AsyncSession, batch: Dict[int, Dict[str, Any]], appends: Dict[int, List[dict]]):
+        for iid, values in batch.items():
+            await session.execute(update(Interview).where(Interview.id == iid).values(**values).execution_options(synchronize_session=False))
+        for iid, entries in appends.items():
+            current = (await session.execute(_logs_for_update(iid))).scalar_one_or_none()
+            await session.execute(
+                update(Interview).where(Interview.id == iid).values(reverse_qa_logs=list(current or []) + entries)
+                .execution_options(synchronize_session=False)
+            )
+        await session.commit()
+
+    def _take(self, interview_id: int = None):
+        """Queued changes (all, or one interview's), removed from the queue."""
+        with self._lock:
+            if interview_id is None:
+                batch, self._dirty = self._dirty, {}
+                appends, self._appends = self._appends, {}
+            else:
+                batch = {interview_id: self._dirty.pop(interview_id)} if interview_id in self._dirty else {}
+                appends = {interview_id: self._appends.pop(interview_id)} if interview_id in self._appends else {}
+        return batch, appends
+
+    def _requeue(self, batch: Dict[int, Dict[str, Any]], appends: Dict[int, List[dict]], error: Exception):
+        print(f"[ERROR] Call state flush failed ({len(set(batch) | set(appends))} interviews): {error}")
+        # Put the batch back underneath anything written since, and retry next tick
+        with self._lock:
+            for iid, values in batch.items():
+                values.update(self._dirty.get(iid, {}))
+                self._dirty[iid] = values
+            for iid, entries in appends.items():
+                self._appends[iid] = entries + self._appends.get(iid, [])
+
+    def _written(self, batch: Dict[int, Dict[str, Any]], appends: Dict[int, List[dict]]):
+        with self._lock:
+            self.flushes += 1
+            self.rows_written += len(set(batch) | set(appends))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "cached": len(self._states),
+                "pending": len(set(self._dirty) | set(self._appends)),
+                "hits": self.hits,
+                "loads": self.loads,
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+            }
+
+    def _cached(self, interview_id: int) -> Optional[CallState]:
+        with self._lock:
+            state = self._states.get(interview_id)
+            if state is not None and (interview_id in self._dirty or interview_id in self._appends or time.monotonic() - state.touched_at < self.ttl):
+                state.touched_at = time.monotonic()
+                self.hits += 1
+                return state
+        return None
+
+    def _remember(self, interview_id: int, interview: Optional[Interview]) -> Optional[CallState]:
+        if interview is None:
+            return None
+        state = CallState(interview)
+        self.loads += 1
+        if not self.enabled:
+            return state
+        with self._lock:
+            # Another request may have loaded (and changed) it meanwhile; keep theirs
+            current = self._states.get(interview_id)
+            if current is not None and (interview_id in self._dirty or interview_id in self._appends):
+                return current
+            self._states[interview_id] = state
+        return state
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            for iid in [iid for iid, s in list(self._states.items()) if s.touched_at < cutoff and iid not in self._dirty and iid not in self._appends]:
+                self._states.pop(iid, None)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            self._expire()
+
+call_state = CallStateCache()
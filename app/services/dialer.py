@@ -0,0 +1,216 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.services.notification import make_outbound_call
+
+# Environment Variables
+DIAL_WORKERS = int(os.environ.get("DIAL_WORKERS", "8"))
+# Twilio accounts default to 1 outbound call per second (CPS)
+DIAL_CALLS_PER_SECOND = float(os.environ.get("DIAL_CALLS_PER_SECOND", "1"))
+DIAL_BURST = int(os.environ.get("DIAL_BURST", "1"))
+DIAL_MAX_ACTIVE_CALLS = int(os.environ.get("DIAL_MAX_ACTIVE_CALLS", "20"))
+DIAL_QUEUE_SIZE = int(os.environ.get("DIAL_QUEUE_SIZE", "500"))
+# Safety net: forget an active call after this long if no status callback arrives
+DIAL_ACTIVE_CALL_TIMEOUT = int(os.environ.get("DIAL_ACTIVE_CALL_TIMEOUT", "1800"))
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class DialJob:
+    __slots__ = ("interview_id", "phone", "due_at", "enqueued_at")
+
+    def __init__(self, interview_id: int, phone: str, due_at: Optional[datetime] = None):
+        self.interview_id = interview_id
+        self.phone = phone
+        self.due_at = due_at
+        self.enqueued_at = time.monotonic()
+
+class DialDispatcher:
+    """
+    Places due calls in parallel on a bounded worker pool.
+
+    - calls_per_second: token bucket shared by all workers (Twilio CPS limit)
+    - max_active_calls: cap on calls we have placed that haven't ended yet.
+      A slot is freed by release() (status callback), by active_probe (which
+      reports which of our calls are still active, e.g. from the DB, so calls
+      ended in another process are noticed), or after active_call_timeout.
+    - on_result(interview_id, call_sid or None) runs on the worker thread.
+    - before_dial(interview_id) is asked right before each call is placed;
+      False drops the job (e.g. the interview was handed to another
+      process's dialer), without on_result.
+    - twilio_client is passed through to make_outbound_call; pass a fake to
+      run without Twilio.
+    """
+    def __init__(
+        self,
+        on_result: Callable[[int, Optional[str]], None] = None,
+        twilio_client=None,
+        workers: int = DIAL_WORKERS,
+        calls_per_second: float = DIAL_CALLS_PER_SECOND,
+        burst: int = DIAL_BURST,
+        max_active_calls: int = DIAL_MAX_ACTIVE_CALLS,
+        queue_size: int = DIAL_QUEUE_SIZE,
+        active_call_timeout: int = DIAL_ACTIVE_CALL_TIMEOUT,
+        active_probe: Callable[[List[int]], List[int]] = None,
+        before_dial: Callable[[int], bool] = None,
+    ):
+        self.on_result = on_result
+        self.twilio_client = twilio_client
+        self.workers = workers
+        self.max_active_calls = max_active_calls
+        self.active_call_timeout = active_call_timeout
+        self.active_probe = active_probe
+        self.before_dial = before_dial
+        self._bucket = TokenBucket(calls_per_second, burst)
+        self._queue: "queue.Queue[DialJob]" = queue.Queue(maxsize=queue_size)
+        self._active: Dict[int, float] = {}
+        self._active_cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {"dispatched": 0, "failed": 0, "dropped": 0, "last_lag_seconds": 0.0, "max_lag_seconds": 0.0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"dialer-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[INFO] Dialer started: {self.workers} workers, {self._bucket.rate} calls/s, max {self.max_active_calls} active calls")
+
+    def join(self):
+        """Block until every submitted job has been dialed (tests/benchmarks)."""
+        self._queue.join()
+
+    # --- Producer side ---
+
+    def free_capacity(self) -> int:
+        return self._queue.maxsize - self._queue.qsize()
+
+    def submit(self, interview_id: int, phone: str, due_at: Optional[datetime] = None):
+        self._queue.put(DialJob(interview_id, phone, due_at))
+
+    def drain(self) -> int:
+        """Drop every job not picked up by a worker yet (leadership lost). Returns how many."""
+        dropped = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            dropped += 1
+        if dropped:
+            with self._stats_lock:
+                self._stats["dropped"] += dropped
+            print(f"[WARN] Dialer: dropped {dropped} queued dials")
+        return dropped
+
+    def release(self, interview_id: int):
+        """Free the active-call slot held by this interview's call, if any."""
+        with self._active_cond:
+            if self._active.pop(interview_id, None) is not None:
+                self._active_cond.notify()
+
+    # --- Metrics ---
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._active_cond:
+            stats["active_calls"] = len(self._active)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["max_active_calls"] = self.max_active_calls
+        stats["calls_per_second"] = self._bucket.rate
+        return stats
+
+    # --- Workers ---
+
+    def _expire_active(self):
+        # Called with _active_cond held
+        now = time.monotonic()
+        for interview_id, started in list(self._active.items()):
+            if now - started > self.active_call_timeout:
+                print(f"[WARN] Dialer: no status for Interview {interview_id} after {self.active_call_timeout}s, freeing slot")
+                del self._active[interview_id]
+        if self.active_probe and len(self._active) >= self.max_active_calls:
+            try:
+                still_active = set(self.active_probe(list(self._active)))
+            except Exception as e:
+                print(f"[ERROR] Dialer active probe failed: {e}")
+                return
+            for interview_id in list(self._active):
+                if interview_id not in still_active:
+                    del self._active[interview_id]
+
+    def _acquire_slot(self, interview_id: int):
+        with self._active_cond:
+            while True:
+                self._expire_active()
+                if len(self._active) < self.max_active_calls:
+                    self._active[interview_id] = time.monotonic()
+                    return
+                self._active_cond.wait(timeout=5)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._dial(job)
+            except Exception as e:
+                print(f"[ERROR] Dialer worker error for Interview {job.interview_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _dial(self, job: DialJob):
+        self._acquire_slot(job.interview_id)
+        self._bucket.acquire()
+
+        if job.due_at:
+            lag = (datetime.utcnow() - job.due_at).total_seconds()
+            with self._stats_lock:
+                self._stats["last_lag_seconds"] = lag
+                self._stats["max_lag_seconds"] = max(self._stats["max_lag_seconds"], lag)
+
+        if self.before_dial and not self.before_dial(job.interview_id):
+            print(f"[WARN] Dialer: Interview {job.interview_id} is no longer ours to dial, skipping")
+            self.release(job.interview_id)
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            return
+
+        print(f"[INFO] Triggering call for Interview {job.interview_id}")
+        call_sid = make_outbound_call(job.phone, job.interview_id, client=self.twilio_client)
+
+        with self._stats_lock:
+            self._stats["dispatched" if call_sid else "failed"] += 1
+        if not call_sid:
+            self.release(job.interview_id)
+        if self.on_result:
+            self.on_result(job.interview_id, call_sid)
@@ -0,0 +1,88 @@
+import heapq
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Tuple
+
+class DueTimer:
+    """
+    In-memory min-heap of upcoming reservations (naive UTC).
+
+    A single thread sleeps until the earliest reservation_time and then calls
+    on_due() once for everything that has come due, so dialing starts at the
+    booked time instead of on the next polling tick. Reschedules and
+    cancellations are lazy: the heap may hold stale entries, and only the
+    time recorded in _due for an interview counts.
+    """
+    def __init__(self, on_due: Callable[[], None]):
+        self.on_due = on_due
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self.fired = 0
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="due-timer", daemon=True)
+        self._thread.start()
+
+    def schedule(self, interview_id: int, due_at: datetime):
+        with self._cond:
+            if self._due.get(interview_id) == due_at:
+                return # already on the heap (e.g. found again by a poll)
+            self._due[interview_id] = due_at
+            heapq.heappush(self._heap, (due_at, interview_id))
+            # Wake the timer thread only if this is now the earliest entry
+            if self._heap[0][1] == interview_id:
+                self._cond.notify()
+
+    def cancel(self, interview_id: int):
+        with self._cond:
+            self._due.pop(interview_id, None)
+
+    def load(self, rows: Iterable[Tuple[int, datetime]]):
+        """Replace the heap with (interview_id, reservation_time) rows from the DB."""
+        due = {interview_id: due_at for interview_id, due_at in rows}
+        heap = [(due_at, interview_id) for interview_id, due_at in due.items()]
+        heapq.heapify(heap)
+        with self._cond:
+            self._due = due
+            self._heap = heap
+            self._cond.notify()
+
+    def __len__(self):
+        return len(self._due)
+
+    def _pop_due(self, now: datetime) -> int:
+        # Called with _cond held; drops every entry due at or before now
+        count = 0
+        while self._heap and self._heap[0][0] <= now:
+            due_at, interview_id = heapq.heappop(self._heap)
+            if self._due.get(interview_id) == due_at:
+                del self._due[interview_id]
+                count += 1
+        return count
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    # Discard stale heads so we never sleep towards a cancelled time
+                    while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(timeout=wait)
+                fired = self._pop_due(datetime.utcnow())
+
+            if fired:
+                self.fired += fired
+                try:
+                    self.on_due()
+                except Exception as e:
+                    print(f"[ERROR] Due timer callback failed: {e}")
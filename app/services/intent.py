@@ -0,0 +1,267 @@
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Environment Variables
+# Below this an answer counts as "unknown" (time check asks again once)
+INTENT_MIN_CONFIDENCE = float(os.environ.get("INTENT_MIN_CONFIDENCE", "0.4"))
+
+# --- Normalization ---
+# Speech recognition returns the same answer as 大丈夫 / だいじょうぶ /
+# ダイジョウブ / ﾀﾞｲｼﾞｮｳﾌﾞ. Everything is folded once, up front, to
+# half-width-free, lower-case hiragana so the lexicons only list kana.
+
+KANJI_READINGS = {
+    "大丈夫": "だいじょうぶ", "無理": "むり", "駄目": "だめ", "難しい": "むずかしい", "難しく": "むずかしく",
+    "都合": "つごう", "悪い": "わるい", "時間": "じかん", "今日": "きょう", "今": "いま", "後で": "あとで",
+    "忙しい": "いそがしい", "掛け直": "かけなおし", "かけ直": "かけなおし", "別の日": "べつのひ", "改めて": "あらためて",
+    "運転中": "うんてんちゅう", "移動中": "いどうちゅう", "仕事中": "しごとちゅう", "会議中": "かいぎちゅう",
+    "問題": "もんだい", "構いません": "かまいません", "構わない": "かまわない", "平気": "へいき",
+    "出来ます": "できます", "出来ません": "できません", "出来": "でき", "宜しい": "よろしい", "良い": "いい", "結構": "けっこう",
+    "お願い": "おねがい", "願い": "ねがい", "是非": "ぜひ", "無い": "ない", "無く": "なく", "無し": "なし", "有り": "あり", "有る": "ある",
+    "特に": "とくに", "特には": "とくには", "以上": "いじょう", "終わり": "おわり", "終了": "しゅうりょう", "質問": "しつもん",
+    "教えて": "おしえて", "知りたい": "しりたい", "聞きたい": "ききたい", "伺いたい": "うかがいたい", "何": "なに",
+    "今度": "こんど", "空いて": "あいて", "思い": "おもい", "次": "つぎ", "進んで": "すすんで", "感じ": "かんじ",
+    "待って": "まって", "待ち": "まち",
+}
+_KANJI_RE = re.compile("|".join(sorted(map(re.escape, KANJI_READINGS), key=len, reverse=True)))
+# Dropped before matching; "?" is kept, it marks a question
+_NOISE_RE = re.compile(r"[\s、。,.!！…・「」『』()（）~〜]+")
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _KANJI_RE.sub(lambda m: KANJI_READINGS[m.group(0)], text)
+    # Katakana -> hiragana (ハイ -> はい); the long vowel mark stays
+    text = "".join(chr(ord(ch) - 0x60) if "ァ" <= ch <= "ヶ" else ch for ch in text)
+    return _NOISE_RE.sub("", text)
+
+# --- Aho-Corasick ---
+
+class Automaton:
+    """
+    Aho-Corasick automaton over a fixed set of patterns: one pass over the
+    text finds every occurrence of every pattern, so adding phrases to a
+    lexicon doesn't make classification slower per utterance.
+    """
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pattern)
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start, pattern) for every match."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in out[state]:
+                yield i - len(pattern) + 1, pattern
+
+# --- Classification ---
+
+class Intent(NamedTuple):
+    label: str # e.g. "yes" / "no" / "exit" / "question" / "unknown"
+    confidence: float
+    matched: Tuple[str, ...] = ()
+
+# Right after a phrase, these turn it around: 大丈夫じゃない, 無理ではない
+NEGATORS = ("じゃない", "じゃありません", "ではない", "ではありません", "じゃなく", "でもない", "くない", "くありません")
+# Particles a "standalone" phrase (marked with a leading ^) may follow:
+# 質問は/ない, 特に/ない -- but not わから/ない
+LEFT_BOUNDARY = set("はがもにをへと")
+_QUESTION_AFTER = re.compile(r"(です|ます|でしょう)?(か|\?)")
+
+def _is_ascii_letter(ch: str) -> bool:
+    return ch.isascii() and ch.isalpha()
+
+class UtteranceClassifier:
+    """
+    lexicon: {label: {phrase: weight}}. A phrase written "^phrase" only
+    counts at the start of the utterance or after a particle; ASCII phrases
+    only as whole words. exact: whole-utterance answers ({"ない": ("exit", 0.9)}).
+    flip: label a negated phrase turns into. noise: phrases that count for
+    nothing but hide the shorter phrases inside them (ええと is not ええ).
+
+    Each match is scored by its weight, minus most of it when it is asked
+    back as a question (...ですか), plus a little for coming later in the
+    utterance (Japanese puts the answer at the end: はい、でも今はちょっと).
+    The best label wins, with confidence reduced by the runner-up.
+    """
+    def __init__(self, lexicon: Dict[str, Dict[str, float]], exact: Dict[str, Tuple[str, float]] = None, flip: Dict[str, str] = None,
+                 question_label: str = None, noise: Tuple[str, ...] = ()):
+        self.exact = {normalize(k): v for k, v in (exact or {}).items()}
+        self.flip = flip or {}
+        self.question_label = question_label
+        self._phrases: Dict[str, Tuple[str, float, bool]] = {}
+        for label, phrases in lexicon.items():
+            for phrase, weight in phrases.items():
+                standalone = phrase.startswith("^")
+                key = normalize(phrase.lstrip("^"))
+                self._phrases[key] = (label, weight, standalone)
+        for phrase in noise:
+            self._phrases[normalize(phrase)] = (None, 0.0, False)
+        self._automaton = Automaton(list(self._phrases))
+
+    def _longest_matches(self, norm: str) -> List[Tuple[int, str]]:
+        """Valid matches, dropping any that lie inside a longer one (うん in うんてんちゅう)."""
+        candidates = []
+        for start, phrase in self._automaton.finditer(norm):
+            end = start + len(phrase)
+            if self._phrases[phrase][2] and start > 0 and norm[start - 1] not in LEFT_BOUNDARY:
+                continue
+            # "no" inside "nothing" / "know" is not a match
+            if _is_ascii_letter(phrase[0]) and (_is_ascii_letter(norm[start - 1:start]) or _is_ascii_letter(norm[end:end + 1])):
+                continue
+            candidates.append((start, end, phrase))
+        kept: List[Tuple[int, int, str]] = []
+        for start, end, phrase in sorted(candidates, key=lambda m: m[0] - m[1]):
+            if not any(s <= start and end <= e for s, e, _ in kept):
+                kept.append((start, end, phrase))
+        return [(start, phrase) for start, _, phrase in sorted(kept)]
+
+    def classify(self, text: str) -> Intent:
+        norm = normalize(text)
+        if not norm:
+            return Intent("unknown", 0.0)
+        if norm in self.exact:
+            label, weight = self.exact[norm]
+            return Intent(label, weight, (norm,))
+
+        scores: Dict[str, float] = {}
+        matched: List[str] = []
+        for start, phrase in self._longest_matches(norm):
+            label, weight, _ = self._phrases[phrase]
+            if label is None:
+                continue
+            end = start + len(phrase)
+            rest = norm[end:]
+            negated = rest.startswith(NEGATORS) or (phrase.endswith("く") and rest.startswith(("ない", "ありません")))
+            if negated and label in self.flip:
+                label, weight = self.flip[label], weight * 0.8
+            elif label != self.question_label and _QUESTION_AFTER.match(rest):
+                # 大丈夫ですか / ないですか: asked back, not answered
+                weight *= 0.2
+            score = weight + 0.1 * end / len(norm)
+            if score > scores.get(label, 0.0):
+                scores[label] = score
+            matched.append(phrase)
+
+        if not scores:
+            return Intent("unknown", 0.0)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        label, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = max(0.0, min(1.0, top - 0.5 * second))
+        return Intent(label, round(confidence, 3), tuple(matched))
+
+# Answer to "只今、面接のお時間はよろしいでしょうか？"
+YES_NO = UtteranceClassifier(
+    lexicon={
+        "yes": {
+            "はい": 0.9, "はーい": 0.9, "^ええ": 0.6, "^うん": 0.6, "いいよ": 0.9, "いいですよ": 0.9, "いいです": 0.6,
+            "だいじょうぶ": 0.85, "よろしい": 0.8, "おっけー": 0.9, "ok": 0.9, "okay": 0.9, "yes": 0.9, "sure": 0.8,
+            "おねがいします": 0.8, "もんだいない": 0.9, "もんだいありません": 0.9, "かまいません": 0.85, "かまわない": 0.85,
+            "へいき": 0.7, "じかんあります": 0.85, "じかんはあります": 0.85, "じかんある": 0.8, "できます": 0.7,
+            "どうぞ": 0.7, "いけます": 0.8, "ぜひ": 0.7, "あいてます": 0.8, "あいています": 0.8,
+        },
+        "no": {
+            "いいえ": 0.9, "^いや": 0.6, "no": 0.9, "^のー": 0.8, "だめ": 0.9, "むり": 0.9, "むずかしい": 0.8, "むずかしく": 0.8,
+            "つごうがわるい": 0.9, "つごうがつかない": 0.9, "じかんがない": 0.9, "じかんない": 0.9, "じかんがありません": 0.9,
+            "いまはちょっと": 0.85, "ちょっと": 0.5, "あとで": 0.7, "いそがしい": 0.8, "かけなおし": 0.85, "べつのひ": 0.85,
+            "あらためて": 0.7, "うんてんちゅう": 0.9, "いどうちゅう": 0.8, "しごとちゅう": 0.8, "かいぎちゅう": 0.8,
+            "できません": 0.85, "ごめんなさい": 0.6, "またこんど": 0.8, "^ない": 0.6, "^ありません": 0.6,
+        },
+    },
+    exact={"1": ("yes", 1.0), "2": ("no", 1.0)},
+    flip={"yes": "no", "no": "yes"},
+    # Fillers, not ええ (yes); ちょっと待って asks for a moment, not ちょっと (no)
+    noise=("ええと", "ええっと", "えーと", "えーっと", "ちょっとまって", "ちょっとおまち"),
+)
+
+# In reverse Q&A: "何か質問はありますか？" -> nothing more (exit) or a question
+REVERSE_QA_EXIT = UtteranceClassifier(
+    lexicon={
+        "exit": {
+            "^ないです": 0.9, "^ありません": 0.85, "とくにない": 0.95, "とくにありません": 0.95, "とくにないです": 0.95,
+            "とくには": 0.7, "^なし": 0.7, "^なしです": 0.85, "だいじょうぶ": 0.8, "だいじょうぶです": 0.9, "^いじょう": 0.7,
+            "^いじょうです": 0.9, "おわり": 0.7, "おわりです": 0.85, "しゅうりょう": 0.7, "けっこうです": 0.85, "もういい": 0.7,
+            "no": 0.6, "nothing": 0.9, "しつもんはない": 0.95, "しつもんはありません": 0.95, "しつもんない": 0.95,
+            "しつもんないです": 0.95, "しつもんありません": 0.95, "ないない": 0.8,
+            "ありがとうございました": 0.5, "おもいつかない": 0.85, "おもいつきません": 0.85,
+        },
+        "question": {
+            "ですか": 0.6, "ますか": 0.6, "でしょうか": 0.6, "?": 0.6, "について": 0.7, "おしえて": 0.8, "しりたい": 0.8,
+            "ききたい": 0.8, "うかがいたい": 0.8, "どう": 0.4, "なに": 0.4, "いつ": 0.4, "どれくらい": 0.6, "どのくらい": 0.6,
+            "どんな": 0.5, "ありますか": 0.7,
+        },
+    },
+    exact={"ない": ("exit", 0.9), "なし": ("exit", 0.9), "no": ("exit", 0.9), "のー": ("exit", 0.9), "いいえ": ("exit", 0.9), "とくに": ("exit", 0.8)},
+    flip={"exit": "question"},
+    question_label="question",
+)
+
+# Said at the end of an answer in stream mode: "...と考えています。以上です。"
+ANSWER_END = UtteranceClassifier(
+    lexicon={
+        "done": {
+            "いじょうです": 0.95, "いじょうになります": 0.95, "いじょうでございます": 0.95, "いじょう": 0.6,
+            "おわりです": 0.9, "おわります": 0.8, "おわりました": 0.85, "それだけです": 0.85, "そんなかんじです": 0.8,
+            "そんなところです": 0.8, "つぎにすすんでください": 0.9, "つぎのしつもん": 0.85, "つぎおねがいします": 0.9,
+            "つぎにおねがいします": 0.9, "つぎのしつもんおねがいします": 0.95, "つぎのしつもんにすすんでください": 0.95,
+            "つぎのしつもんへ": 0.85,
+        },
+        "more": {
+            "えっと": 0.5, "えーと": 0.5, "あと": 0.5, "それから": 0.6, "そして": 0.6, "ただ": 0.4, "でも": 0.4, "まず": 0.5,
+        },
+    },
+    exact={"いじょう": ("done", 0.9), "おわり": ("done", 0.8)},
+)
+# Only the last words of a transcript can close the answer
+ANSWER_END_WINDOW = 16
+
+def classify_yes_no(speech: Optional[str], digits: Optional[str] = None) -> Intent:
+    """DTMF wins over speech: 1 = yes, 2 = no."""
+    if digits in ("1", "2"):
+        return YES_NO.classify(digits)
+    return YES_NO.classify(speech)
+
+def classify_reverse_qa(speech: Optional[str]) -> Intent:
+    return REVERSE_QA_EXIT.classify(speech)
+
+def classify_answer_end(transcript: Optional[str]) -> Intent:
+    """
+    "done" only when a closing phrase ends the transcript: 以上です closes
+    the answer, 以上のような経験から does not.
+    """
+    norm = normalize(transcript)[-ANSWER_END_WINDOW:]
+    intent = ANSWER_END.classify(norm)
+    if intent.label == "done" and not norm.endswith(intent.matched[-1]):
+        return Intent("unknown", 0.0, intent.matched)
+    return intent
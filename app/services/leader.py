@@ -0,0 +1,125 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import SchedulerLease
+
+# Environment Variables
+# A dead leader is replaced at most LEADER_LEASE_TTL_SECONDS + one heartbeat later
+LEADER_LEASE_TTL_SECONDS = int(os.environ.get("LEADER_LEASE_TTL_SECONDS", "10"))
+LEADER_HEARTBEAT_SECONDS = float(os.environ.get("LEADER_HEARTBEAT_SECONDS", str(LEADER_LEASE_TTL_SECONDS / 3)))
+
+class LeaderLease:
+    """
+    Leader election over a single row in scheduler_leases.
+
+    Every process runs a heartbeat thread. Acquire and renew are the same
+    conditional UPDATE (holder is us, or the lease has expired), so only one
+    process can hold the lease at a time. on_acquire / on_release run on the
+    heartbeat thread when leadership changes.
+    Expiry uses each process's UTC clock; hosts are expected to run NTP.
+    """
+    def __init__(
+        self,
+        name: str,
+        on_acquire: Callable[[], None] = None,
+        on_release: Callable[[], None] = None,
+        ttl: int = LEADER_LEASE_TTL_SECONDS,
+        heartbeat: float = LEADER_HEARTBEAT_SECONDS,
+    ):
+        self.name = name
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._valid_until = 0.0 # monotonic deadline of our last successful renewal
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop heartbeating and give the lease up so a standby takes over immediately."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat + 1)
+        if self.is_leader:
+            try:
+                with Session(engine) as session:
+                    session.execute(
+                        update(SchedulerLease)
+                        .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                        .values(expires_at=datetime.utcnow())
+                    )
+                    session.commit()
+            except Exception as e:
+                print(f"[WARN] Could not release lease '{self.name}': {e}")
+            self._set_leader(False)
+
+    def try_acquire(self) -> bool:
+        """Acquire or renew the lease. Returns True if we hold it afterwards."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        with Session(engine) as session:
+            result = session.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=expires_at, heartbeat_at=now)
+            )
+            if result.rowcount == 1:
+                session.commit()
+                return True
+            if session.get(SchedulerLease, self.name) is not None:
+                return False
+            # First process ever: create the row. Losing the insert race means someone else leads.
+            session.add(SchedulerLease(name=self.name, holder=self.holder, expires_at=expires_at, heartbeat_at=now))
+            try:
+                session.commit()
+                return True
+            except IntegrityError:
+                session.rollback()
+                return False
+
+    def _set_leader(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        print(f"[INFO] Lease '{self.name}': {self.holder} {'acquired' if leader else 'lost'} leadership")
+        callback = self.on_acquire if leader else self.on_release
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[ERROR] Lease '{self.name}' callback failed: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                held = self.try_acquire()
+                if held:
+                    self._valid_until = started + self.ttl
+            except Exception as e:
+                print(f"[ERROR] Lease '{self.name}' heartbeat failed: {e}")
+                # Keep leading only while the lease we last wrote is still valid
+                held = self.is_leader and time.monotonic() < self._valid_until
+            self._set_leader(held)
+            self._stop.wait(self.heartbeat)
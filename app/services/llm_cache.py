@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import LLMCacheEntry
+from app.services.llm_client import provider
+
+class LLMCache:
+    """
+    Results of one model operation by key: an in-process LRU in front of the
+    llm_cache table, shared by every process on the database. Reads go to
+    the LRU, then the table (a table hit is copied into the LRU); writes go
+    to both. A failing table read or write is logged and treated as a miss,
+    never raised. Hits and misses are counted here and on
+    provider.metrics()[operation], next to the calls they saved.
+
+    `ttl` (seconds) expires the memory copies; None keeps them until evicted.
+    """
+    def __init__(self, operation: str, maxsize: int, ttl: float = None):
+        self.operation = operation
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached value ("" is a valid one), or None."""
+        value = self._lru_get(key)
+        if value is not None:
+            with self._lock:
+                self.memory_hits += 1
+        else:
+            value = self._db_get(key)
+            if value is not None:
+                self._lru_put(key, value)
+            with self._lock:
+                if value is not None:
+                    self.db_hits += 1
+                else:
+                    self.misses += 1
+        provider.record_cache(self.operation, hit=value is not None)
+        return value
+
+    def put(self, key: str, value: str):
+        self._lru_put(key, value)
+        try:
+            with Session(engine) as session:
+                session.merge(LLMCacheEntry(key=key, operation=self.operation, value=value))
+                session.commit()
+        except Exception as e:
+            print(f"[WARN] LLM cache write failed ({self.operation}): {e}")
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def _db_get(self, key: str) -> Optional[str]:
+        try:
+            with Session(engine) as session:
+                entry = session.get(LLMCacheEntry, key)
+                return entry.value if entry else None
+        except Exception as e:
+            print(f"[WARN] LLM cache read failed ({self.operation}): {e}")
+            return None
+
+    def _lru_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return value
+
+    def _lru_put(self, key: str, value: str):
+        with self._lock:
+            self._lru[key] = (value, time.monotonic())
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def metrics(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "cached": len(self._lru),
+                "memory_hits": self.memory_hits, "db_hits": self.db_hits, "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 3) if lookups else None,
+            }
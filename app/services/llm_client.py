@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple, Union
+
+import httpx
+
+# Environment Variables
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "openai") # "openai" | "fake" (offline tests / benchmarks)
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "20"))
+STT_TIMEOUT_SECONDS = float(os.environ.get("STT_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2")) # retries within the call's deadline, not on top of it
+# Calls in flight across the process (topic extraction + STT)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))
+LLM_FAKE_LATENCY_MS = float(os.environ.get("LLM_FAKE_LATENCY_MS", "0"))
+
+# A binary file, or (filename, file or bytes) when the object's own name doesn't tell the format
+AudioFile = Union[BinaryIO, Tuple[str, Union[BinaryIO, bytes]]]
+
+class LLMError(Exception):
+    """A provider call failed (after retries), timed out, or was not allowed to start."""
+
+class OpenAIBackend:
+    """
+    OpenAI SDK on one pooled, keep-alive httpx client shared by all calls.
+    The SDK's own retries are off: each call retries transient errors here,
+    every attempt getting what is left of the call's timeout, so a call
+    never takes longer than its timeout in total.
+    """
+    name = "openai"
+    backoff = 0.5 # seconds before the first retry, doubled after each
+
+    def __init__(self, api_key: str = None, max_retries: int = LLM_MAX_RETRIES, max_connections: int = LLM_MAX_CONNECTIONS):
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        # Built on first use, so importing the app never needs the API key
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                    timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0),
+                )
+                self._client = OpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+            return self._client
+
+    def _attempts(self, fn: Callable[[float], Any], timeout: float, max_retries: int = None, rewind: Callable[[], None] = None):
+        """fn(attempt_timeout), retried on transient errors while the deadline allows."""
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+        deadline = time.monotonic() + timeout
+        retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(retries + 1):
+            try:
+                return fn(max(0.1, deadline - time.monotonic()))
+            except (APIConnectionError, InternalServerError, RateLimitError):
+                wait = self.backoff * 2 ** attempt
+                if attempt == retries or time.monotonic() + wait >= deadline:
+                    raise
+            time.sleep(wait)
+            if rewind:
+                rewind()
+
+    def chat(self, messages: List[Dict[str, str]], model: str, timeout: float, max_retries: int = None, **params) -> Tuple[str, Dict[str, int]]:
+        response = self._attempts(
+            lambda remaining: self.client.chat.completions.create(model=model, messages=messages, timeout=remaining, **params),
+            timeout, max_retries,
+        )
+        usage = response.usage
+        tokens = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens} if usage else {}
+        return response.choices[0].message.content.strip(), tokens
+
+    def transcribe(self, audio_file: AudioFile, model: str, timeout: float, max_retries: int = None, **params) -> str:
+        # File objects are streamed into the upload by httpx, not read into memory first;
+        # a retry sends the file again from where this call found it
+        file = audio_file[1] if isinstance(audio_file, tuple) else audio_file
+        start = file.tell() if hasattr(file, "seek") else None
+        return self._attempts(
+            lambda remaining: self.client.audio.transcriptions.create(model=model, file=audio_file, timeout=remaining, **params).text,
+            timeout, max_retries, rewind=(lambda: file.seek(start)) if start is not None else None,
+        )
+
+class FakeBackend:
+    """
+    Offline stand-in. chat() returns replies[user message] if given, else the
+    last user message with any "...: " prompt prefix stripped; transcribe()
+    returns a fixed transcript. `latency` (seconds) is slept per call.
+    """
+    name = "fake"
+    available = True
+
+    def __init__(self, replies: Dict[str, str] = None, transcript: str = "（テスト用の文字起こし）", latency: float = LLM_FAKE_LATENCY_MS / 1000):
+        self.replies = replies or {}
+        self.transcript = transcript
+        self.latency = latency
+        self.calls: List[Tuple[str, Any]] = []
+
+    def chat(self, messages: List[Dict[str, str]], model: str, timeout: float, **params) -> Tuple[str, Dict[str, int]]:
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise TimeoutError("fake backend: deadline exceeded")
+        text = messages[-1]["content"]
+        self.calls.append(("chat", text))
+        reply = self.replies.get(text, text.split(": ", 1)[-1])
+        return reply, {"prompt_tokens": sum(len(m["content"]) for m in messages), "completion_tokens": len(reply)}
+
+    def transcribe(self, audio_file: AudioFile, model: str, timeout: float, **params) -> str:
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise TimeoutError("fake backend: deadline exceeded")
+        self.calls.append(("transcribe", audio_file[0] if isinstance(audio_file, tuple) else getattr(audio_file, "name", None)))
+        return self.transcript
+
+def make_backend(name: str = LLM_BACKEND):
+    if name == "fake":
+        return FakeBackend()
+    if name == "openai":
+        return OpenAIBackend()
+    raise ValueError(f"Unknown LLM_BACKEND: {name}")
+
+class LLMProvider:
+    """
+    Single entry point for model calls (chat + speech-to-text).
+
+    - One backend per process, so HTTP connections are pooled and reused.
+    - Every call has a deadline; waiting for a concurrency slot counts
+      against it, and a call that can't start in time fails with LLMError.
+    - At most `max_concurrency` calls run at once (BoundedSemaphore).
+    - Per-operation counters: calls, errors, latency, token usage, plus
+      cache hits/misses reported by callers that cache results.
+    """
+    def __init__(self, backend=None, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.backend = backend or make_backend()
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.in_flight = 0
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available
+
+    def set_backend(self, backend):
+        """Swap the backend (tests / benchmarks: provider.set_backend(FakeBackend()))."""
+        self.backend = backend
+
+    def chat(self, operation: str, messages: List[Dict[str, str]], model: str = "gpt-4o-mini", timeout: float = LLM_TIMEOUT_SECONDS, **params) -> str:
+        text, tokens = self._call(operation, timeout, lambda remaining: self.backend.chat(messages, model, remaining, **params))
+        self._count(operation, **tokens)
+        return text
+
+    def transcribe(self, operation: str, audio_file: AudioFile, model: str = "whisper-1", timeout: float = STT_TIMEOUT_SECONDS, **params) -> str:
+        return self._call(operation, timeout, lambda remaining: self.backend.transcribe(audio_file, model, remaining, **params))
+
+    def record_cache(self, operation: str, hit: bool):
+        self._count(operation, cache_hits=int(hit), cache_misses=int(not hit))
+
+    def _call(self, operation: str, timeout: float, fn):
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            self._count(operation, errors=1, rejected=1)
+            raise LLMError(f"{operation}: no free slot within {timeout}s ({self.max_concurrency} in flight)")
+        started = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            remaining = max(0.1, deadline - started)
+            result = fn(remaining)
+        except Exception as e:
+            self._count(operation, calls=1, errors=1, latency=time.monotonic() - started)
+            print(f"[ERROR] LLM {operation} failed: {e}")
+            raise LLMError(f"{operation}: {e}") from e
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+        self._count(operation, calls=1, latency=time.monotonic() - started)
+        return result
+
+    def _count(self, operation: str, latency: float = None, **counters):
+        with self._lock:
+            stats = self._stats.setdefault(operation, {
+                "calls": 0, "errors": 0, "rejected": 0, "cache_hits": 0, "cache_misses": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "latency_total": 0.0, "latency_max": 0.0,
+            })
+            for name, value in counters.items():
+                stats[name] += value
+            if latency is not None:
+                stats["latency_total"] += latency
+                stats["latency_max"] = max(stats["latency_max"], latency)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {}
+            for operation, stats in self._stats.items():
+                operations[operation] = {
+                    **{k: v for k, v in stats.items() if k != "latency_total"},
+                    "latency_avg": round(stats["latency_total"] / stats["calls"], 3) if stats["calls"] else None,
+                    "latency_max": round(stats["latency_max"], 3),
+                }
+            return {"backend": self.backend.name, "in_flight": self.in_flight, "max_concurrency": self.max_concurrency, "operations": operations}
+
+provider = LLMProvider()
@@ -1,31 +1,68 @@
+import hashlib
 import os
-import openai
+import re
+import unicodedata
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from openai import OpenAI
+from app.services.llm_cache import LLMCache
+from app.services.llm_client import provider, LLMError
+
+# Environment Variables
+LLM_TOPIC_MODEL = os.environ.get("LLM_TOPIC_MODEL", "gpt-4o-mini")
+LLM_TOPIC_CACHE_SIZE = int(os.environ.get("LLM_TOPIC_CACHE_SIZE", "2048"))
+
+TOPIC_OPERATION = "extract_topic"
+TOPIC_SYSTEM_PROMPT = "You are a helpful assistant. Extract the main topic from the user's question in Japanese. Output ONLY the noun/topic. No extra words."
+
+topic_cache = LLMCache(TOPIC_OPERATION, LLM_TOPIC_CACHE_SIZE)
+
+def normalize_question(text: str) -> str:
+    """Cache key form: NFKC, lower-case, no whitespace or edge punctuation."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"\s+", "", text)
+    return text.strip("、。,.!?！？・…ー~〜")
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+def _cache_key(operation: str, model: str, normalized: str) -> str:
+    return hashlib.sha256(f"{operation}\0{model}\0{normalized}".encode("utf-8")).hexdigest()
 
-def extract_topic(text: str) -> str:
+def extract_topic(text: str, timeout: float = None) -> str:
     """
     Extract the main topic/noun from the user's question.
     Example: "What are the benefits?" -> "Benefits" (or "Fukuri Kousei" in JP)
     Keep it short (noun only).
+    Prefer topic_extractor.resolve_topic, which only gets here for inputs the
+    local extractor isn't sure about.
+
+    Results are cached by normalized question (in-process LRU, then the
+    llm_cache table), so a repeated question never costs a second call.
     """
+    normalized = normalize_question(text)
+    if not normalized:
+        return "ご質問"
+    key = _cache_key(TOPIC_OPERATION, LLM_TOPIC_MODEL, normalized)
+    topic = topic_cache.get(key)
+    if topic is not None:
+        return topic
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Extract the main topic from the user's question in Japanese. Output ONLY the noun/topic. No extra words."},
+        topic = provider.chat(
+            TOPIC_OPERATION,
+            [
+                {"role": "system", "content": TOPIC_SYSTEM_PROMPT},
                 {"role": "user", "content": f"Extract topic from: {text}"}
             ],
+            model=LLM_TOPIC_MODEL,
+            # A caller with a deadline can't wait for SDK retries
+            **({"timeout": timeout, "max_retries": 0} if timeout else {}),
             max_tokens=30,
             temperature=0
         )
-        topic = response.choices[0].message.content.strip()
-        return topic
-    except Exception as e:
-        print(f"[ERROR] LLM Error: {e}")
+    except LLMError:
         return "ご質問" # Fallback
+    if not topic:
+        return "ご質問"
+    topic_cache.put(key, topic)
+    return topic
@@ -90,7 +90,7 @@ def send_sms(to_phone: str, content: str, candidate_id: int = None, session: Ses
 
     return status == "sent"
 
-def make_outbound_call(to_phone: str, interview_id: int):
+def make_outbound_call(to_phone: str, interview_id: int, client: Client = None):
     BASE_URL = os.environ.get("BASE_URL")
     if not BASE_URL:
         print("[ERROR] BASE_URL not set. Cannot make call.")
@@ -102,7 +102,8 @@ def make_outbound_call(to_phone: str, interview_id: int):
     voice_from = os.environ.get("TWILIO_FROM_NUMBER", TWILIO_SMS_FROM_NUMBER)
     
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        # Callers placing many calls (dialer) pass a shared client; tests pass a fake
+        client = client or Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
         
         # Webhook URL for the logic
         base_url = BASE_URL.rstrip('/')
@@ -113,7 +114,7 @@ def make_outbound_call(to_phone: str, interview_id: int):
             to=to_phone,
             from_=voice_from,
             url=url,
-            status_callback=f"{base_url}/voice/status", 
+            status_callback=f"{base_url}/voice/status?interview_id={interview_id}",
             status_callback_event=['completed', 'failed', 'busy', 'no-answer'],
             timeout=20,
             machine_detection='Enable' 
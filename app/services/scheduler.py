@@ -1,95 +1,329 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from sqlmodel import Session, select
+from sqlalchemy import update, delete, exists, func
 from app.database import engine
-from app.models import Interview
-from app.services.notification import make_outbound_call
+from app.models import Interview, Candidate, InterviewReview, CommunicationLog, WebhookReceipt, CallEvent, SttJob, LLMCacheEntry, SchedulerLease
+from app.services.dialer import DialDispatcher
+from app.services.due_timer import DueTimer
+from app.services.leader import LeaderLease
+from app.services.settings import get_int_setting
+from app.services.transcript_cache import TRANSCRIBE_OPERATION
 from datetime import datetime, timedelta
-import pytz
+from typing import List, Tuple
+import functools
+import os
+import time
 
 # Initialize Scheduler
 scheduler = BackgroundScheduler()
 
+# Max interviews claimed per round trip. Keeps each claim transaction short
+# even when a whole slot (e.g. 10:00) becomes due at once.
+DUE_BATCH_SIZE = int(os.environ.get("SCHEDULER_DUE_BATCH_SIZE", "50"))
+# Safety-net sweep: reloads the due timer from the DB and claims anything it
+# missed (bookings made in another process, admin edits, failed dials).
+RECONCILE_SECONDS = int(os.environ.get("SCHEDULER_RECONCILE_SECONDS", "300"))
+# How often the leader looks up the earliest 'scheduled' reservation, so
+# bookings and call retries handled by other workers reach its due timer
+# (one MIN() per poll, as many queries as the old 60s scan). Keep it below
+# the shortest call retry delay (CALL_RETRY_BASE_SECONDS minus jitter, ~210s)
+# so a retry is on the timer before it is due.
+NEXT_DUE_POLL_SECONDS = float(os.environ.get("SCHEDULER_NEXT_DUE_POLL_SECONDS", "60"))
+# Due-timer key of the polled reservation (not an interview id)
+NEXT_DUE_KEY = 0
+# Interviews deleted per cleanup transaction
+CLEANUP_CHUNK_SIZE = int(os.environ.get("CLEANUP_CHUNK_SIZE", "500"))
+
+# A dial goes ahead only while our lease has at least this long left, so a
+# new leader (which needs the lease expired) can't reclaim the same interview
+# between the check and the call.
+DIAL_LEASE_MARGIN_SECONDS = float(os.environ.get("DIAL_LEASE_MARGIN_SECONDS", "2"))
+
+# Statuses during which an interview holds one of the dialer's active-call slots
+ACTIVE_CALL_STATUSES = ("dialing", "calling", "in_progress")
+PENDING_STATUSES = ("scheduled",) + ACTIVE_CALL_STATUSES
+
+def claim_due_interviews(session: Session, now: datetime = None, limit: int = DUE_BATCH_SIZE) -> List[Tuple[int, str, datetime]]:
+    """
+    Atomically move up to `limit` due interviews from 'scheduled' to 'dialing'
+    and return (interview_id, phone, reservation_time) for the rows this caller won.
+
+    The due-check runs in SQL on ix_interviews_status_reservation_time.
+    Postgres: the inner SELECT takes row locks with FOR UPDATE SKIP LOCKED, so
+    concurrent claimers never block on or double-claim the same row.
+    SQLite: writers are serialized, so the conditional UPDATE and its inner
+    SELECT run as a single atomic step.
+    The caller owns the transaction and must commit.
+    """
+    # reservation_time is stored as naive UTC
+    now = now or datetime.utcnow()
+
+    due = (
+        select(Interview.id)
+        .where(Interview.status == "scheduled", Interview.reservation_time <= now)
+        .order_by(Interview.reservation_time)
+        .limit(limit)
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        due = due.with_for_update(skip_locked=True)
+
+    stmt = (
+        update(Interview)
+        # Keep the outer WHERE on the primary key only; repeating the status
+        # filter here makes SQLite walk every scheduled row via the index.
+        .where(Interview.id.in_(due))
+        .values(status="dialing")
+        .returning(Interview.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed_ids = [row[0] for row in session.execute(stmt)]
+    if not claimed_ids:
+        return []
+
+    rows = session.exec(
+        select(Interview.id, Candidate.phone, Interview.reservation_time)
+        .join(Candidate, Candidate.id == Interview.candidate_id)
+        .where(Interview.id.in_(claimed_ids))
+        .order_by(Interview.reservation_time)
+    ).all()
+    return [(row[0], row[1], row[2]) for row in rows]
+
+def _set_status(interview_ids: List[int], from_status: str, to_status: str):
+    if not interview_ids:
+        return
+    with Session(engine) as session:
+        session.execute(
+            update(Interview)
+            .where(Interview.id.in_(interview_ids), Interview.status == from_status)
+            .values(status=to_status)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+def _leader_only(job):
+    """Run the job only in the process currently holding the scheduler lease."""
+    @functools.wraps(job)
+    def wrapper(*args, **kwargs):
+        if not lease.is_leader:
+            return None
+        return job(*args, **kwargs)
+    return wrapper
+
+def _on_dial_result(interview_id: int, call_sid: str):
+    if call_sid:
+        _set_status([interview_id], "dialing", "calling")
+    else:
+        print(f"[ERROR] Failed to initiate call for Interview {interview_id}. Will retry next loop.")
+        _set_status([interview_id], "dialing", "scheduled")
+
+def _still_active(interview_ids: List[int]) -> List[int]:
+    # Lets the dialer notice calls whose status callback was handled by another process
+    with Session(engine) as session:
+        return session.exec(
+            select(Interview.id).where(Interview.id.in_(interview_ids), Interview.status.in_(ACTIVE_CALL_STATUSES))
+        ).all()
+
+def _still_ours(interview_id: int) -> bool:
+    """
+    Fencing check right before a call is placed: the interview is still
+    'dialing' and this process still holds the scheduler lease, in one
+    conditional UPDATE. After a leader change the new leader resets
+    'dialing' claims and dials them itself; the old leader's dialer must not.
+    """
+    lease_held = exists().where(
+        SchedulerLease.name == lease.name,
+        SchedulerLease.holder == lease.holder,
+        SchedulerLease.expires_at > datetime.utcnow() + timedelta(seconds=DIAL_LEASE_MARGIN_SECONDS),
+    )
+    with Session(engine) as session:
+        result = session.execute(
+            update(Interview)
+            .where(Interview.id == interview_id, Interview.status == "dialing", lease_held)
+            .values(status="dialing")
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+    return result.rowcount == 1
+
+dialer = DialDispatcher(on_result=_on_dial_result, active_probe=_still_active, before_dial=_still_ours)
+
 def check_scheduled_interviews():
     """
-    Check for interviews scheduled now (or in past) that are still 'scheduled'.
-    Make calls.
+    Claim interviews scheduled now (or in past) that are still 'scheduled'
+    and hand them to the dialer, which places the calls in parallel.
+    """
+    seen = set()
+    while dialer.free_capacity() > 0:
+        with Session(engine) as session:
+            claimed = claim_due_interviews(session, limit=min(DUE_BATCH_SIZE, dialer.free_capacity()))
+            session.commit()
+
+        for interview_id, phone, due_at in claimed:
+            dialer.submit(interview_id, phone, due_at)
+
+        ids = {row[0] for row in claimed}
+        # Stop on a short batch, or when failed dials released by the dialer
+        # come straight back (e.g. Twilio misconfigured) to avoid spinning.
+        if len(claimed) < DUE_BATCH_SIZE or ids & seen:
+            break
+        seen |= ids
+
+due_timer = DueTimer(on_due=_leader_only(check_scheduled_interviews))
+
+def schedule_interview(interview_id: int, reservation_time: datetime):
+    """
+    Register a newly booked interview so it is dialed at its exact time.
+    Takes effect at once in the leader; in any other worker the leader picks
+    it up from the DB within NEXT_DUE_POLL_SECONDS (poll_next_due), well
+    before a booked slot or a call retry is due.
+    """
+    due_timer.schedule(interview_id, reservation_time)
+
+def poll_next_due():
+    """
+    Put the earliest 'scheduled' reservation on the due timer: a single
+    MIN() answered from ix_interviews_status_reservation_time. When it
+    fires, everything due by then is claimed, and the next poll brings in
+    the following one.
     """
     with Session(engine) as session:
-        now = datetime.now(pytz.utc) # DB stores UTC usually, or naive. SQLModel default is naive UTC often.
-        # Let's assume naive UTC in DB.
-        
-        # interviews = session.exec(select(Interview).where(Interview.status == "scheduled", Interview.reservation_time <= now)).all()
-        # Comparison depends on how reservation_time is stored. If naive, assume UTC.
-        # Implementation Plan says Asia/Tokyo fixed. But datetime.utcnow() is UTC.
-        # If user inputs JST date in booking, we should convert to UTC before saving or save as naive JST?
-        # Standard: Save as UTC.
-        # Let's ensure booking saves as UTC.
-        
-        # For query:
-        interviews = session.exec(select(Interview).where(Interview.status == "scheduled")).all()
-        
-        for interview in interviews:
-            # Check time
-            # Assume reservation_time is naive UTC
-            if interview.reservation_time <= datetime.utcnow():
-                print(f"[INFO] Triggering call for Interview {interview.id}")
-                
-                # Make Call
-                call_sid = make_outbound_call(interview.candidate.phone, interview.id)
-                
-                if call_sid:
-                    interview.status = "calling" # Temporary status to prevent double-dialing
-                    session.add(interview)
-                    session.commit()
-                else:
-                    print(f"[ERROR] Failed to initiate call for Interview {interview.id}. Will retry next loop enabled by not changing status? Or retry count?")
-                    # If make_call fails (e.g. auth error), we might want to fail hard or retry
-                    # For now keep 'scheduled' so it retries, but might loop if config error.
-                    # Add simple error counter? Or rely on retry logic via status check.
-                    pass
-
-def cleanup_old_data():
-    """
-    Delete interviews older than retention policy (default 24h).
+        next_due = session.exec(
+            select(func.min(Interview.reservation_time)).where(Interview.status == "scheduled")
+        ).one()
+    if next_due:
+        due_timer.schedule(NEXT_DUE_KEY, next_due)
+
+def cancel_interview(interview_id: int):
+    due_timer.cancel(interview_id)
+
+def reconcile_due_timer():
+    """
+    Reload upcoming reservations into the due timer and claim anything already due.
     """
     with Session(engine) as session:
-        # Default 24 hours
-        retention_hours = 24
-        # Check settings if implemented
-        # setting = session.exec(select(Setting).where(Setting.key == 'retention_hours')).first()
-        # if setting: retention_hours = int(setting.value)
-        
-        limit_time = datetime.utcnow() - timedelta(hours=retention_hours)
-        
-        # Select old interviews
-        # Ideally status should be 'completed' or 'failed'.
-        # For MVP, delete all OLD records regardless? Maybe keep logs?
-        # Requirement: "物理削除" for security.
-        statement = select(Interview).where(Interview.created_at <= limit_time)
-        results = session.exec(statement).all()
-        
-        count = 0
-        for interview in results:
-            session.delete(interview)
-            count += 1
-            # Cascade delete should handle reviews/logs if configured, else manual delete needed.
-            # SQLModel relationship with cascade delete?
-            # Default helper might not set cascade in DB.
-            # For MVP, assume ORM handles it or we leave orphans (not ideal but safe).
-            # Let's delete manually to be safe if no cascade.
-            for log in interview.candidate.logs:
-                session.delete(log)
-            # Cannot delete candidate if linked to other interviews? 
-            # Logic: One candidate one interview?
-            # Yes. Delete candidate too?
-            session.delete(interview.candidate)
+        rows = session.exec(
+            select(Interview.id, Interview.reservation_time).where(Interview.status == "scheduled")
+        ).all()
+    due_timer.load(rows)
+    check_scheduled_interviews()
+
+# Tables deleted together with their interview, by FK column (stt_jobs before the reviews it references)
+INTERVIEW_CHILD_COLUMNS = [SttJob.interview_id, InterviewReview.interview_id, WebhookReceipt.interview_id, CallEvent.interview_id]
+# Tables deleted together with an orphaned candidate, by FK column
+CANDIDATE_CHILD_COLUMNS = [CommunicationLog.candidate_id]
+
+def _delete_interview_chunk(session: Session, limit_time: datetime, chunk_size: int) -> dict:
+    rows = session.exec(
+        select(Interview.id, Interview.candidate_id)
+        # Never delete bookings that are still waiting for or in their call
+        .where(Interview.created_at <= limit_time, Interview.status.not_in(PENDING_STATUSES))
+        .order_by(Interview.created_at)
+        .limit(chunk_size)
+    ).all()
+    counts = {}
+    if not rows:
+        return counts
+    interview_ids = [row[0] for row in rows]
+    candidate_ids = list({row[1] for row in rows})
+
+    for column in INTERVIEW_CHILD_COLUMNS:
+        result = session.execute(delete(column.table).where(column.in_(interview_ids)))
+        counts[column.table.name] = result.rowcount
+    result = session.execute(delete(Interview).where(Interview.id.in_(interview_ids)))
+    counts["interviews"] = result.rowcount
 
+    # Candidates go only once their last interview is gone
+    orphan_ids = session.exec(
+        select(Candidate.id).where(
+            Candidate.id.in_(candidate_ids),
+            ~exists().where(Interview.candidate_id == Candidate.id),
+        )
+    ).all()
+    if orphan_ids:
+        for column in CANDIDATE_CHILD_COLUMNS:
+            result = session.execute(delete(column.table).where(column.in_(orphan_ids)))
+            counts[column.table.name] = result.rowcount
+        result = session.execute(delete(Candidate).where(Candidate.id.in_(orphan_ids)))
+        counts["candidates"] = result.rowcount
+    return counts
+
+def cleanup_old_data() -> dict:
+    """
+    Delete interviews older than the retention window (Setting 'retention_hours',
+    default 24h) together with their reviews, plus candidates left without any
+    interview and their logs, and cached transcripts of the same age.
+    Works in chunks of CLEANUP_CHUNK_SIZE interviews with set-based DELETEs,
+    one short transaction per chunk.
+    """
+    # Requirement: "物理削除" for security.
+    started = time.monotonic()
+    with Session(engine) as session:
+        retention_hours = get_int_setting(session, "retention_hours", 24)
+    limit_time = datetime.utcnow() - timedelta(hours=retention_hours)
+
+    totals = {}
+    while True:
+        with Session(engine) as session:
+            counts = _delete_interview_chunk(session, limit_time, CLEANUP_CHUNK_SIZE)
+            session.commit()
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+        if counts.get("interviews", 0) < CLEANUP_CHUNK_SIZE:
+            break
+
+    # Cached transcripts are candidates' answers too, but keyed by audio hash, not interview: delete by age
+    with Session(engine) as session:
+        result = session.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.operation == TRANSCRIBE_OPERATION, LLMCacheEntry.created_at <= limit_time)
+        )
         session.commit()
-        if count > 0:
-            print(f"[INFO] Cleanup: Deleted {count} old interviews.")
+    if result.rowcount:
+        totals["llm_cache"] = result.rowcount
+
+    elapsed = time.monotonic() - started
+    deleted = sum(totals.values())
+    if deleted > 0:
+        detail = ", ".join(f"{table}={count}" for table, count in totals.items())
+        print(f"[INFO] Cleanup: Deleted {deleted} rows ({detail}) in {elapsed:.2f}s ({deleted / max(elapsed, 1e-6):.0f} rows/s). Retention: {retention_hours}h.")
+    return totals
+
+def _on_become_leader():
+    # Claims left in 'dialing' belong to a previous leader that died mid-dispatch
+    with Session(engine) as session:
+        result = session.execute(
+            update(Interview)
+            .where(Interview.status == "dialing")
+            .values(status="scheduled")
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+    if result.rowcount:
+        print(f"[WARN] Released {result.rowcount} stale 'dialing' claims from previous leader.")
+    dialer.start()
+    reconcile_due_timer()
+    print(f"[INFO] Scheduler is leader. {len(due_timer)} upcoming interviews loaded.")
+
+def _on_lose_leadership():
+    due_timer.load([])
+    # The next leader re-dials these; workers already holding a job are stopped by _still_ours
+    dialer.drain()
+
+lease = LeaderLease("scheduler", on_acquire=_on_become_leader, on_release=_on_lose_leadership)
 
 def start_scheduler():
-    scheduler.add_job(check_scheduled_interviews, 'interval', seconds=60)
-    scheduler.add_job(cleanup_old_data, 'cron', hour=0) # Run at midnight
+    """
+    Start scheduling in this process. Every worker calls this; only the one
+    holding the scheduler lease dials and cleans up, and a standby takes over
+    within LEADER_LEASE_TTL_SECONDS if it dies.
+    """
+    due_timer.start()
+    scheduler.add_job(_leader_only(reconcile_due_timer), 'interval', seconds=RECONCILE_SECONDS)
+    scheduler.add_job(_leader_only(poll_next_due), 'interval', seconds=NEXT_DUE_POLL_SECONDS)
+    scheduler.add_job(_leader_only(cleanup_old_data), 'cron', hour=0) # Run at midnight
     scheduler.start()
-    print("[INFO] Scheduler started.")
+    lease.start()
+    print(f"[INFO] Scheduler started ({lease.holder}).")
+
+def stop_scheduler():
+    lease.stop()
+    scheduler.shutdown(wait=False)
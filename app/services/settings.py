@@ -0,0 +1,13 @@
+from sqlmodel import Session
+from app.models import Setting
+
+def get_int_setting(session: Session, key: str, default: int) -> int:
+    """Read an integer from the settings table, falling back to `default`."""
+    setting = session.get(Setting, key)
+    if not setting:
+        return default
+    try:
+        return int(setting.value)
+    except ValueError:
+        print(f"[WARN] Setting '{key}' is not an integer ({setting.value!r}). Using {default}.")
+        return default
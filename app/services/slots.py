@@ -0,0 +1,117 @@
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.models import BookingSlot
+from app.services.settings import get_int_setting
+
+# Environment Variables
+SLOT_START_HOUR = int(os.environ.get("SLOT_START_HOUR", "10"))
+SLOT_END_HOUR = int(os.environ.get("SLOT_END_HOUR", "18")) # last slot starts before this hour
+SLOT_MINUTES = int(os.environ.get("SLOT_MINUTES", "30"))
+SLOT_DAYS_AHEAD = int(os.environ.get("SLOT_DAYS_AHEAD", "14"))
+# Used when neither the slot row nor Setting 'slot_capacity' says otherwise
+SLOT_DEFAULT_CAPACITY = int(os.environ.get("SLOT_DEFAULT_CAPACITY", "5"))
+
+def slot_grid(start: datetime, days: int = SLOT_DAYS_AHEAD) -> List[datetime]:
+    """All bookable slot start times after `start`, for `days` days."""
+    slots = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(days + 1):
+        t = day.replace(hour=SLOT_START_HOUR)
+        end = day.replace(hour=SLOT_END_HOUR)
+        while t < end:
+            if t > start:
+                slots.append(t)
+            t += timedelta(minutes=SLOT_MINUTES)
+        day += timedelta(days=1)
+    return slots
+
+def is_valid_slot(slot_time: datetime, now: datetime) -> bool:
+    return slot_time in set(slot_grid(now))
+
+def default_capacity(session: Session) -> int:
+    return get_int_setting(session, "slot_capacity", SLOT_DEFAULT_CAPACITY)
+
+def list_open_slots(session: Session, now: datetime = None) -> Dict[str, List[datetime]]:
+    """
+    Open slots grouped by date ('YYYY-MM-DD'), in order.
+    One range scan over booking_slots; slots without a row are empty and use
+    the default capacity.
+    """
+    now = now or datetime.utcnow()
+    grid = slot_grid(now)
+    if not grid:
+        return OrderedDict()
+    rows = session.exec(
+        select(BookingSlot).where(BookingSlot.slot_time >= grid[0], BookingSlot.slot_time <= grid[-1])
+    ).all()
+    by_time = {row.slot_time: row for row in rows}
+    capacity = default_capacity(session)
+
+    open_slots: Dict[str, List[datetime]] = OrderedDict()
+    for t in grid:
+        row = by_time.get(t)
+        if row is None or row.booked < row.capacity:
+            if row is None and capacity <= 0:
+                continue
+            open_slots.setdefault(t.strftime("%Y-%m-%d"), []).append(t)
+    return open_slots
+
+def _ensure_slot_row(session: Session, slot_time: datetime, capacity: int):
+    dialect = session.get_bind().dialect.name
+    values = {"slot_time": slot_time, "capacity": capacity, "booked": 0}
+    if dialect == "postgresql":
+        stmt = postgresql.insert(BookingSlot).values(**values).on_conflict_do_nothing(index_elements=["slot_time"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(BookingSlot).values(**values).on_conflict_do_nothing(index_elements=["slot_time"])
+    else:
+        if session.get(BookingSlot, slot_time) is None:
+            session.add(BookingSlot(**values))
+            session.flush()
+        return
+    session.execute(stmt)
+
+def reserve_slot(session: Session, slot_time: datetime) -> bool:
+    """
+    Take one unit of capacity in the slot. Returns False if it is full.
+    The conditional UPDATE (booked < capacity) is evaluated under the row
+    lock, so concurrent bookings can never exceed capacity.
+    Runs in the caller's transaction; commit together with the Interview.
+    """
+    _ensure_slot_row(session, slot_time, default_capacity(session))
+    result = session.execute(
+        update(BookingSlot)
+        .where(BookingSlot.slot_time == slot_time, BookingSlot.booked < BookingSlot.capacity)
+        .values(booked=BookingSlot.booked + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def release_slot(session: Session, slot_time: Optional[datetime]):
+    """Give back capacity held by a cancelled interview."""
+    if slot_time is None:
+        return
+    session.execute(
+        update(BookingSlot)
+        .where(BookingSlot.slot_time == slot_time, BookingSlot.booked > 0)
+        .values(booked=BookingSlot.booked - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def set_slot_capacity(session: Session, slot_time: datetime, capacity: int) -> BookingSlot:
+    """Per-slot override of the default capacity (admin)."""
+    _ensure_slot_row(session, slot_time, capacity)
+    session.execute(
+        update(BookingSlot)
+        .where(BookingSlot.slot_time == slot_time)
+        .values(capacity=capacity)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return session.get(BookingSlot, slot_time, populate_existing=True)
@@ -0,0 +1,237 @@
+import asyncio
+import binascii
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+
+# Environment Variables
+# Inbound frames waiting to go upstream before the Twilio reader blocks (50 = 1s)
+RELAY_QUEUE_FRAMES = int(os.environ.get("RELAY_QUEUE_FRAMES", "50"))
+# Outbound audio buffered ahead of real time before the upstream reader blocks
+RELAY_OUTBOUND_MAX_SECONDS = float(os.environ.get("RELAY_OUTBOUND_MAX_SECONDS", "30"))
+RELAY_PACE_MS = int(os.environ.get("RELAY_PACE_MS", "20"))
+
+SAMPLE_RATE = 8000 # μ-law, one byte per sample
+
+# --- Parsing ---
+# Media frames are ~98% of the traffic. Their JSON shape is fixed and base64
+# never contains a quote, so the payload is sliced out of the text; anything
+# else goes through orjson.
+
+_TWILIO_MEDIA = '{"event":"media"'
+_TWILIO_PAYLOAD = '"payload":"'
+_OPENAI_DELTA = '{"type":"response.audio.delta"'
+_OPENAI_DELTA_FIELD = '"delta":"'
+
+def _slice_string(message: str, key: str) -> Optional[str]:
+    start = message.find(key)
+    if start == -1:
+        return None
+    start += len(key)
+    return message[start:message.index('"', start)]
+
+def parse_twilio(message: str) -> Tuple[Optional[str], Any]:
+    """
+    Twilio Media Streams message -> (event, data). For "media", data is the
+    base64 payload; for every other event, the parsed message. Assumes the
+    stream carries one track (track="inbound_track", the default).
+    """
+    if message.startswith(_TWILIO_MEDIA):
+        payload = _slice_string(message, _TWILIO_PAYLOAD)
+        if payload is not None:
+            return "media", payload
+    msg = orjson.loads(message)
+    event = msg.get("event")
+    if event == "media":
+        return event, msg["media"]["payload"]
+    return event, msg
+
+def parse_openai(message) -> Tuple[Optional[str], Any]:
+    """
+    Realtime API event -> (type, data). For "response.audio.delta", data is
+    the base64 audio; otherwise the parsed event.
+    """
+    if isinstance(message, str) and message.startswith(_OPENAI_DELTA):
+        delta = _slice_string(message, _OPENAI_DELTA_FIELD)
+        if delta is not None:
+            return "response.audio.delta", delta
+    msg = orjson.loads(message)
+    event_type = msg.get("type")
+    if event_type == "response.audio.delta":
+        return event_type, msg.get("delta")
+    return event_type, msg
+
+# --- Pre-built messages ---
+# Outgoing frames differ only in the payload, so they are concatenated onto
+# a prefix built once per stream instead of serialized from a dict.
+
+_OPENAI_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+
+def openai_append(payload: str) -> str:
+    return _OPENAI_APPEND_PREFIX + payload + '"}'
+
+class TwilioMessages:
+    def __init__(self, stream_sid: str):
+        self.stream_sid = stream_sid
+        self._media_prefix = '{"event":"media","streamSid":' + orjson.dumps(stream_sid).decode() + ',"media":{"payload":"'
+        self.clear = orjson.dumps({"event": "clear", "streamSid": stream_sid}).decode()
+
+    def media(self, payload: str) -> str:
+        return self._media_prefix + payload + '"}}'
+
+    def mark(self, name: str) -> str:
+        return orjson.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}).decode()
+
+# --- Queues ---
+
+def upstream_queue(maxsize: int = RELAY_QUEUE_FRAMES) -> "asyncio.Queue[str]":
+    """Bounded: once upstream falls a second behind, put() waits and the Twilio reader stops reading."""
+    return asyncio.Queue(maxsize=maxsize)
+
+async def pump(queue: "asyncio.Queue[str]", send: Callable[[str], Awaitable]):
+    """Send everything put on `queue`, in order, until cancelled or a None is queued."""
+    while True:
+        message = await queue.get()
+        # Drain whatever else is already queued without suspending per message
+        while message is not None:
+            await send(message)
+            try:
+                message = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+        else:
+            return
+
+class PacingClock:
+    """
+    One 20 ms timer for every PacedSender on the event loop. Each tick sends
+    the next frame of every stream with audio queued, instead of each call
+    waking on its own timer. Ticks follow an absolute schedule, so a late
+    wakeup shortens the next sleep instead of drifting.
+    """
+    def __init__(self, pace_ms: int = RELAY_PACE_MS):
+        self.pace = pace_ms / 1000
+        self.active: Dict["PacedSender", None] = {} # insertion-ordered set
+        self.max_late_ms = 0.0 # worst tick behind schedule
+        self.ticks = 0
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    def start(self, sender: "PacedSender"):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._wake, self._task = loop, asyncio.Event(), None
+            self.active.clear()
+        self.active[sender] = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        self._wake.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            if not self.active:
+                self._wake.clear()
+                await self._wake.wait()
+                next_at = loop.time()
+            late = loop.time() - next_at
+            if late > 5 * self.pace:
+                # Stalled (GC, blocked loop): restart the clock rather than burst to catch up
+                next_at = loop.time()
+            elif late * 1000 > self.max_late_ms:
+                self.max_late_ms = late * 1000
+            self.ticks += 1
+            for sender in list(self.active):
+                try:
+                    more = await sender._send_frame()
+                except Exception as e:
+                    print(f"[WARN] Paced send failed for {sender.messages.stream_sid}: {e}")
+                    sender.clear()
+                    more = False
+                if not more:
+                    self.active.pop(sender, None)
+            next_at += self.pace
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"active_streams": len(self.active), "ticks": self.ticks, "max_late_ms": round(self.max_late_ms, 1)}
+
+pacing_clock = PacingClock()
+
+class PacedSender:
+    """
+    Plays outbound audio to Twilio at real-time rate.
+
+    Upstream produces speech in bursts (seconds of audio in a few deltas).
+    write() buffers it as raw μ-law and the shared PacingClock sends one
+    frame per tick. Buffering more than `max_seconds` makes write() wait
+    (backpressure on the upstream reader); clear() drops what's queued
+    (barge-in).
+    """
+    def __init__(self, send: Callable[[str], Awaitable], messages: TwilioMessages,
+                 max_seconds: float = RELAY_OUTBOUND_MAX_SECONDS, clock: PacingClock = None):
+        self.send = send
+        self.messages = messages
+        self.clock = clock or pacing_clock
+        self.frame_bytes = int(SAMPLE_RATE * self.clock.pace)
+        self.max_bytes = int(max_seconds * SAMPLE_RATE)
+        self._buf = bytearray()
+        self._pos = 0 # read offset; the consumed prefix is dropped in chunks, not per frame
+        self._space = asyncio.Event()
+        self._space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.frames_sent = 0
+        self.bursts = 0 # times the buffer played out completely
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buf) - self._pos
+
+    async def write(self, ulaw: bytes):
+        while self.buffered >= self.max_bytes:
+            self._space.clear()
+            await self._space.wait()
+        self._buf += ulaw
+        if self._idle.is_set():
+            self._idle.clear()
+            self.clock.start(self)
+
+    async def write_b64(self, payload: str):
+        await self.write(binascii.a2b_base64(payload))
+
+    def clear(self):
+        self._buf.clear()
+        self._pos = 0
+        self._space.set()
+
+    async def drain(self):
+        """Wait until everything written has been sent."""
+        await self._idle.wait()
+
+    async def _send_frame(self) -> bool:
+        """Called by the clock each tick. False once the buffer has played out."""
+        if not self.buffered:
+            self._buf.clear()
+            self._pos = 0
+            self.bursts += 1
+            self._idle.set()
+            return False
+        frame = bytes(self._buf[self._pos:self._pos + self.frame_bytes])
+        self._pos += len(frame)
+        if self._pos >= 65536:
+            del self._buf[:self._pos]
+            self._pos = 0
+        if self.buffered < self.max_bytes:
+            self._space.set()
+        await self.send(self.messages.media(binascii.b2a_base64(frame, newline=False).decode("ascii")))
+        self.frames_sent += 1
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"frames_sent": self.frames_sent, "buffered_ms": self.buffered * 1000 // SAMPLE_RATE, "bursts": self.bursts}
@@ -0,0 +1,197 @@
+import importlib.util
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.services.audio_preprocess import downmix, read_wav, resample
+from app.services.llm_client import provider
+
+# Environment Variables
+STT_BACKEND = os.environ.get("STT_BACKEND", "openai") # "openai" | "local" (faster-whisper on this machine's CPU)
+STT_MODEL = os.environ.get("STT_MODEL", "whisper-1")
+# Pieces of one long answer transcribed at once (all calls together are still capped by LLM_MAX_CONCURRENCY)
+STT_CHUNK_CONCURRENCY = int(os.environ.get("STT_CHUNK_CONCURRENCY", "6"))
+# faster-whisper model: tiny / base / small / medium / large-v3, or the path of a CTranslate2 model directory
+STT_LOCAL_MODEL = os.environ.get("STT_LOCAL_MODEL", "small")
+STT_LOCAL_MODEL_DIR = os.environ.get("STT_LOCAL_MODEL_DIR") or None # download cache; None: the Hugging Face cache
+STT_LOCAL_COMPUTE_TYPE = os.environ.get("STT_LOCAL_COMPUTE_TYPE", "int8") # int8 weights: ~4x smaller and faster than float32 on CPU
+STT_LOCAL_CPU_THREADS = int(os.environ.get("STT_LOCAL_CPU_THREADS", "0")) # 0: CTranslate2's default
+STT_LOCAL_BATCH_SIZE = int(os.environ.get("STT_LOCAL_BATCH_SIZE", "8")) # 30s windows decoded together
+STT_LOCAL_BEAM_SIZE = int(os.environ.get("STT_LOCAL_BEAM_SIZE", "1")) # 1: greedy, the fastest on CPU
+
+STT_LANGUAGE = "ja" # interviews are in Japanese; part of the transcript cache key
+LOCAL_SAMPLE_RATE = 16000 # Whisper's input rate
+LOCAL_WINDOW_SECONDS = 30 # Whisper's context; longer clips are cut into windows
+
+SttAudio = Union[bytes, BinaryIO]
+# Called with (clip index, text) as each clip is transcribed, so finished clips aren't lost if another fails
+OnResult = Optional[Callable[[int, str], None]]
+
+class OpenAISttBackend:
+    """
+    whisper-1 over the API, through the shared LLMProvider (deadline,
+    concurrency cap, retries, metrics). The clips of one answer are sent
+    concurrently, each as its own request.
+    """
+    name = "openai"
+
+    def __init__(self, model: str = STT_MODEL, concurrency: int = STT_CHUNK_CONCURRENCY):
+        self.model = model
+        self.concurrency = concurrency
+
+    @property
+    def available(self) -> bool:
+        return provider.available
+
+    @property
+    def unavailable_reason(self) -> str:
+        return "API Key missing"
+
+    @property
+    def cache_id(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def load(self):
+        pass
+
+    def transcribe(self, audio: SttAudio, filename: str = "answer.wav") -> str:
+        # The API infers the format from the file name, which a spooled/temp file doesn't have
+        return provider.transcribe("transcribe", (filename, audio), model=self.model, language=STT_LANGUAGE)
+
+    def transcribe_batch(self, clips: List[bytes], on_result: OnResult = None) -> List[str]:
+        def run(index: int) -> str:
+            text = self.transcribe(clips[index])
+            if on_result:
+                on_result(index, text)
+            return text
+        if len(clips) <= 1 or self.concurrency <= 1:
+            return [run(i) for i in range(len(clips))]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(clips)), thread_name_prefix="stt-chunk") as pool:
+            return list(pool.map(run, range(len(clips))))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model} # calls and latency: provider.metrics()["transcribe"]
+
+class LocalWhisperBackend:
+    """
+    faster-whisper (Whisper on CTranslate2) on the local CPU, so answers are
+    transcribed without a network round trip or an API key.
+
+    The model is loaded once per process, by load() or on first use, and
+    kept. Each call decodes all clips it gets (the pieces of one answer) as
+    one BatchedInferencePipeline batch. Calls from several worker threads
+    take turns: a batch already uses STT_LOCAL_CPU_THREADS cores, and
+    running two at once would only make both slower.
+    """
+    name = "local"
+
+    def __init__(self, model: str = STT_LOCAL_MODEL, compute_type: str = STT_LOCAL_COMPUTE_TYPE,
+                 cpu_threads: int = STT_LOCAL_CPU_THREADS, batch_size: int = STT_LOCAL_BATCH_SIZE,
+                 beam_size: int = STT_LOCAL_BEAM_SIZE, download_root: str = STT_LOCAL_MODEL_DIR):
+        self.model = model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.batch_size = batch_size
+        self.beam_size = beam_size
+        self.download_root = download_root
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self.load_seconds = None
+        self.calls = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    @property
+    def available(self) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    @property
+    def unavailable_reason(self) -> str:
+        return "faster-whisper not installed"
+
+    @property
+    def cache_id(self) -> str:
+        # Decoding settings change the text, so they are part of the identity
+        return f"{self.name}:{self.model}:{self.compute_type}:beam{self.beam_size}"
+
+    def load(self):
+        with self._load_lock:
+            if self._pipeline is not None:
+                return
+            from faster_whisper import BatchedInferencePipeline, WhisperModel
+            started = time.perf_counter()
+            model = WhisperModel(self.model, device="cpu", compute_type=self.compute_type,
+                                 cpu_threads=self.cpu_threads, download_root=self.download_root)
+            self._pipeline = BatchedInferencePipeline(model)
+            self.load_seconds = time.perf_counter() - started
+            print(f"[INFO] Local STT model '{self.model}' ({self.compute_type}) loaded in {self.load_seconds:.1f}s")
+
+    def _waveform(self, audio: SttAudio) -> np.ndarray:
+        """Any clip -> float32 mono at 16 kHz. Our WAVs are decoded here; anything else by faster-whisper (PyAV)."""
+        data = audio if isinstance(audio, (bytes, bytearray)) else audio.read()
+        try:
+            samples, rate = read_wav(data)
+        except ValueError:
+            from faster_whisper import decode_audio
+            return decode_audio(io.BytesIO(data), sampling_rate=LOCAL_SAMPLE_RATE)
+        return resample(downmix(samples), rate, LOCAL_SAMPLE_RATE).astype(np.float32) / 32768
+
+    def transcribe(self, audio: SttAudio, filename: str = None) -> str:
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_batch(self, clips: List[SttAudio], on_result: OnResult = None) -> List[str]:
+        waves = [self._waveform(clip) for clip in clips]
+        # One buffer, one window per clip (clips longer than Whisper's 30s are cut into several)
+        window = LOCAL_WINDOW_SECONDS * LOCAL_SAMPLE_RATE
+        starts, owners, offset = [], [], 0
+        for i, wave in enumerate(waves):
+            for start in range(0, len(wave), window):
+                starts.append(offset + start)
+                owners.append(i)
+            offset += len(wave)
+        texts = [""] * len(clips)
+        if not starts:
+            return texts
+        ends = starts[1:] + [offset]
+        clip_timestamps = [{"start": a / LOCAL_SAMPLE_RATE, "end": b / LOCAL_SAMPLE_RATE} for a, b in zip(starts, ends)]
+        bounds = np.array(starts) / LOCAL_SAMPLE_RATE
+        self.load()
+        with self._run_lock:
+            started = time.perf_counter()
+            segments, _ = self._pipeline.transcribe(
+                np.concatenate(waves), language=STT_LANGUAGE, beam_size=self.beam_size, batch_size=self.batch_size,
+                clip_timestamps=clip_timestamps, without_timestamps=True,
+            )
+            # Decoding happens while the generator is consumed
+            for segment in segments:
+                window_index = max(0, int(np.searchsorted(bounds, segment.start + 1e-3, side="right")) - 1)
+                texts[owners[window_index]] += segment.text.strip()
+            self.calls += 1
+            self.audio_seconds += offset / LOCAL_SAMPLE_RATE
+            self.busy_seconds += time.perf_counter() - started
+        if on_result:
+            for index, text in enumerate(texts):
+                on_result(index, text)
+        return texts
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name, "model": self.model, "compute_type": self.compute_type, "loaded": self._pipeline is not None,
+            "load_seconds": round(self.load_seconds, 1) if self.load_seconds is not None else None,
+            "calls": self.calls, "audio_seconds": round(self.audio_seconds, 1), "busy_seconds": round(self.busy_seconds, 1),
+            # Real-time factor: seconds of compute per second of audio
+            "rtf": round(self.busy_seconds / self.audio_seconds, 3) if self.audio_seconds else None,
+        }
+
+def make_stt_backend(name: str = STT_BACKEND):
+    if name == "openai":
+        return OpenAISttBackend()
+    if name == "local":
+        return LocalWhisperBackend()
+    raise ValueError(f"Unknown STT_BACKEND: {name}")
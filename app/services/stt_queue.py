@@ -0,0 +1,340 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import engine
+from app.models import InterviewReview, SttJob
+from app.services.answer_detector import ulaw_to_wav
+from app.services.audio_preprocess import STT_PREPROCESS, PreparedAudio, prepare_ulaw, prepare_wav
+from app.services.stt_service import download_recording, get_stt_backend, join_segments, transcribe, transcribe_chunks
+from app.services.transcript_cache import transcript_cache
+
+# Environment Variables
+STT_WORKERS = int(os.environ.get("STT_WORKERS", "4")) # jobs transcribed at once per worker process
+# "on": the web process also runs STT_WORKERS workers. Set "off" when `python stt_worker.py` runs separately.
+STT_WORKER_IN_WEB = os.environ.get("STT_WORKER_IN_WEB", "on")
+STT_POLL_SECONDS = float(os.environ.get("STT_POLL_SECONDS", "2"))
+# A job whose worker died is picked up again once its lease runs out
+STT_JOB_LEASE_SECONDS = int(os.environ.get("STT_JOB_LEASE_SECONDS", "600"))
+STT_MAX_ATTEMPTS = int(os.environ.get("STT_MAX_ATTEMPTS", "6"))
+STT_RETRY_BASE_SECONDS = int(os.environ.get("STT_RETRY_BASE_SECONDS", "10"))
+STT_RETRY_MAX_SECONDS = int(os.environ.get("STT_RETRY_MAX_SECONDS", "900"))
+# Record mode: jobs wait for Twilio's recording status callback; if it never comes, they run after this anyway
+STT_RECORDING_WAIT_SECONDS = int(os.environ.get("STT_RECORDING_WAIT_SECONDS", "60"))
+
+def retry_delay_seconds(attempt: int) -> int:
+    """Backoff after the n-th failed attempt (1-based): 10s, 20s, 40s ... capped."""
+    return min(STT_RETRY_MAX_SECONDS, STT_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+
+async def enqueue_stt(session: AsyncSession, review: InterviewReview, recording_url: str = None, audio: bytes = None, wait_for_recording: bool = False) -> SttJob:
+    """
+    Add a transcription job for `review` to the session. The caller commits,
+    so the job exists exactly when the review does, then calls
+    stt_workers.wake(). `review` must have an id (flush first). Pass the
+    Twilio recording URL, or raw μ-law `audio`.
+
+    wait_for_recording: Twilio may not serve the recording yet. The job is
+    held until release_stt_jobs() (recording status callback), or
+    STT_RECORDING_WAIT_SECONDS as a fallback; a 404 after that is retried
+    with backoff like any other failure.
+    """
+    run_at = datetime.utcnow()
+    if wait_for_recording:
+        run_at += timedelta(seconds=STT_RECORDING_WAIT_SECONDS)
+    job = SttJob(review_id=review.id, interview_id=review.interview_id, recording_url=recording_url, audio=audio, run_at=run_at)
+    session.add(job)
+    return job
+
+async def release_stt_jobs(session: AsyncSession, interview_id: int, recording_url: str) -> int:
+    """The recording is downloadable now: make jobs waiting for it runnable. The caller commits."""
+    result = await session.execute(
+        update(SttJob)
+        .where(SttJob.interview_id == interview_id, SttJob.recording_url == recording_url, SttJob.status == "queued")
+        .values(run_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def claim_stt_jobs(session: Session, worker: str, limit: int = 1, now: datetime = None) -> List[int]:
+    """
+    Atomically take up to `limit` runnable jobs: queued ones whose backoff is
+    over, and running ones whose lease has expired (their worker died).
+    Claimed jobs get run_at = lease expiry. Same pattern as
+    claim_due_interviews: FOR UPDATE SKIP LOCKED on Postgres, a single
+    atomic UPDATE on SQLite. The caller commits.
+    """
+    now = now or datetime.utcnow()
+    runnable = (
+        select(SttJob.id)
+        .where(SttJob.status.in_(("queued", "running")), SttJob.run_at <= now)
+        .order_by(SttJob.run_at)
+        .limit(limit)
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        runnable = runnable.with_for_update(skip_locked=True)
+    stmt = (
+        update(SttJob)
+        .where(SttJob.id.in_(runnable))
+        .values(
+            status="running",
+            worker=worker,
+            attempts=SttJob.attempts + 1,
+            run_at=now + timedelta(seconds=STT_JOB_LEASE_SECONDS),
+            started_at=now,
+        )
+        .returning(SttJob.id)
+        .execution_options(synchronize_session=False)
+    )
+    return [row[0] for row in session.execute(stmt)]
+
+def _finish(session: Session, job: SttJob, worker: str, **values) -> bool:
+    # Only while we still hold the lease; a worker that lost it must not overwrite the new holder
+    result = session.execute(
+        update(SttJob)
+        .where(SttJob.id == job.id, SttJob.worker == worker, SttJob.status == "running")
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+class SttResult(NamedTuple):
+    text: str
+    audio: Optional[PreparedAudio] = None # None when the audio was uploaded unprocessed
+    segments: Optional[List[Dict[str, Any]]] = None # [{"start", "end", "text"}], seconds into the recording
+
+def run_stt_job(job: SttJob) -> SttResult:
+    """
+    Transcribe one job. Raises on failure; the worker decides retry or
+    dead-letter. With STT_PREPROCESS on, the audio is trimmed to the speech
+    and re-encoded before upload (audio_preprocess), an answer with no
+    speech at all isn't sent to the API, and one longer than
+    STT_CHUNK_SECONDS is transcribed in pieces at once.
+    """
+    if job.audio is not None:
+        if STT_PREPROCESS != "on":
+            return SttResult(transcribe(ulaw_to_wav(job.audio), "answer.wav"))
+        prepared = prepare_ulaw(job.audio)
+    else:
+        with download_recording(job.recording_url) as recording:
+            if STT_PREPROCESS != "on":
+                return SttResult(transcribe(recording, "recording.wav"))
+            try:
+                prepared = prepare_wav(recording.read())
+            except ValueError as e:
+                print(f"[WARN] STT job {job.id}: can't preprocess recording ({e}); uploading it as is")
+                recording.seek(0)
+                return SttResult(transcribe(recording, "recording.wav"))
+    print(f"[INFO] STT job {job.id}: {prepared.original_seconds:.1f}s -> {prepared.seconds:.1f}s in {len(prepared.chunks)} piece(s) "
+          f"(speech {prepared.speech_ratio:.0%}), {prepared.original_bytes:,} -> {prepared.upload_bytes:,} bytes")
+    if not prepared.chunks:
+        return SttResult("", prepared)
+    segments = transcribe_chunks(prepared.chunks)
+    # Offsets of a streamed answer don't point into the call recording the review links to, so only recordings keep them
+    return SttResult(join_segments(segments), prepared, segments if job.audio is None else None)
+
+class SttWorkerPool:
+    """
+    Threads that claim jobs from stt_jobs and transcribe them.
+
+    Any number of processes may run a pool (the web app, `python
+    stt_worker.py`, or both); the claim is atomic, so each job runs once at
+    a time. A failed attempt goes back to 'queued' with exponential backoff;
+    after STT_MAX_ATTEMPTS it is dead-lettered ('dead', last_error kept) and
+    the review gets a "(STT failed: ...)" transcript, as before. Jobs of a
+    worker that died are retaken when their lease expires.
+    """
+    def __init__(self, workers: int = STT_WORKERS, poll_interval: float = STT_POLL_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+        # Audio seen vs. sent to the API, for preprocessed jobs
+        self.audio_seconds_in = 0.0
+        self.audio_seconds_uploaded = 0.0
+        self.bytes_in = 0
+        self.bytes_uploaded = 0
+        self.skipped_silent = 0
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"stt-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[INFO] STT workers started: {self.workers} on {self.name}")
+
+    def stop(self, timeout: float = 30):
+        """Finish jobs in progress (up to `timeout`); unfinished ones are retaken after their lease."""
+        self._stop.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(0, deadline - time.monotonic()))
+        self._threads = []
+
+    def wake(self):
+        """A job was enqueued in this process: look now instead of at the next poll."""
+        self._wake.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one job. False if there was nothing to do."""
+        with Session(engine) as session:
+            ids = claim_stt_jobs(session, self.name)
+            session.commit()
+            if not ids:
+                return False
+            job = session.get(SttJob, ids[0])
+            session.expunge(job)
+        with self._lock:
+            self.busy += 1
+        try:
+            self._process(job)
+        finally:
+            with self._lock:
+                self.busy -= 1
+        return True
+
+    def _process(self, job: SttJob):
+        backend = get_stt_backend()
+        if not backend.available:
+            print(f"[WARN] STT backend '{backend.name}' unavailable ({backend.unavailable_reason}). STT skipped.")
+            self._complete(job, f"(STT disabled: {backend.unavailable_reason})")
+            return
+        try:
+            result = run_stt_job(job)
+        except Exception as e:
+            self._fail(job, e)
+            return
+        self._complete(job, result.text, result.audio, result.segments)
+
+    def _complete(self, job: SttJob, text: str, audio: PreparedAudio = None, segments: List[Dict[str, Any]] = None):
+        with Session(engine) as session:
+            if not _finish(session, job, self.name, status="done", audio=None, last_error=None, finished_at=datetime.utcnow()):
+                print(f"[WARN] STT job {job.id} lost its lease; result discarded")
+                return
+            review = session.get(InterviewReview, job.review_id)
+            if review:
+                review.transcript = text
+                review.transcript_segments = segments
+                if audio:
+                    review.speech_ratio = round(audio.speech_ratio, 3)
+                    review.trimmed_seconds = round(audio.trimmed_seconds, 2)
+                session.add(review)
+            session.commit()
+        with self._lock:
+            self.completed += 1
+            if audio:
+                self.audio_seconds_in += audio.original_seconds
+                self.audio_seconds_uploaded += audio.seconds
+                self.bytes_in += audio.original_bytes
+                self.bytes_uploaded += audio.upload_bytes
+                self.skipped_silent += not audio.chunks
+        print(f"[INFO] STT Completed for Review {job.review_id}")
+
+    def _fail(self, job: SttJob, error: Exception):
+        message = f"{type(error).__name__}: {error}"[:500]
+        now = datetime.utcnow()
+        with Session(engine) as session:
+            if job.attempts >= STT_MAX_ATTEMPTS:
+                # Audio is kept so requeue_dead_jobs() can run it again
+                if _finish(session, job, self.name, status="dead", last_error=message, finished_at=now):
+                    review = session.get(InterviewReview, job.review_id)
+                    if review:
+                        review.transcript = f"(STT failed: {message})"
+                        session.add(review)
+                    with self._lock:
+                        self.dead += 1
+                    print(f"[ERROR] STT job {job.id} (review {job.review_id}) gave up after {job.attempts} attempts: {message}")
+            else:
+                delay = retry_delay_seconds(job.attempts)
+                if _finish(session, job, self.name, status="queued", last_error=message, run_at=now + timedelta(seconds=delay)):
+                    with self._lock:
+                        self.retried += 1
+                    print(f"[WARN] STT job {job.id} attempt {job.attempts}/{STT_MAX_ATTEMPTS} failed ({message}); retry in {delay}s")
+            session.commit()
+
+    def _run(self):
+        backend = get_stt_backend()
+        if backend.available:
+            try:
+                backend.load() # a local model loads once, before the first claim rather than inside a job's lease
+            except Exception as e:
+                print(f"[ERROR] STT backend '{backend.name}' failed to load: {e}")
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"[ERROR] STT worker loop failed: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._threads), "busy": self.busy, "completed": self.completed, "retried": self.retried, "dead": self.dead,
+                "audio_seconds_in": round(self.audio_seconds_in, 1), "audio_seconds_uploaded": round(self.audio_seconds_uploaded, 1),
+                "bytes_in": self.bytes_in, "bytes_uploaded": self.bytes_uploaded, "skipped_silent": self.skipped_silent,
+            }
+
+stt_workers = SttWorkerPool()
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct))], 1)
+
+def stt_queue_metrics(session: Session, window_minutes: int = 60) -> Dict[str, Any]:
+    """
+    Queue depth per status, how long the oldest runnable job has waited, and
+    job latency (enqueued -> transcript saved) over the last `window_minutes`.
+    Read from the table, so it covers every worker process.
+    """
+    now = datetime.utcnow()
+    depth = dict(session.exec(select(SttJob.status, func.count()).group_by(SttJob.status)).all())
+    oldest = session.exec(select(func.min(SttJob.created_at)).where(SttJob.status == "queued")).one()
+    since = now - timedelta(minutes=window_minutes)
+    rows = session.exec(
+        select(SttJob.created_at, SttJob.finished_at, SttJob.attempts)
+        .where(SttJob.status == "done", SttJob.finished_at >= since)
+    ).all()
+    latencies = [(finished - created).total_seconds() for created, finished, _ in rows]
+    return {
+        "depth": {status: depth.get(status, 0) for status in ("queued", "running", "done", "dead")},
+        "oldest_queued_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+        f"done_last_{window_minutes}m": len(rows),
+        "latency_p50_seconds": _percentile(latencies, 0.5),
+        "latency_p95_seconds": _percentile(latencies, 0.95),
+        "retried_jobs": sum(1 for _, _, attempts in rows if attempts > 1),
+        "this_process": stt_workers.metrics(),
+        "backend": get_stt_backend().metrics(),
+        "cache": transcript_cache.metrics(),
+    }
+
+def requeue_dead_jobs(session: Session) -> int:
+    """Give every dead-lettered job a fresh set of attempts (e.g. after fixing an API key). The caller commits."""
+    result = session.execute(
+        update(SttJob)
+        .where(SttJob.status == "dead")
+        .values(status="queued", attempts=0, run_at=datetime.utcnow(), finished_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -1,66 +1,108 @@
 import os
-import time
+import tempfile
+from typing import Any, BinaryIO, Dict, List, Union
 import requests
-import openai
-from openai import OpenAI
+from app.services.audio_preprocess import AudioChunk
+from app.services.stt_backends import STT_LANGUAGE, make_stt_backend
+from app.services.transcript_cache import transcript_cache, transcript_key
 
 # Environment Variables
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+STT_DOWNLOAD_TIMEOUT_SECONDS = float(os.environ.get("STT_DOWNLOAD_TIMEOUT_SECONDS", "30"))
+# Recordings up to this size stay in memory; larger ones spill to an (already unlinked) temp file
+STT_SPOOL_MAX_BYTES = int(os.environ.get("STT_SPOOL_MAX_BYTES", str(1024 * 1024)))
+STT_SPOOL_DIR = os.environ.get("STT_SPOOL_DIR") or None # None: the system temp dir
 
-# Initialize OpenAI Client
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+# Whisper API upload limit; anything larger would be rejected after the upload anyway
+MAX_RECORDING_BYTES = 25 * 1024 * 1024
 
-def transcribe_audio_url(audio_url: str, max_retries: int = 5, retry_delay: int = 3) -> str:
+class RecordingNotReady(Exception):
+    """Twilio answered 404: the recording exists but isn't downloadable yet."""
+
+def download_recording(audio_url: str, timeout: float = STT_DOWNLOAD_TIMEOUT_SECONDS) -> tempfile.SpooledTemporaryFile:
     """
-    Downloads audio from URL and transcribes it using OpenAI Whisper.
-    Retries download if file is not ready (Twilio lag).
+    One download attempt of a Twilio recording, streamed in chunks into a
+    SpooledTemporaryFile positioned at 0. Use it as a context manager: it
+    lives in memory up to STT_SPOOL_MAX_BYTES, then in a temp file that is
+    unlinked from the start, so closing it (or the process dying) always
+    frees the space. Raises RecordingNotReady on 404 (worth retrying
+    shortly) and requests exceptions for anything else.
     """
-    if not client:
-        print("[WARN] OpenAI API Key not set. STT skipped.")
-        return "(STT disabled: API Key missing)"
+    spool = tempfile.SpooledTemporaryFile(max_size=STT_SPOOL_MAX_BYTES, dir=STT_SPOOL_DIR)
+    try:
+        # Add Basic Auth for Twilio
+        auth = (os.environ.get("TWILIO_ACCOUNT_SID"), os.environ.get("TWILIO_AUTH_TOKEN"))
+        with requests.get(audio_url, auth=auth, timeout=timeout, stream=True) as response:
+            if response.status_code == 404:
+                raise RecordingNotReady(audio_url)
+            response.raise_for_status()
+            size = 0
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_RECORDING_BYTES:
+                    raise ValueError(f"Recording larger than {MAX_RECORDING_BYTES} bytes: {audio_url}")
+                spool.write(chunk)
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
 
-    import uuid
-    file_path = f"temp_{uuid.uuid4()}.wav" # Temporary file path
-    
-    # Download with retry
-    for i in range(max_retries):
-        try:
-            # Add Basic Auth for Twilio
-            auth = (os.environ.get("TWILIO_ACCOUNT_SID"), os.environ.get("TWILIO_AUTH_TOKEN"))
-            response = requests.get(audio_url, auth=auth)
-            if response.status_code == 200:
-                # Check Content-Type or size if needed, but 200 is usually good enough for MVP
-                with open(file_path, "wb") as f:
-                    f.write(response.content)
-                break
-            elif response.status_code == 404:
-                print(f"[INFO] Audio not ready yet, retrying... ({i+1}/{max_retries})")
-                time.sleep(retry_delay)
-            else:
-                print(f"[WARN] Audio download failed: {response.status_code}")
-                return f"(STT failed: Download error {response.status_code})"
-        except Exception as e:
-            print(f"[ERROR] Audio download exception: {e}")
-            return f"(STT failed: {str(e)})"
-    else:
-        return "(STT failed: Audio not accessible after retries)"
+# STT_BACKEND: the OpenAI API or a local model; one per process
+_backend = make_stt_backend()
 
-    # Transcribe
-    try:
-        with open(file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file,
-                language="ja"
-            )
-        
-        # Cleanup
-        try:
-            os.remove(file_path)
-        except:
-            pass
-            
-        return transcript.text
-    except Exception as e:
-        print(f"[ERROR] Whisper API error: {e}")
-        return f"(STT failed: {str(e)})"
+def get_stt_backend():
+    return _backend
+
+def set_stt_backend(backend):
+    """Swap the engine (benchmarks, offline runs)."""
+    global _backend
+    _backend = backend
+
+def _cache_key(audio: Union[bytes, BinaryIO]):
+    return transcript_key(audio, _backend.cache_id, STT_LANGUAGE) if transcript_cache.enabled else None
+
+def transcribe(audio: Union[bytes, BinaryIO], filename: str = "answer.wav") -> str:
+    """
+    Audio bytes or an open binary file -> transcript, on the configured
+    backend. With the OpenAI backend a file is streamed into the upload as
+    is (no copy in memory). Audio transcribed before (same bytes, backend
+    and model) comes from the transcript cache without a call. Raises on
+    failure (LLMError for the API); callers decide whether to retry.
+    """
+    key = _cache_key(audio)
+    if key:
+        text = transcript_cache.get(key)
+        if text is not None:
+            return text
+    text = _backend.transcribe(audio, filename)
+    if key:
+        transcript_cache.put(key, text)
+    return text
+
+def transcribe_chunks(chunks: List[AudioChunk]) -> List[Dict[str, Any]]:
+    """
+    The pieces of one answer (audio_preprocess.prepare_*) -> [{"start",
+    "end", "text"}] in order, transcribed together: concurrent requests on
+    the OpenAI backend, one batch on the local one. Either way a long
+    answer takes about as long as its longest piece. Pieces found in the
+    transcript cache aren't sent. Raises if any piece fails; the job is
+    retried as a whole, and the pieces that did finish are cached by then.
+    """
+    keys = [_cache_key(chunk.data) for chunk in chunks]
+    texts = [transcript_cache.get(key) if key else None for key in keys]
+    missing = [i for i, text in enumerate(texts) if text is None]
+
+    def on_result(index: int, text: str):
+        if keys[missing[index]]:
+            transcript_cache.put(keys[missing[index]], text)
+
+    if missing:
+        fresh = _backend.transcribe_batch([chunks[i].data for i in missing], on_result=on_result)
+        for i, text in zip(missing, fresh):
+            texts[i] = text
+    return [{"start": round(chunk.start, 2), "end": round(chunk.end, 2), "text": text.strip()} for chunk, text in zip(chunks, texts)]
+
+def join_segments(segments: List[Dict[str, Any]]) -> str:
+    # Japanese: no separator between sentences
+    return "".join(segment["text"] for segment in segments)
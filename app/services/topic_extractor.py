@@ -0,0 +1,184 @@
+import asyncio
+import os
+import re
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.llm_service import extract_topic
+
+# Environment Variables
+# Below this the local result is checked with the LLM
+TOPIC_MIN_CONFIDENCE = float(os.environ.get("TOPIC_MIN_CONFIDENCE", "0.6"))
+# Hard cap on the LLM round trip; the caller is waiting on the phone
+TOPIC_LLM_TIMEOUT_SECONDS = float(os.environ.get("TOPIC_LLM_TIMEOUT_SECONDS", "1.5"))
+
+FALLBACK_TOPIC = "ご質問"
+
+# Canonical topic -> surface forms candidates use for it. Longer matches win,
+# so "通勤手当" is 交通費 even though "通勤" alone means 勤務地.
+HR_TOPICS: Dict[str, List[str]] = {
+    "福利厚生": ["福利厚生", "福利", "福祉", "手当", "社宅", "寮", "住宅手当", "家賃補助", "住宅補助", "ベネフィット", "社会保険", "保険", "社割", "社員割引"],
+    "残業": ["残業", "時間外労働", "時間外", "残業代", "定時", "退社時間", "帰る時間", "終業時間"],
+    "給与": ["給与", "給料", "お給料", "月給", "年収", "収入", "報酬", "賃金", "初任給", "基本給", "手取り", "時給"],
+    "賞与": ["賞与", "ボーナス", "インセンティブ"],
+    "昇給": ["昇給", "ベースアップ", "給料が上が", "給与が上が"],
+    "評価制度": ["評価制度", "人事評価", "評価", "昇進", "昇格", "キャリアパス", "キャリアアップ", "出世"],
+    "リモートワーク": ["リモートワーク", "リモート", "在宅勤務", "在宅", "テレワーク", "出社頻度", "出社"],
+    "休日・休暇": ["休日", "休暇", "有給休暇", "有給", "有休", "年間休日", "土日", "祝日", "夏季休暇", "夏休み", "年末年始", "連休", "お休み", "休み"],
+    "勤務時間": ["勤務時間", "就業時間", "始業", "出勤時間", "労働時間", "フレックス", "コアタイム", "シフト", "何時から", "何時まで"],
+    "勤務地": ["勤務地", "転勤", "職場の場所", "オフィスの場所", "オフィス", "事務所", "最寄り駅", "最寄り", "通勤", "勤務場所"],
+    "交通費": ["交通費", "通勤手当", "通勤費", "定期代"],
+    "研修": ["研修", "教育制度", "育成", "新人研修", "OJT", "勉強会", "資格取得", "資格支援", "マニュアル", "未経験"],
+    "配属": ["配属", "部署", "配置", "異動", "ジョブローテーション"],
+    "仕事内容": ["仕事内容", "業務内容", "職務内容", "具体的な業務", "担当業務", "一日の流れ", "1日の流れ", "仕事の流れ"],
+    "職場の雰囲気": ["雰囲気", "社風", "人間関係", "職場環境", "働く環境", "チームの", "社員の方", "上司"],
+    "服装": ["服装", "髪型", "髪色", "ドレスコード", "私服", "スーツ", "ネイル", "身だしなみ", "ピアス"],
+    "選考": ["選考", "合否", "面接結果", "選考結果", "結果の連絡", "次の面接", "二次面接", "最終面接", "内定", "結果"],
+    "入社日": ["入社日", "入社時期", "いつから働", "勤務開始", "入社はいつ"],
+    "副業": ["副業", "兼業", "ダブルワーク", "複業"],
+    "試用期間": ["試用期間", "見習い期間"],
+    "退職金": ["退職金", "企業年金", "確定拠出年金"],
+    "育児支援": ["育児", "育休", "育児休暇", "産休", "時短勤務", "時短", "子育て", "託児"],
+    "社員構成": ["年齢層", "男女比", "平均年齢", "社員数", "従業員数", "女性社員", "男性社員"],
+    "離職率": ["離職率", "定着率", "辞める人", "退職率", "勤続年数"],
+    "今後の事業展開": ["事業展開", "将来性", "今後の事業", "ビジョン", "今後の方針", "経営方針", "新規事業", "海外展開"],
+    "働き方": ["働き方", "勤務形態", "雇用形態", "正社員", "契約社員", "パート"],
+}
+
+# Forms that name a topic only loosely; a match on one of these alone is
+# reported with lower confidence.
+WEAK_FORMS = {"手当", "保険", "休み", "お休み", "評価", "オフィス", "出社", "通勤", "上司", "チームの", "社員の方", "未経験", "マニュアル", "最寄り", "寮", "結果"}
+
+# Nouns that never make a good "〇〇についてですね"
+STOP_NOUNS = {
+    "御社", "貴社", "弊社", "会社", "質問", "確認", "説明", "詳細", "具体的", "具体", "内容", "情報", "参考",
+    "大丈夫", "以上", "特", "今日", "本日", "今", "私", "自分", "事", "何", "方", "点", "件", "一点", "一つ",
+    "場合", "時", "際", "等", "例", "他", "感", "実際", "面接官", "最後", "少", "是非", "全然", "普段",
+}
+
+# Particles after a noun that mark it as what the question is about
+TOPIC_CUES = ("について", "に関して", "に関する", "に関し", "についての", "って", "とは", "は", "の")
+
+class TopicResult(NamedTuple):
+    topic: str
+    confidence: float
+    source: str # "dictionary" | "noun_phrase" | "llm" | "fallback"
+
+def _normalize(text: str) -> str:
+    # Full-width latin/digits -> ASCII, half-width kana -> full-width
+    return unicodedata.normalize("NFKC", text or "").strip()
+
+def _build_index() -> List[Tuple[str, str]]:
+    forms = [(form, topic) for topic, surfaces in HR_TOPICS.items() for form in surfaces]
+    # Longest first so the alternation prefers "通勤手当" over "通勤"
+    forms.sort(key=lambda ft: -len(ft[0]))
+    return forms
+
+_FORMS = _build_index()
+_FORM_TOPIC = {form.lower(): topic for form, topic in _FORMS}
+_FORM_RE = re.compile("|".join(re.escape(form) for form, _ in _FORMS), re.IGNORECASE)
+
+def _match_dictionary(text: str) -> Optional[TopicResult]:
+    found: List[str] = []
+    strong = False
+    for m in _FORM_RE.finditer(text):
+        topic = _FORM_TOPIC[m.group(0).lower()]
+        if topic not in found:
+            found.append(topic)
+        strong = strong or m.group(0) not in WEAK_FORMS
+    if not found:
+        return None
+    # Two topics read fine ("残業と給与についてですね"); more becomes a list
+    topic = "と".join(found[:2])
+    return TopicResult(topic, 0.95 if strong else 0.7, "dictionary")
+
+def _char_class(ch: str) -> str:
+    if ch == "ー" or "゠" <= ch <= "ヿ":
+        return "katakana"
+    if "぀" <= ch <= "ゟ":
+        return "hiragana"
+    if "一" <= ch <= "鿿" or ch in "々〆ヶ":
+        return "kanji"
+    if ch.isascii() and ch.isalnum():
+        return "latin"
+    return "other"
+
+NOUN_CLASSES = ("kanji", "katakana", "latin")
+
+def noun_phrases(text: str) -> List[Tuple[str, str]]:
+    """
+    Script-class chunking: runs of kanji / katakana / latin are content words
+    (compound nouns stay together: 研修制度, AIツール), hiragana runs are
+    particles and inflections. Returns (noun, following hiragana) pairs.
+    """
+    chunks: List[Tuple[str, str]] = []
+    noun, tail = "", ""
+    for ch in text:
+        cls = _char_class(ch)
+        if cls in NOUN_CLASSES:
+            if tail or not noun:
+                if noun:
+                    chunks.append((noun, tail))
+                noun, tail = ch, ""
+            else:
+                noun += ch
+        elif cls == "hiragana" and noun:
+            tail += ch
+        else:
+            if noun:
+                chunks.append((noun, tail))
+            noun, tail = "", ""
+    if noun:
+        chunks.append((noun, tail))
+    return chunks
+
+def _candidates(chunks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    candidates = []
+    for i, (noun, tail) in enumerate(chunks):
+        # 強み, 弱み, 重さ: one kanji plus a nominalising み/さ
+        if len(noun) == 1 and tail[:1] in ("み", "さ") and tail[1:].startswith(TOPIC_CUES + ("を", "が", "に")):
+            noun, tail = noun + tail[0], tail[1:]
+            chunks[i] = (noun, tail)
+        candidates.append((noun, tail))
+        # AIの活用, 営業の目標: "A の B" reads better than B alone
+        if i and chunks[i - 1][1] == "の" and chunks[i - 1][0] not in STOP_NOUNS and len(noun) > 1:
+            candidates.append((f"{chunks[i - 1][0]}の{noun}", tail))
+    return candidates
+
+def _match_noun_phrase(text: str) -> Optional[TopicResult]:
+    best: Optional[Tuple[float, str]] = None
+    for noun, tail in _candidates(noun_phrases(text)):
+        if noun in STOP_NOUNS or len(noun) < 2:
+            continue
+        cued = tail.startswith(TOPIC_CUES)
+        score = (0.65 if tail.startswith(("について", "に関")) else 0.55 if cued else 0.45)
+        # Prefer the more specific (longer) of equally cued nouns
+        key = score + min(len(noun), 8) * 0.001
+        if best is None or key > best[0]:
+            best = (key, noun)
+    if best is None:
+        return None
+    return TopicResult(best[1], round(best[0], 2), "noun_phrase")
+
+def extract_topic_local(text: str) -> TopicResult:
+    """Dictionary first, then the best-cued noun phrase. Pure Python, no I/O."""
+    text = _normalize(text)
+    return _match_dictionary(text) or _match_noun_phrase(text) or TopicResult(FALLBACK_TOPIC, 0.0, "fallback")
+
+async def resolve_topic(text: str, min_confidence: float = TOPIC_MIN_CONFIDENCE, timeout: float = TOPIC_LLM_TIMEOUT_SECONDS) -> TopicResult:
+    """
+    Topic to read back to the candidate. The LLM is consulted only when the
+    local result is below min_confidence, in a worker thread and for at most
+    `timeout` seconds; otherwise the local guess stands.
+    """
+    local = extract_topic_local(text)
+    if local.confidence >= min_confidence:
+        return local
+    try:
+        topic = await asyncio.wait_for(asyncio.to_thread(extract_topic, text, timeout), timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"[WARN] Topic LLM timed out after {timeout}s; using local '{local.topic}'")
+        return local
+    if not topic or topic == FALLBACK_TOPIC:
+        return local
+    return TopicResult(topic, 1.0, "llm")
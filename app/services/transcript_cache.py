@@ -0,0 +1,49 @@
+import hashlib
+import os
+from typing import BinaryIO, Dict, Union
+
+from app.services.llm_cache import LLMCache
+
+# Environment Variables
+STT_CACHE = os.environ.get("STT_CACHE", "on") # "off": every transcription goes to the backend
+STT_CACHE_SIZE = int(os.environ.get("STT_CACHE_SIZE", "1024")) # transcripts kept in memory; all of them are in llm_cache
+# Memory copies expire after this; the DB copies are deleted with the interviews (retention_hours)
+STT_CACHE_MEMORY_TTL_SECONDS = int(os.environ.get("STT_CACHE_MEMORY_TTL_SECONDS", "3600"))
+
+TRANSCRIBE_OPERATION = "transcribe" # llm_cache.operation of cached transcripts
+HASH_BLOCK_BYTES = 64 * 1024
+
+def audio_digest(audio: Union[bytes, BinaryIO]) -> str:
+    """sha256 of the audio bytes. A file is hashed in blocks from its current position, then rewound there."""
+    digest = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        digest.update(audio)
+    else:
+        start = audio.tell()
+        for block in iter(lambda: audio.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+        audio.seek(start)
+    return digest.hexdigest()
+
+def transcript_key(audio: Union[bytes, BinaryIO], engine_id: str, language: str) -> str:
+    """Same key form as the other llm_cache entries: sha256 of operation + model + input."""
+    return hashlib.sha256(f"{TRANSCRIBE_OPERATION}\0{engine_id}\0{language}\0{audio_digest(audio)}".encode("utf-8")).hexdigest()
+
+class TranscriptCache(LLMCache):
+    """
+    Transcripts by content: the same audio bytes, engine and language give
+    the same text, so they are transcribed once. Retried jobs, re-queued
+    dead jobs and test calls replaying one fixture then cost no API calls,
+    and a job retried after one piece failed only sends the pieces that
+    had no transcript yet.
+
+    Entries are written when a piece is transcribed, never on failure.
+    """
+    def __init__(self, maxsize: int = STT_CACHE_SIZE, ttl: float = STT_CACHE_MEMORY_TTL_SECONDS, enabled: bool = STT_CACHE == "on"):
+        super().__init__(TRANSCRIBE_OPERATION, maxsize, ttl)
+        self.enabled = enabled
+
+    def metrics(self) -> Dict[str, object]:
+        return {"enabled": self.enabled, **super().metrics()}
+
+transcript_cache = TranscriptCache()
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List
+
+from twilio.twiml.voice_response import VoiceResponse
+
+# Stands in for the interview id while a TwiML document is rendered once and
+# reused; it only ever appears inside action/redirect URLs.
+INTERVIEW_ID_PLACEHOLDER = "__INTERVIEW_ID__"
+
+def compile_template(build: Callable[[str], VoiceResponse]) -> str:
+    """Render a VoiceResponse once, with the interview id left as a placeholder."""
+    return str(build(INTERVIEW_ID_PLACEHOLDER))
+
+def fill(template: str, interview_id: int) -> str:
+    return template.replace(INTERVIEW_ID_PLACEHOLDER, str(interview_id))
+
+def snapshot_hash(snapshot: List[dict]) -> str:
+    """Stable key for a question-set snapshot (same questions -> same hash)."""
+    return hashlib.sha1(json.dumps(snapshot, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+class TemplateCache:
+    """
+    Bounded LRU of compiled TwiML templates, e.g. keyed by
+    (snapshot_hash, q_index). Shared by every interview on the same
+    question set.
+    """
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, key: Hashable, build: Callable[[str], VoiceResponse]) -> str:
+        with self._lock:
+            template = self._data.get(key)
+            if template is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return template
+        template = compile_template(build)
+        with self._lock:
+            self.misses += 1
+            self._data[key] = template
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return template
@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine
+from app.models import WebhookReceipt
+
+# Environment Variables
+WEBHOOK_RECEIPT_CACHE_SIZE = int(os.environ.get("WEBHOOK_RECEIPT_CACHE_SIZE", "4096"))
+
+ReceiptKey = Tuple[str, str, str] # (CallSid, step, RecordingSid or "")
+
+def receipt_key(call_sid: Optional[str], step: str, recording_sid: Optional[str] = None) -> Optional[ReceiptKey]:
+    """None without a CallSid (not a Twilio request, e.g. a manual test): no idempotency."""
+    if not call_sid:
+        return None
+    return (call_sid, step, recording_sid or "")
+
+class WebhookReceipts:
+    """
+    Idempotency for Twilio webhooks, which Twilio retries on timeout.
+
+    A handler first asks replay() for the TwiML it returned to an earlier
+    delivery of the same (CallSid, step, RecordingSid). If there is none it
+    does its work, adds its rows to the session and calls claim(), which
+    commits them together with the receipt. The receipt's primary key
+    makes a concurrent duplicate fail on commit; claim() then rolls back
+    and returns the winner's response, so a retry never writes twice.
+
+    Recent receipts are kept in an in-process LRU so a retry burst is
+    answered without touching the DB.
+    """
+    def __init__(self, maxsize: int = WEBHOOK_RECEIPT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lru: "OrderedDict[ReceiptKey, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.replays = 0
+        self.claims = 0
+        self.conflicts = 0
+
+    async def replay(self, key: Optional[ReceiptKey], session: AsyncSession = None) -> Optional[str]:
+        """The stored response for `key`, or None if this is the first delivery."""
+        if key is None:
+            return None
+        response = self._lru_get(key)
+        if response is None:
+            response = await self._db_get(key, session)
+            if response is not None:
+                self._lru_put(key, response)
+        if response is not None:
+            with self._lock:
+                self.replays += 1
+            print(f"[INFO] Replaying webhook response for {key[0]} {key[1]}")
+        return response
+
+    async def claim(self, session: AsyncSession, key: Optional[ReceiptKey], interview_id: int, response: str) -> Optional[str]:
+        """
+        Commit the session together with a receipt for `key`. Returns None if
+        this delivery won; otherwise nothing from the session is written and
+        the response stored by the delivery that got there first is returned.
+        """
+        if key is None:
+            await session.commit()
+            return None
+        call_sid, step, recording_sid = key
+        session.add(WebhookReceipt(call_sid=call_sid, step=step, recording_sid=recording_sid, interview_id=interview_id, response=response))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            with self._lock:
+                self.conflicts += 1
+            stored = await self._db_get(key, session)
+            print(f"[INFO] Duplicate webhook for {call_sid} {step}: already handled")
+            if stored is not None:
+                self._lru_put(key, stored)
+                return stored
+            return response
+        with self._lock:
+            self.claims += 1
+        self._lru_put(key, response)
+        return None
+
+    async def _db_get(self, key: ReceiptKey, session: AsyncSession = None) -> Optional[str]:
+        try:
+            if session is not None:
+                receipt = await session.get(WebhookReceipt, key)
+            else:
+                async with AsyncSession(async_engine) as session:
+                    receipt = await session.get(WebhookReceipt, key)
+            return receipt.response if receipt else None
+        except Exception as e:
+            print(f"[WARN] Webhook receipt read failed: {e}")
+            return None
+
+    def _lru_get(self, key: ReceiptKey) -> Optional[str]:
+        with self._lock:
+            response = self._lru.get(key)
+            if response is not None:
+                self._lru.move_to_end(key)
+            return response
+
+    def _lru_put(self, key: ReceiptKey, response: str):
+        with self._lock:
+            self._lru[key] = response
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cached": len(self._lru), "claims": self.claims, "replays": self.replays, "conflicts": self.conflicts}
+
+webhook_receipts = WebhookReceipts()
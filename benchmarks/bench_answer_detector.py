@@ -0,0 +1,99 @@
+"""
+Stream-mode end-of-answer detection, replayed from audio.
+
+For each answer, compares when Record mode would have moved on (15s of
+silence) with AnswerEndDetector (closing phrase at a pause, else
+ANSWER_END_SILENCE_SECONDS of silence), and reports detector throughput.
+
+Without arguments a handful of synthetic answers are generated: noise
+bursts stand in for speech, and the "transcript" at each pause is scripted.
+With arguments, each file is a recorded 8 kHz μ-law answer (.ulaw/.raw as
+captured from a Media Stream, or .wav μ-law / 16-bit PCM); pass --stt to
+spot closing phrases with the real speech-to-text (needs OPENAI_API_KEY).
+
+Usage: python benchmarks/bench_answer_detector.py [--stt] [answer.ulaw ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import numpy as np
+
+from app.services.answer_detector import AnswerEndDetector, read_ulaw, replay, transcribe_tail
+from app.services.audio import FRAME_BYTES, SAMPLE_RATE, frames, ulaw_encode
+
+RECORD_TIMEOUT_SECONDS = 15 # <Record timeout=15> in record mode
+
+def synth(segments, seed=0):
+    """[(seconds, voiced)] -> μ-law bytes; voiced segments are loud noise, the rest near-silent hiss."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for seconds, voiced in segments:
+        n = int(seconds * SAMPLE_RATE)
+        parts.append(rng.normal(0, 2000, n) if voiced else rng.uniform(-80, 80, n))
+    return ulaw_encode(np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)).tobytes()
+
+# name, segments, transcript heard at each pause (in order)
+SYNTHETIC = [
+    ("closing phrase", [(0.5, False), (6, True), (0.4, False), (5, True), (1.2, False), (1, True), (20, False)],
+     ["前職では営業を担当しており", "お客様の課題を聞くことを大切にしてきました。以上です。"]),
+    ("closing phrase mid-pause", [(0.3, False), (9, True), (1.0, False), (4, True), (20, False)],
+     ["チームで目標を達成した経験があります", "そのような経験を活かしたいと考えています。以上になります"]),
+    ("no closing phrase", [(0.5, False), (12, True), (0.5, False), (8, True), (20, False)],
+     ["えっと", "御社の研修制度に魅力を感じました"]),
+    ("thinking pause", [(0.5, False), (3, True), (2.5, False), (7, True), (0.9, False), (0.8, True), (20, False)],
+     ["そうですね", "以上のような経験から", "以上です"]),
+    ("silent", [(20, False)], []),
+]
+
+def record_mode_end_ms(ulaw):
+    """When <Record timeout=15> would end: 15s after the last speech (or after 15s of nothing)."""
+    detector = AnswerEndDetector(end_silence=RECORD_TIMEOUT_SECONDS, pause=10_000, no_speech=RECORD_TIMEOUT_SECONDS)
+    return replay(detector, frames(ulaw)).at_ms
+
+def scripted(transcripts):
+    queue = list(transcripts)
+    return lambda tail: queue.pop(0) if queue else ""
+
+def run(name, ulaw, spot):
+    detector = AnswerEndDetector()
+    end = replay(detector, frames(ulaw), spot=spot)
+    before = record_mode_end_ms(ulaw)
+    saved = (before - end.at_ms) / 1000
+    print(f"{name:<28} {end.reason:<10} end {end.at_ms / 1000:6.2f}s  record mode {before / 1000:6.2f}s  saved {saved:5.2f}s")
+    return saved
+
+def throughput(ulaw, seconds=2.0):
+    # Feed frame by frame, as the WebSocket handler does
+    chunks = list(frames(ulaw, FRAME_BYTES))
+    fed = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        detector = AnswerEndDetector(max_seconds=10_000, no_speech=10_000, end_silence=10_000)
+        for chunk in chunks:
+            detector.feed(chunk)
+        fed += len(chunks)
+    elapsed = time.perf_counter() - started
+    return fed / elapsed
+
+def main():
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")]
+    saved = []
+    if paths:
+        spot = transcribe_tail if "--stt" in sys.argv else None
+        for path in paths:
+            saved.append(run(os.path.basename(path), read_ulaw(path), spot))
+        sample = read_ulaw(paths[0])
+    else:
+        for i, (name, segments, transcripts) in enumerate(SYNTHETIC):
+            saved.append(run(name, synth(segments, seed=i), scripted(transcripts)))
+        sample = synth(SYNTHETIC[0][1])
+    print(f"average time saved per answer: {sum(saved) / len(saved):.2f}s")
+    rate = throughput(sample)
+    print(f"detector: {rate:,.0f} frames/s ({rate / 50:,.0f} concurrent real-time streams per core)")
+
+if __name__ == "__main__":
+    main()
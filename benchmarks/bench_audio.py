@@ -0,0 +1,91 @@
+"""
+μ-law decode + VAD throughput, frames per second on one core.
+
+Compares the per-frame audioop loop from legacy/main.py (where audioop still
+exists) with app/services/audio.py:
+  - EnergyVAD.push: one 20 ms frame at a time, as a WebSocket handler gets them
+  - EnergyVAD.process: a second of one stream's audio per call
+  - frame_rms tick: one frame from each of N concurrent streams per call
+and checks the lookup-table codec is bit-exact with audioop.
+
+Usage: python benchmarks/bench_audio.py [--streams 500] [--seconds 1.0]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.audio import FRAME_BYTES, EnergyVAD, frame_rms, ulaw_decode, ulaw_encode
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError: # Python 3.13+
+    audioop = None
+
+FRAMES_PER_SECOND = 1000 // 20 # one real-time stream
+
+def rate(fn, frames_per_call, seconds):
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        calls += 1
+    return calls * frames_per_call / (time.perf_counter() - started)
+
+def report(name, frames_per_second):
+    print(f"{name:<34} {frames_per_second:>14,.0f} frames/s  ~{frames_per_second / FRAMES_PER_SECOND:>9,.0f} streams/core")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pcm = np.clip(rng.normal(0, 3000, 8000 * 10), -32768, 32767).astype(np.int16)
+    ulaw = ulaw_encode(pcm).tobytes()
+    frames = [ulaw[i:i + FRAME_BYTES] for i in range(0, len(ulaw), FRAME_BYTES)]
+
+    if audioop:
+        table_ok = (ulaw_decode(bytes(range(256))).tobytes() == audioop.ulaw2lin(bytes(range(256)), 2)
+                    and ulaw_encode(pcm).tobytes() == audioop.lin2ulaw(pcm.tobytes(), 2))
+        print(f"codec matches audioop: {table_ok}")
+
+    def per_frame(step):
+        it = iter(())
+        def call():
+            nonlocal it
+            frame = next(it, None)
+            if frame is None:
+                it = iter(frames)
+                frame = next(it)
+            step(frame)
+        return call
+
+    if audioop:
+        report("audioop ulaw2lin + rms (legacy)", rate(per_frame(lambda f: audioop.rms(audioop.ulaw2lin(f, 2), 2)), 1, args.seconds))
+    vad = EnergyVAD()
+    report("EnergyVAD.push (per frame)", rate(per_frame(vad.push), 1, args.seconds))
+
+    second = ulaw[:8000]
+    vad = EnergyVAD()
+    report("EnergyVAD.process (1s batches)", rate(lambda: vad.process(second), FRAMES_PER_SECOND, args.seconds))
+
+    tick = np.frombuffer(ulaw[:args.streams * FRAME_BYTES], dtype=np.uint8).reshape(args.streams, FRAME_BYTES)
+    report(f"frame_rms tick ({args.streams} streams)", rate(lambda: frame_rms(tick), args.streams, args.seconds))
+
+    out = np.empty(len(ulaw), dtype=np.int16)
+    decode_rate = rate(lambda: ulaw_decode(ulaw, out=out), len(frames), args.seconds)
+    report("ulaw_decode (10s buffer, reused out)", decode_rate)
+    if audioop:
+        report("audioop.ulaw2lin (10s buffer)", rate(lambda: audioop.ulaw2lin(ulaw, 2), len(frames), args.seconds))
+
+if __name__ == "__main__":
+    main()
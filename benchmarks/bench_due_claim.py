@@ -0,0 +1,85 @@
+"""
+Benchmark: scheduler due-check cost vs. size of the future backlog.
+
+Compares the old approach (load every 'scheduled' Interview and compare
+reservation_time in Python) with claim_due_interviews(), which does the
+due-check in SQL on ix_interviews_status_reservation_time.
+
+Usage: python benchmarks/bench_due_claim.py [backlog sizes...]
+Runs against a throwaway SQLite file; never touches DATABASE_URL.
+"""
+import os
+import sys
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy import insert, update
+from app.models import Candidate, Interview
+from app.services.scheduler import claim_due_interviews
+
+DUE_ROWS = 20
+REPEAT = 20
+
+def seed(engine, backlog: int):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Candidate), [{
+            "id": 1, "name": "bench", "phone": "+810000000000", "email": "bench@example.com",
+            "token": "bench", "status": "automated", "created_at": now,
+        }])
+        rows = [{
+            "candidate_id": 1, "status": "scheduled", "session_snapshot": None,
+            "resume_count": 0, "retry_count": 0, "current_stage": "scheduled",
+            "reverse_qa_logs": [], "created_at": now,
+            "reservation_time": now + timedelta(minutes=30 + i % 40000),
+        } for i in range(backlog)]
+        rows += [{
+            "candidate_id": 1, "status": "scheduled", "session_snapshot": None,
+            "resume_count": 0, "retry_count": 0, "current_stage": "scheduled",
+            "reverse_qa_logs": [], "created_at": now,
+            "reservation_time": now - timedelta(seconds=i),
+        } for i in range(DUE_ROWS)]
+        conn.execute(insert(Interview), rows)
+
+def legacy_scan(session: Session):
+    interviews = session.exec(select(Interview).where(Interview.status == "scheduled")).all()
+    return [i for i in interviews if i.reservation_time <= datetime.utcnow()]
+
+def sql_claim(session: Session):
+    claimed = claim_due_interviews(session, limit=DUE_ROWS)
+    # Put the rows back so every repetition claims the same work
+    session.execute(update(Interview).where(Interview.status == "dialing").values(status="scheduled"))
+    session.commit()
+    return claimed
+
+def timed(engine, fn):
+    samples = []
+    for _ in range(REPEAT):
+        with Session(engine) as session:
+            t0 = time.perf_counter()
+            result = fn(session)
+            samples.append((time.perf_counter() - t0) * 1000)
+    assert len(result) == DUE_ROWS, len(result)
+    return statistics.median(samples)
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 50_000, 100_000]
+    print(f"{'backlog':>10} {'legacy scan ms':>16} {'sql claim ms':>14}")
+    for backlog in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            SQLModel.metadata.create_all(engine)
+            seed(engine, backlog)
+            legacy = timed(engine, legacy_scan)
+            claim = timed(engine, sql_claim)
+            engine.dispose()
+        print(f"{backlog:>10} {legacy:>16.2f} {claim:>14.2f}")
+
+if __name__ == "__main__":
+    main()
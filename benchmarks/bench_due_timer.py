@@ -0,0 +1,101 @@
+"""
+Benchmark: dial lateness and DB query count with the due timer.
+
+Seeds a throwaway SQLite DB with interviews due over the next few seconds,
+starts the due timer + dialer (fake Twilio client) and reports how late each
+call was placed and how many SQL statements the scheduler issued. The old
+60s polling loop is late by up to 60s (30s on average) and issues at least
+one full scan per minute regardless of load.
+
+The leader's background DB traffic is reported per day too: the next-due
+poll (SCHEDULER_NEXT_DUE_POLL_SECONDS, which picks up bookings and retries
+handled by other workers), the reconcile and the lease heartbeat, with the
+statements per run of each measured here.
+
+Usage: python benchmarks/bench_due_timer.py [--interviews 20] [--spread 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/bench.db"
+os.environ.setdefault("BASE_URL", "https://bench.invalid")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from sqlalchemy import event
+from sqlmodel import Session
+from app.database import engine, create_db_and_tables
+from app.models import Candidate, Interview
+from app.services import scheduler
+from app.services.leader import LEADER_HEARTBEAT_SECONDS
+from benchmarks.bench_dialer import FakeTwilioClient
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interviews", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=5, help="seconds over which reservations are spread")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    start = datetime.utcnow() + timedelta(seconds=1)
+    due_times = {}
+    with Session(engine) as session:
+        candidate = Candidate(name="bench", phone="+810000000000", email="bench@example.com", token="bench")
+        session.add(candidate)
+        session.commit()
+        for i in range(args.interviews):
+            due = start + timedelta(seconds=args.spread * i / max(1, args.interviews - 1))
+            interview = Interview(candidate_id=candidate.id, reservation_time=due, session_snapshot=None)
+            session.add(interview)
+            session.commit()
+            due_times[interview.id] = due
+
+    placed = {}
+    def on_result(interview_id, call_sid):
+        placed[interview_id] = datetime.utcnow()
+        scheduler._on_dial_result(interview_id, call_sid)
+
+    scheduler.dialer.on_result = on_result
+    scheduler.dialer.twilio_client = FakeTwilioClient(0.0)
+    scheduler.dialer._bucket.rate = 1000
+    scheduler.dialer.max_active_calls = args.interviews
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: queries.append(1))
+
+    scheduler.due_timer.start()
+    # Only the lease holder dials (and each dial is fenced on the lease): take it as a web worker would,
+    # which also starts the dialer and loads the timer
+    scheduler.lease.start()
+    deadline = time.time() + args.spread + 5
+    while len(placed) < args.interviews and time.time() < deadline:
+        time.sleep(0.05)
+
+    lateness = sorted((placed[i] - due_times[i]).total_seconds() for i in placed)
+    print(f"interviews={args.interviews} placed={len(placed)} over {args.spread}s")
+    print(f"lateness: median {lateness[len(lateness) // 2] * 1000:.1f} ms, max {lateness[-1] * 1000:.1f} ms")
+    print(f"SQL statements issued by scheduler: {len(queries)}")
+
+    day = 24 * 3600
+    background = []
+    for label, job, interval in (
+        ("next-due poll", scheduler.poll_next_due, scheduler.NEXT_DUE_POLL_SECONDS),
+        ("reconcile", scheduler.reconcile_due_timer, scheduler.RECONCILE_SECONDS),
+        ("lease heartbeat", scheduler.lease.try_acquire, LEADER_HEARTBEAT_SECONDS),
+    ):
+        before = len(queries)
+        job()
+        per_run = len(queries) - before
+        background.append((label, interval, per_run, per_run * day / interval))
+    print("leader background queries per day (idle):")
+    for label, interval, per_run, per_day in background:
+        print(f"  {label:<16} every {interval:5.0f}s  {per_run} statements  {per_day:9,.0f}/day")
+    print(f"  {'old 60s scan':<16} every    60s  1 statement   {day / 60:9,.0f}/day")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Utterance classifier: regression corpus accuracy and throughput.
+
+Runs every line of benchmarks/data/intent_corpus.tsv through the yes/no and
+reverse-Q&A classifiers (app/services/intent.py) and, for comparison,
+through the substring checks the voice handlers used before. Exits 1 if
+any corpus line is misclassified, so it can gate lexicon changes.
+
+Usage: python benchmarks/bench_intent.py [--verbose]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.services.intent import INTENT_MIN_CONFIDENCE, classify_reverse_qa, classify_yes_no
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_corpus.tsv")
+
+def load_corpus():
+    rows = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            rows.append(tuple(line.rstrip("\n").split("\t")))
+    return rows
+
+def classify(kind, text):
+    digits = text if text in ("1", "2") else None
+    if kind == "yes_no":
+        intent = classify_yes_no(text, digits)
+        return intent.label if intent.confidence >= INTENT_MIN_CONFIDENCE else "unknown"
+    intent = classify_reverse_qa(text)
+    # The handler only distinguishes "exit" from everything else
+    return "exit" if intent.label == "exit" and intent.confidence >= INTENT_MIN_CONFIDENCE else "question"
+
+def classify_before(kind, text):
+    # The substring scans time_check / reverse_qa_process used to do
+    if kind == "yes_no":
+        input_val = text.lower()
+        if text == "1": input_val = "yes"
+        if text == "2": input_val = "no"
+        if any(w in input_val for w in ["いいえ", "no", "ない", "だめ", "無理"]):
+            return "no"
+        return "yes" # is_positive or True
+    return "exit" if any(t in text.lower() for t in ["ない", "なし", "大丈夫", "以上", "終わり", "no", "nothing"]) else "question"
+
+def main():
+    rows = load_corpus()
+    verbose = "--verbose" in sys.argv
+
+    failures = []
+    before_correct = 0
+    for kind, text, expected in rows:
+        got = classify(kind, text)
+        before_correct += classify_before(kind, text) == expected
+        if got != expected:
+            failures.append((kind, text, expected, got))
+
+    for kind in ("yes_no", "reverse_qa"):
+        subset = [r for r in rows if r[0] == kind]
+        wrong = sum(1 for f in failures if f[0] == kind)
+        print(f"{kind:<10} {len(subset) - wrong}/{len(subset)} correct")
+    print(f"substring checks (before): {before_correct}/{len(rows)} correct")
+
+    # Throughput over the whole corpus, repeated
+    iterations = 200
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for kind, text, _ in rows:
+            classify(kind, text)
+    elapsed = time.perf_counter() - started
+    n = iterations * len(rows)
+    print(f"throughput: {n / elapsed:,.0f} utterances/s ({elapsed / n * 1e6:.1f} us each)")
+
+    for kind, text, expected, got in failures if verbose or failures else []:
+        print(f"  NG {kind}: {text!r} expected {expected}, got {got}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+What the STT preprocessing stage saves per answer: upload bytes, billed
+audio (Whisper is billed by input duration), and its own CPU cost.
+
+Fixtures are 8 kHz 16-bit WAVs shaped like <Record> answers: line noise
+before the candidate starts, voiced "syllables" in words and sentences,
+and a tail of noise up to the 15s record timeout (trim-silence only drops
+near-digital silence, so a real line's hiss stays in). A few fixtures are
+pure noise, like a candidate who said nothing. Or pass real recordings
+with --fixtures DIR (*.wav).
+
+Two ways per fixture:
+
+  raw       the recording as Twilio serves it (stt_service before)
+  prepared  audio_preprocess.prepare_wav(): silence trimmed, mono, <= 16 kHz,
+            re-encoded as STT_UPLOAD_ENCODING; silent answers not uploaded;
+            answers over STT_CHUNK_SECONDS cut into pieces sent at once
+
+With --live (OPENAI_API_KEY set), both versions of every fixture are also
+transcribed, one after the other, and the API latency is reported.
+
+Usage: python benchmarks/bench_preprocess.py [--count 40] [--fixtures DIR] [--live]
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.audio_preprocess import STT_UPLOAD_ENCODING, prepare_wav
+
+RATE = 8000
+WHISPER_USD_PER_MINUTE = 0.006
+
+def to_wav(pcm):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(np.clip(pcm, -32768, 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+def syllable(rng):
+    n = int(rng.uniform(0.12, 0.3) * RATE)
+    t = np.arange(n) / RATE
+    f0 = rng.uniform(110, 230)
+    voice = sum(rng.uniform(0.2, 1) / k * np.sin(2 * np.pi * f0 * k * t) for k in range(1, 12))
+    return voice * np.hanning(n) * rng.uniform(2500, 6000) / 2
+
+def make_answer(rng, speech_seconds, lead_seconds, tail_seconds, noise_rms=60):
+    parts = [np.zeros(int(lead_seconds * RATE))]
+    spoken = 0.0
+    while spoken < speech_seconds:
+        for _ in range(rng.integers(2, 6)): # a word
+            parts.append(syllable(rng))
+        gap = rng.uniform(0.6, 1.2) if rng.random() < 0.2 else rng.uniform(0.05, 0.3) # sentence or word break
+        parts.append(np.zeros(int(gap * RATE)))
+        spoken = sum(len(p) for p in parts[1:]) / RATE
+    parts.append(np.zeros(int(tail_seconds * RATE)))
+    pcm = np.concatenate(parts)
+    return to_wav(pcm + rng.normal(0, noise_rms, len(pcm)))
+
+def synthetic_fixtures(count, seed=0):
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for i in range(count):
+        if i % 10 == 9:
+            fixtures.append((f"silent_{i:02d}", make_answer(rng, 0, rng.uniform(15, 17), 0)))
+        else:
+            fixtures.append((f"answer_{i:02d}", make_answer(rng, rng.uniform(3, 40), rng.uniform(0.5, 4), rng.uniform(3, 15))))
+    return fixtures
+
+def wav_seconds(data):
+    with wave.open(io.BytesIO(data)) as w:
+        return w.getnframes() / w.getframerate()
+
+def transcribe_seconds(audio):
+    from app.services.stt_service import join_segments, transcribe, transcribe_chunks
+    from app.services.transcript_cache import transcript_cache
+    transcript_cache.enabled = False # latency of the API, also on a second run
+    started = time.perf_counter()
+    if isinstance(audio, bytes):
+        text = transcribe(audio, "answer.wav")
+    else:
+        text = join_segments(transcribe_chunks(audio.chunks))
+    return time.perf_counter() - started, text
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--fixtures", help="directory of .wav recordings to use instead of synthetic ones")
+    parser.add_argument("--live", action="store_true", help="also transcribe both versions with the real API")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        paths = sorted(glob.glob(os.path.join(args.fixtures, "*.wav")))
+        fixtures = [(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    else:
+        fixtures = synthetic_fixtures(args.count)
+
+    raw_bytes = raw_seconds = prep_bytes = prep_seconds = 0
+    cpu_ms, skipped, live = [], 0, []
+    for name, data in fixtures:
+        started = time.process_time()
+        prepared = prepare_wav(data)
+        cpu_ms.append((time.process_time() - started) * 1000)
+        raw_bytes += len(data)
+        raw_seconds += wav_seconds(data)
+        prep_bytes += prepared.upload_bytes
+        prep_seconds += prepared.seconds
+        skipped += not prepared.chunks
+        if args.live:
+            raw_latency, raw_text = transcribe_seconds(data)
+            prep_latency, prep_text = transcribe_seconds(prepared) if prepared.chunks else (0.0, "")
+            live.append((raw_latency, prep_latency))
+            print(f"{name}: {raw_latency:5.2f}s {raw_text!r}\n{'':<{len(name)}}  {prep_latency:5.2f}s {prep_text!r}")
+
+    n = len(fixtures)
+    print(f"{n} answers, upload encoding {STT_UPLOAD_ENCODING}")
+    for label, size, seconds in (("raw", raw_bytes, raw_seconds), ("prepared", prep_bytes, prep_seconds)):
+        print(f"{label:<9} {size / 1e6:7.2f} MB   {seconds / 60:6.2f} billed min   ${seconds / 60 * WHISPER_USD_PER_MINUTE:.4f}")
+    print(f"saved     {1 - prep_bytes / raw_bytes:7.1%} bytes   {1 - prep_seconds / raw_seconds:7.1%} audio   {skipped} silent answers not uploaded")
+    print(f"preprocess CPU per answer: p50 {np.percentile(cpu_ms, 50):.2f} ms  max {max(cpu_ms):.2f} ms")
+    if live:
+        raw_latency, prep_latency = np.array(live).T
+        print(f"API latency p50 raw {np.percentile(raw_latency, 50):.2f}s -> prepared {np.percentile(prep_latency, 50):.2f}s, "
+              f"total {raw_latency.sum():.1f}s -> {prep_latency.sum():.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Load harness for the Media Streams relay: N synthetic calls in one process.
+
+Each call gets a 20 ms inbound frame from "Twilio" (real Media Streams JSON)
+and, every 2s, a second of "model" speech in five Realtime API audio
+deltas. Two relay implementations run against the same traffic:
+
+  legacy  json.loads / json.dumps per message, base64 decode for the VAD,
+          model audio forwarded to Twilio as it arrives (legacy/main.py before)
+  relay   app/services/stream_relay.py: payload sliced out of media frames,
+          pre-built outgoing messages, bounded upstream queue + pump,
+          model audio paced out at real time by PacedSender
+  relay (unpaced)  the relay's codec path with model audio forwarded as it
+          arrives, to separate the JSON savings from the cost of pacing
+
+Reports CPU per call (process CPU time over wall time, minus a harness-only
+run that generates the same traffic and drops it) and, for the relay, how
+far paced frames land from the 20 ms grid.
+
+Usage: python benchmarks/bench_stream_relay.py [--calls 50] [--seconds 5]
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.audio import EnergyVAD, ulaw_encode
+from app.services.stream_relay import PacedSender, TwilioMessages, openai_append, parse_openai, parse_twilio, pump, upstream_queue
+
+FRAME_SECONDS = 0.02
+BURST_EVERY = 2.0
+BURST_DELTAS = 5
+BURST_SECONDS = 1.0
+
+rng = np.random.default_rng(0)
+SPEECH = ulaw_encode(np.clip(rng.normal(0, 3000, 8000 * 4), -32768, 32767).astype(np.int16)).tobytes()
+
+def twilio_media(stream_sid, seq, offset):
+    payload = base64.b64encode(SPEECH[offset:offset + 160]).decode()
+    return json.dumps({"event": "media", "sequenceNumber": str(seq),
+                       "media": {"track": "inbound", "chunk": str(seq), "timestamp": str(seq * 20), "payload": payload},
+                       "streamSid": stream_sid}, separators=(",", ":"))
+
+DELTA_BYTES = int(8000 * BURST_SECONDS / BURST_DELTAS)
+DELTA_MESSAGES = [json.dumps({"type": "response.audio.delta", "event_id": f"event_{i}", "response_id": "resp_1", "item_id": "item_1",
+                              "output_index": 0, "content_index": 0,
+                              "delta": base64.b64encode(SPEECH[i * DELTA_BYTES:(i + 1) * DELTA_BYTES]).decode()}, separators=(",", ":"))
+                  for i in range(BURST_DELTAS)]
+DONE_MESSAGE = json.dumps({"type": "response.audio.done", "event_id": "event_done", "response_id": "resp_1"})
+
+class FakeTwilio:
+    """Inbound frames arrive via an asyncio.Queue fed by the shared ticker; outbound sends are timestamped."""
+    def __init__(self, index):
+        self.stream_sid = f"MZ{index:032d}"
+        self.inbound = asyncio.Queue()
+        self.sent = []
+
+    async def receive_text(self):
+        return await self.inbound.get()
+
+    async def send_text(self, text):
+        self.sent.append(time.perf_counter())
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+class FakeUpstream:
+    """Model side: counts what it's sent; recv() yields a burst of audio deltas every BURST_EVERY seconds."""
+    def __init__(self, phase):
+        self.phase = phase
+        self.received = 0
+        self._pending = []
+
+    async def send(self, message):
+        self.received += 1
+
+    async def recv(self):
+        if not self._pending:
+            await asyncio.sleep(self.phase)
+            self.phase = BURST_EVERY
+            self._pending = DELTA_MESSAGES + [DONE_MESSAGE]
+        return self._pending.pop(0)
+
+async def ticker(calls, stop):
+    loop = asyncio.get_running_loop()
+    next_at = loop.time()
+    seq = 0
+    while not stop.is_set():
+        seq += 1
+        offset = (seq * 160) % (len(SPEECH) - 160)
+        for twilio in calls:
+            twilio.inbound.put_nowait(twilio_media(twilio.stream_sid, seq, offset))
+        next_at += FRAME_SECONDS
+        await asyncio.sleep(max(0, next_at - loop.time()))
+
+# --- relay implementations ---
+
+async def legacy_call(twilio, upstream, stop):
+    vad = EnergyVAD()
+
+    async def from_twilio():
+        while not stop.is_set():
+            msg = json.loads(await twilio.receive_text())
+            if msg.get("event") == "media" and msg["media"].get("track") == "inbound":
+                payload = msg["media"]["payload"]
+                await upstream.send(json.dumps({"type": "input_audio_buffer.append", "audio": payload}))
+                vad.push(base64.b64decode(payload))
+
+    async def from_upstream():
+        while not stop.is_set():
+            msg = json.loads(await upstream.recv())
+            if msg.get("type") == "response.audio.delta":
+                await twilio.send_json({"event": "media", "streamSid": twilio.stream_sid, "media": {"payload": msg.get("delta")}})
+
+    await asyncio.gather(from_twilio(), from_upstream())
+
+async def relay_call(twilio, upstream, stop):
+    vad = EnergyVAD()
+    queue = upstream_queue()
+    paced = PacedSender(twilio.send_text, TwilioMessages(twilio.stream_sid))
+
+    async def from_twilio():
+        while not stop.is_set():
+            event_type, data = parse_twilio(await twilio.receive_text())
+            if event_type == "media":
+                await queue.put(openai_append(data))
+                vad.push(binascii.a2b_base64(data))
+
+    async def from_upstream():
+        while not stop.is_set():
+            event_type, data = parse_openai(await upstream.recv())
+            if event_type == "response.audio.delta":
+                await paced.write_b64(data)
+
+    await asyncio.gather(from_twilio(), from_upstream(), pump(queue, upstream.send))
+
+async def relay_unpaced_call(twilio, upstream, stop):
+    # Same codec path as relay_call, model audio forwarded as it arrives: isolates the pacing cost
+    vad = EnergyVAD()
+    queue = upstream_queue()
+    messages = TwilioMessages(twilio.stream_sid)
+
+    async def from_twilio():
+        while not stop.is_set():
+            event_type, data = parse_twilio(await twilio.receive_text())
+            if event_type == "media":
+                await queue.put(openai_append(data))
+                vad.push(binascii.a2b_base64(data))
+
+    async def from_upstream():
+        while not stop.is_set():
+            event_type, data = parse_openai(await upstream.recv())
+            if event_type == "response.audio.delta":
+                await twilio.send_text(messages.media(data))
+
+    await asyncio.gather(from_twilio(), from_upstream(), pump(queue, upstream.send))
+
+async def harness_call(twilio, upstream, stop):
+    async def from_twilio():
+        while not stop.is_set():
+            await twilio.receive_text()
+
+    async def from_upstream():
+        while not stop.is_set():
+            await upstream.recv()
+
+    await asyncio.gather(from_twilio(), from_upstream())
+
+async def run(mode, n, seconds):
+    calls = [FakeTwilio(i) for i in range(n)]
+    upstreams = [FakeUpstream(phase=(i / n) * BURST_EVERY) for i in range(n)]
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(mode(t, u, stop)) for t, u in zip(calls, upstreams)]
+    tick = asyncio.create_task(ticker(calls, stop))
+    await asyncio.sleep(0.5) # warm up
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(seconds)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    stop.set()
+    for task in tasks + [tick]:
+        task.cancel()
+    await asyncio.gather(*tasks, tick, return_exceptions=True)
+    return cpu / wall, calls, upstreams
+
+def pacing_error_ms(calls):
+    """|interval - 20ms| between consecutive paced frames within a burst."""
+    errors = []
+    for twilio in calls:
+        intervals = np.diff(np.array(twilio.sent))
+        intervals = intervals[intervals < 0.1] # within one burst
+        errors.extend(np.abs(intervals - FRAME_SECONDS) * 1000)
+    return np.array(errors)
+
+def codec_us():
+    """Per-message codec cost alone (no sockets, no scheduling), in microseconds."""
+    import timeit
+    media = twilio_media("MZ" + "0" * 32, 1, 0)
+    delta = DELTA_MESSAGES[0]
+    messages = TwilioMessages("MZ" + "0" * 32)
+    def legacy_in():
+        payload = json.loads(media)["media"]["payload"]
+        json.dumps({"type": "input_audio_buffer.append", "audio": payload})
+        base64.b64decode(payload)
+    def relay_in():
+        _, payload = parse_twilio(media)
+        openai_append(payload)
+        binascii.a2b_base64(payload)
+    def legacy_out():
+        json.dumps({"event": "media", "streamSid": messages.stream_sid, "media": {"payload": json.loads(delta)["delta"]}})
+    def relay_out():
+        messages.media(parse_openai(delta)[1])
+    n = 20000
+    return [(name, timeit.timeit(fn, number=n) / n * 1e6) for name, fn in
+            (("inbound frame, legacy", legacy_in), ("inbound frame, relay", relay_in),
+             ("model delta, legacy", legacy_out), ("model delta, relay", relay_out))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for name, us in codec_us():
+        print(f"{name:<22} {us:6.2f} us")
+    base, _, _ = asyncio.run(run(harness_call, args.calls, args.seconds))
+    print(f"{args.calls} calls, {args.seconds:.0f}s; harness alone uses {base:.1%} of a core")
+    for name, mode in (("legacy", legacy_call), ("relay (unpaced)", relay_unpaced_call), ("relay", relay_call)):
+        cores, calls, upstreams = asyncio.run(run(mode, args.calls, args.seconds))
+        net = max(0.0, cores - base)
+        line = f"{name:<15} {cores:6.1%} of a core  -> {net / args.calls * 1000:6.2f} ms CPU per call-second ({net / args.calls:.2%} of a core per call)"
+        print(line)
+        if mode is relay_call:
+            errors = pacing_error_ms(calls)
+            if len(errors):
+                print(f"                paced frames: {len(errors) + len(calls):,}  grid error p50 {np.percentile(errors, 50):.2f} ms  p99 {np.percentile(errors, 99):.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare STT backends on the same answers: the OpenAI API and the local
+faster-whisper model (STT_BACKEND=local, settings from STT_LOCAL_*).
+
+Each answer goes through the worker's path (prepare_wav, then
+transcribe_chunks). Reports per backend:
+
+  load         model load time (local; once per worker process)
+  RTF          wall seconds per second of audio, one answer at a time
+               (p50 / p95); below 1 is faster than real time
+  throughput   audio seconds transcribed per wall second with
+               --concurrency answers in flight, and per CPU-second this
+               process used (all threads, so CTranslate2's too): the
+               "per core" figure for sizing worker machines
+
+Use real Japanese answers (--fixtures DIR of .wav recordings): decoding
+time depends on what is said, so the synthetic fallback only exercises the
+path. Transcripts of the first few answers are printed to compare.
+
+Usage: python benchmarks/bench_stt_backends.py --fixtures DIR [--backends openai,local] [--concurrency 4]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.audio_preprocess import prepare_wav
+from app.services.stt_backends import make_stt_backend
+from app.services.stt_service import join_segments, set_stt_backend, transcribe_chunks
+from app.services.transcript_cache import transcript_cache
+
+def load_fixtures(directory, count):
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*.wav")))
+        return [(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    from benchmarks.bench_preprocess import make_answer
+    print("[WARN] No --fixtures: synthetic audio, timings are indicative only")
+    rng = np.random.default_rng(0)
+    return [(f"synthetic_{i:02d}", make_answer(rng, rng.uniform(5, 90), 1, 3)) for i in range(count)]
+
+def run_answer(prepared):
+    return join_segments(transcribe_chunks(prepared.chunks))
+
+def bench(name, answers, concurrency, show):
+    backend = make_stt_backend(name)
+    if not backend.available:
+        print(f"{name:<7} skipped: {backend.unavailable_reason}")
+        return
+    set_stt_backend(backend)
+    started = time.perf_counter()
+    backend.load()
+    load = time.perf_counter() - started
+    run_answer(answers[0][1]) # warm up
+
+    rtf = []
+    for i, (label, prepared) in enumerate(answers):
+        started = time.perf_counter()
+        text = run_answer(prepared)
+        rtf.append((time.perf_counter() - started) / prepared.seconds)
+        if i < show:
+            print(f"  {name} {label}: {text[:80]!r}")
+
+    audio = sum(prepared.seconds for _, prepared in answers)
+    cpu, wall = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda item: run_answer(item[1]), answers))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    print(f"{name:<7} load {load:5.1f}s   RTF p50 {np.percentile(rtf, 50):.3f}  p95 {np.percentile(rtf, 95):.3f}   "
+          f"throughput {audio / wall:6.1f} audio-s/s ({concurrency} at once), {audio / max(cpu, 1e-9):6.1f} audio-s per CPU-s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="directory of .wav answers (Japanese speech)")
+    parser.add_argument("--count", type=int, default=8, help="synthetic answers when no --fixtures")
+    parser.add_argument("--backends", default="openai,local")
+    parser.add_argument("--concurrency", type=int, default=4, help="answers in flight for the throughput run")
+    parser.add_argument("--show", type=int, default=3, help="transcripts printed per backend")
+    args = parser.parse_args()
+
+    transcript_cache.enabled = False # time the engines, not the cache
+    answers = [(label, prepare_wav(data)) for label, data in load_fixtures(args.fixtures, args.count)]
+    answers = [(label, prepared) for label, prepared in answers if prepared.chunks]
+    audio = sum(prepared.seconds for _, prepared in answers)
+    print(f"{len(answers)} answers with speech, {audio:.0f}s after trimming, {os.cpu_count()} CPUs")
+    for name in args.backends.split(","):
+        bench(name.strip(), answers, args.concurrency, args.show)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Time-to-transcript for long answers: one request per answer vs. the answer
+cut at pauses (STT_CHUNK_SECONDS) and the pieces transcribed at once.
+
+The answers are the synthetic ones from bench_preprocess (voiced syllables
+in words and sentences over line noise), each --seconds long. The
+transcription API is modelled offline: every request takes
+--overhead seconds plus --rtf seconds per second of audio, which is how
+Whisper latency behaves (roughly linear in input length). With --live
+(OPENAI_API_KEY set) the real API is called instead.
+
+Usage: python benchmarks/bench_stt_chunks.py [--answers 3] [--seconds 180] [--live]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.bench_preprocess import make_answer
+from app.services.audio_preprocess import STT_CHUNK_SECONDS, prepare_wav, read_wav
+from app.services.llm_client import FakeBackend, provider
+from app.services.stt_backends import OpenAISttBackend
+from app.services.stt_service import join_segments, set_stt_backend, transcribe_chunks
+from app.services.transcript_cache import transcript_cache
+
+class ModelledWhisper(FakeBackend):
+    """Latency = overhead + rtf x audio seconds of the uploaded WAV."""
+    def __init__(self, overhead, rtf):
+        super().__init__(latency=0)
+        self.overhead = overhead
+        self.rtf = rtf
+
+    def transcribe(self, audio_file, model, timeout, **params):
+        samples, rate = read_wav(audio_file[1])
+        time.sleep(self.overhead + self.rtf * len(samples) / rate)
+        return super().transcribe(audio_file, model, timeout, **params)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=180, help="speech per answer (the <Record> limit is 180)")
+    parser.add_argument("--overhead", type=float, default=0.8, help="modelled seconds per request")
+    parser.add_argument("--rtf", type=float, default=0.08, help="modelled seconds per second of audio")
+    parser.add_argument("--live", action="store_true", help="call the real API instead of the model")
+    args = parser.parse_args()
+
+    transcript_cache.enabled = False # every run transcribes the same answers
+    if not args.live:
+        provider.set_backend(ModelledWhisper(args.overhead, args.rtf))
+    rng = np.random.default_rng(0)
+    answers = [make_answer(rng, args.seconds, 1, 3) for _ in range(args.answers)]
+
+    whole = [prepare_wav(data, chunk_seconds=0) for data in answers]
+    pieces = [prepare_wav(data) for data in answers]
+    lengths = [chunk.end - chunk.start for prepared in pieces for chunk in prepared.chunks]
+    print(f"{args.answers} answers of {whole[0].seconds:.0f}s speech; STT_CHUNK_SECONDS={STT_CHUNK_SECONDS:.0f} -> "
+          f"{len(lengths) / len(pieces):.1f} pieces per answer, {min(lengths):.1f}-{max(lengths):.1f}s each")
+    print("model: " + ("real API" if args.live else f"{args.overhead}s + {args.rtf}s per audio second"))
+    runs = [("one request", whole, 1)] + [(f"pieces x{n}", pieces, n) for n in (1, 2, 4, 6)]
+    baseline = None
+    for label, prepared_answers, concurrency in runs:
+        set_stt_backend(OpenAISttBackend(concurrency=concurrency))
+        times = []
+        for prepared in prepared_answers:
+            started = time.perf_counter()
+            join_segments(transcribe_chunks(prepared.chunks))
+            times.append(time.perf_counter() - started)
+        mean = float(np.mean(times))
+        baseline = baseline or mean
+        print(f"{label:<12} time-to-transcript {mean:6.2f}s   ({baseline / mean:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
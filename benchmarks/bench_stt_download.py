@@ -0,0 +1,176 @@
+"""
+Memory and disk used to download + upload recordings for transcription.
+
+A local server (separate process) plays both Twilio (GET a 3-minute 8 kHz
+16-bit WAV, ~2.9 MB, the largest answer <Record maxLength=180> produces)
+and the transcription API (POST /v1/audio/transcriptions, body read and
+discarded), so the real OpenAI SDK upload path runs without a network.
+N recordings are transcribed concurrently, two ways:
+
+  legacy   response.content, written to temp_<uuid>.wav in the working
+           directory, reopened for the upload (stt_service before)
+  spooled  download_recording(): chunks streamed into a SpooledTemporaryFile
+           (memory up to STT_SPOOL_MAX_BYTES, then an unlinked temp file),
+           handed to the SDK as a file object
+
+Each mode runs in a fresh child process. Reports how far that process's
+peak RSS grew over its starting RSS, peak bytes on disk at once, and files
+left behind in the temp dir.
+
+Usage: python benchmarks/bench_stt_download.py [--concurrency 16] [--seconds 180]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_wav(seconds):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(os.urandom(int(seconds * 8000) * 2))
+    return buf.getvalue()
+
+def serve(port, seconds, ready):
+    recording = make_wav(seconds)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/x-wav")
+            self.send_header("Content-Length", str(len(recording)))
+            self.end_headers()
+            view = memoryview(recording)
+            for offset in range(0, len(view), 64 * 1024):
+                self.wfile.write(view[offset:offset + 64 * 1024])
+
+        def do_POST(self):
+            remaining = int(self.headers.get("Content-Length", 0))
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+            body = json.dumps({"text": "ok"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    ready.set()
+    server.serve_forever()
+
+class DiskMeter:
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        with self._lock:
+            self.current += n
+            self.peak = max(self.peak, self.current)
+
+def legacy(url, workdir, disk):
+    # stt_service.transcribe_audio_url before this change
+    import requests
+    from app.services.llm_client import provider
+    file_path = os.path.join(workdir, f"temp_{uuid.uuid4()}.wav")
+    response = requests.get(url)
+    with open(file_path, "wb") as f:
+        f.write(response.content)
+    size = len(response.content)
+    disk.add(size)
+    try:
+        with open(file_path, "rb") as audio_file:
+            return provider.transcribe("transcribe", audio_file, model="whisper-1", language="ja")
+    finally:
+        os.remove(file_path)
+        disk.add(-size)
+
+def spooled(url, workdir, disk):
+    from app.services.stt_service import download_recording, transcribe
+    with download_recording(url) as recording:
+        size = recording.seek(0, io.SEEK_END)
+        recording.seek(0)
+        on_disk = size if recording._rolled else 0
+        disk.add(on_disk)
+        try:
+            return transcribe(recording, "recording.wav")
+        finally:
+            disk.add(-on_disk)
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def run(mode, port, concurrency, jobs, out):
+    # Child process: fresh RSS high-water mark per mode
+    import app.services.stt_service as stt_service
+    from app.services.transcript_cache import transcript_cache
+    transcript_cache.enabled = False # measure the download + upload path, not llm_cache lookups
+    workdir = tempfile.mkdtemp(prefix="bench_stt_")
+    stt_service.STT_SPOOL_DIR = workdir # spilled spools are unlinked at once, so they never show up as left behind
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(concurrency)
+    from app.services.llm_client import OpenAIBackend, provider
+    provider.set_backend(OpenAIBackend(api_key="bench", max_connections=concurrency))
+    fn = {"legacy": legacy, "spooled": spooled}[mode]
+    url = f"http://127.0.0.1:{port}/rec/RE{uuid.uuid4().hex}.wav"
+    fn(url, workdir, DiskMeter()) # warm up imports and connections
+    disk = DiskMeter()
+    baseline = rss_bytes()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: fn(url, workdir, disk), range(jobs)))
+    elapsed = time.perf_counter() - started
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # KiB on Linux
+    assert all(r == "ok" for r in results), results[:3]
+    out.put((max(0, peak_rss - baseline), disk.peak, len(os.listdir(workdir)), elapsed))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=None, help="recordings per mode (default: 2 x concurrency)")
+    parser.add_argument("--seconds", type=float, default=180)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+    jobs = args.jobs or 2 * args.concurrency
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.port, args.seconds, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+
+    from app.services.stt_service import STT_SPOOL_MAX_BYTES
+    size_mb = (args.seconds * 8000 * 2 + 44) / 1e6
+    print(f"{jobs} recordings of {args.seconds:.0f}s ({size_mb:.1f} MB), {args.concurrency} at a time, spool threshold {STT_SPOOL_MAX_BYTES / 1e6:.1f} MB")
+    for mode in ("legacy", "spooled"):
+        out = multiprocessing.Queue()
+        child = multiprocessing.Process(target=run, args=(mode, args.port, args.concurrency, jobs, out))
+        child.start()
+        rss, disk_peak, left, elapsed = out.get()
+        child.join()
+        print(f"{mode:<8} peak RSS +{rss / 1e6:7.1f} MB   peak disk {disk_peak / 1e6:7.1f} MB   files left {left}   {elapsed:5.2f}s")
+    server.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Reverse Q&A topic extraction: accuracy and latency of the local extractor
+on a labeled corpus (benchmarks/data/topic_corpus.tsv).
+
+Reports exact-match accuracy overall and for the inputs answered locally
+(confidence >= TOPIC_MIN_CONFIDENCE), how many would go to the LLM, and
+per-utterance latency. Pass --llm to also time resolve_topic end to end
+(needs OPENAI_API_KEY; each LLM call is capped at TOPIC_LLM_TIMEOUT_SECONDS).
+
+Usage: python benchmarks/bench_topic.py [--llm] [--verbose]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.services.topic_extractor import TOPIC_MIN_CONFIDENCE, extract_topic_local, resolve_topic
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "topic_corpus.tsv")
+
+def load_corpus():
+    rows = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            text, expected = line.rstrip("\n").split("\t")
+            rows.append((text, expected))
+    return rows
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def main():
+    rows = load_corpus()
+    verbose = "--verbose" in sys.argv
+
+    # Latency: best of several passes per utterance, in microseconds
+    latencies = []
+    results = []
+    for text, expected in rows:
+        best = None
+        for _ in range(50):
+            started = time.perf_counter()
+            result = extract_topic_local(text)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best * 1e6)
+        results.append((text, expected, result))
+
+    correct = sum(1 for _, expected, r in results if r.topic == expected)
+    confident = [(e, r) for _, e, r in results if r.confidence >= TOPIC_MIN_CONFIDENCE]
+    confident_correct = sum(1 for e, r in confident if r.topic == e)
+
+    print(f"{len(rows)} utterances, min confidence {TOPIC_MIN_CONFIDENCE}")
+    print(f"local accuracy (all):        {correct / len(rows):.1%}")
+    print(f"local accuracy (confident):  {confident_correct / max(1, len(confident)):.1%} of {len(confident)}")
+    print(f"sent to LLM:                 {len(rows) - len(confident)} ({(len(rows) - len(confident)) / len(rows):.1%})")
+    print(f"latency: p50 {percentile(latencies, 0.5):.1f} us  p99 {percentile(latencies, 0.99):.1f} us  max {max(latencies):.1f} us")
+
+    if verbose:
+        for text, expected, r in results:
+            mark = "ok " if r.topic == expected else "NG "
+            print(f"  {mark}{r.confidence:.2f} {r.source:<11} {r.topic:<10} <- {text} (expected {expected})")
+
+    if "--llm" in sys.argv:
+        async def run():
+            timings, hits = [], 0
+            for text, expected in rows:
+                started = time.perf_counter()
+                r = await resolve_topic(text)
+                timings.append((time.perf_counter() - started) * 1000)
+                hits += r.topic == expected
+            return timings, hits
+        timings, hits = asyncio.run(run())
+        print(f"resolve_topic (with LLM): accuracy {hits / len(rows):.1%}  p50 {percentile(timings, 0.5):.1f} ms  p99 {percentile(timings, 0.99):.1f} ms")
+
+if __name__ == "__main__":
+    main()
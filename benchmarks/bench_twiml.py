@@ -0,0 +1,55 @@
+"""
+Microbenchmark: per-webhook TwiML render cost, uncached vs. cached.
+
+"before" builds the VoiceResponse tree and serializes it on every call, as
+the /voice handlers used to. "after" is what they do now: a template lookup
+(snapshot hash + q_index) plus filling in the interview id.
+
+Usage: python benchmarks/bench_twiml.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.routers import voice
+from app.services.twiml_cache import fill, snapshot_hash
+
+SNAPSHOT = [
+    {"id": i, "text": text, "max_duration": 180}
+    for i, text in enumerate([
+        "弊社を希望した志望動機を教えてください",
+        "これまでのご経験について教えてください",
+        "Photoshopやillustratorは使用したことがありますか、ある場合はどの程度出来るかを教えてください",
+        "AIなどは普段使用していますが、使用している場合はどういったことに使っているかを教えてください",
+        "入社後に挑戦したいことを教えてください",
+    ])
+]
+
+def question_before(q_index=3, interview_id=12345):
+    return str(voice._build_question(SNAPSHOT[q_index], q_index, len(SNAPSHOT))(str(interview_id)))
+
+def question_after(q_index=3, interview_id=12345):
+    key = (snapshot_hash(SNAPSHOT), q_index)
+    template = voice.question_twiml_cache.get_or_compile(key, voice._build_question(SNAPSHOT[q_index], q_index, len(SNAPSHOT)))
+    return fill(template, interview_id)
+
+CASES = {
+    "greeting (/call)": (lambda: str(voice._build_greeting("12345")), lambda: fill(voice.GREETING_TWIML, 12345)),
+    "question (/question)": (question_before, question_after),
+    "closing (/end)": (lambda: str(voice._build_closing("12345")), lambda: fill(voice.CLOSING_TWIML, 12345)),
+}
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{'webhook':<22} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for name, (before, after) in CASES.items():
+        assert before() == after()
+        t_before = min(timeit.repeat(before, number=n, repeat=3)) / n * 1e6
+        t_after = min(timeit.repeat(after, number=n, repeat=3)) / n * 1e6
+        print(f"{name:<22} {t_before:>10.1f} {t_after:>10.1f} {t_before / t_after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Concurrency benchmark: p99 /voice webhook latency with N simultaneous calls.
+
+Every simulated call walks the main Q&A (/voice/question then /voice/record
+for each question) against a throwaway SQLite DB in which each statement
+costs BENCH_DB_LATENCY_MS extra, standing in for a remote Postgres. Set
+BENCH_DATABASE_URL to run against a real (scratch!) database instead; SQLite
+serialises write transactions on its file lock, so /voice/record tails there
+say more about SQLite than about the handlers.
+
+"sync" runs the handlers as they were before the async port: async def
+endpoints on the blocking Session, so every query stalls the event loop.
+"async" runs the real voice router on AsyncSession. The call state cache is
+off by default so both modes do the same DB work per webhook (set
+CALL_STATE_CACHE=memory to see the cached path).
+
+Usage: python benchmarks/bench_voice_concurrency.py [calls] [questions]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("CALL_STATE_CACHE", "off")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_voice_'), 'bench.db')}"
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, Form, Query
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, create_engine
+
+from app.database import DATABASE_URL, async_engine, connect_args, create_db_and_tables, engine
+from app.models import Candidate, Interview, InterviewReview
+from app.routers import voice
+
+DB_LATENCY = float(os.environ.get("BENCH_DB_LATENCY_MS", "20")) / 1000
+
+def _statement_latency(statement: str):
+    # Not on COMMIT: SQLite holds its single writer lock there, which a
+    # real server doesn't, and concurrent writers would just queue behind it
+    if not statement.startswith(("COMMIT", "ROLLBACK", "BEGIN")):
+        time.sleep(DB_LATENCY)
+
+def _add_latency(dbapi_connection, connection_record):
+    if not DATABASE_URL.startswith("sqlite"):
+        return
+    # The trace callback runs inside sqlite3 itself: on the request thread for
+    # the sync engine, on aiosqlite's worker thread for the async one.
+    raw = getattr(getattr(dbapi_connection, "_connection", None), "_conn", dbapi_connection)
+    raw.set_trace_callback(_statement_latency)
+
+# Unpooled so the blocking path can't deadlock on pool checkout (a request
+# waiting for a connection on the event loop stops the teardown that would
+# free one); the comparison is about loop blocking, not pool size.
+legacy_engine = create_engine(DATABASE_URL, connect_args=connect_args, poolclass=NullPool)
+
+for e in (engine, legacy_engine, async_engine.sync_engine):
+    event.listen(e, "connect", _add_latency)
+
+def get_legacy_session():
+    with Session(legacy_engine) as session:
+        yield session
+
+# --- Pre-port handlers (blocking Session inside async def) ---
+legacy = APIRouter(prefix="/legacy")
+
+@legacy.post("/question")
+async def legacy_question(interview_id: int = Query(...), q_index: int = Query(...), session: Session = Depends(get_legacy_session)):
+    interview = session.get(Interview, interview_id)
+    snapshot = interview.session_snapshot
+    return voice._twiml(str(voice._build_question(snapshot[q_index], q_index, len(snapshot))(str(interview.id))))
+
+@legacy.post("/record")
+async def legacy_record(
+    interview_id: int = Query(...),
+    q_index: int = Query(...),
+    RecordingDuration: str = Form(None),
+    session: Session = Depends(get_legacy_session),
+):
+    interview = session.get(Interview, interview_id)
+    question = interview.session_snapshot[q_index]
+    session.add(InterviewReview(interview_id=interview.id, question_id=question["id"], question_text=question["text"], duration=int(RecordingDuration or 0)))
+    interview.last_completed_q_id = question["id"]
+    session.add(interview)
+    session.commit()
+    return voice._twiml("<Response/>")
+
+app = FastAPI()
+app.include_router(voice.router)
+app.include_router(legacy)
+
+def seed(calls: int, questions: int):
+    create_db_and_tables()
+    if DATABASE_URL.startswith("sqlite"):
+        with engine.connect() as conn:
+            # Closer to a server DB: readers don't queue behind the writer
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    snapshot = [{"id": i + 1, "text": f"質問{i + 1}を教えてください", "max_duration": 180} for i in range(questions)]
+    with Session(engine) as session:
+        ids = []
+        for n in range(calls):
+            candidate = Candidate(name=f"bench{n}", phone="+810000000000", email="bench@example.com", token=f"bench-{n}-{time.time_ns()}")
+            session.add(candidate)
+            session.flush()
+            interview = Interview(candidate_id=candidate.id, reservation_time=datetime.utcnow(), status="in_progress", current_stage="main_qa", session_snapshot=snapshot)
+            session.add(interview)
+            session.flush()
+            ids.append(interview.id)
+        session.commit()
+    return ids
+
+STEPS = (("question", None), ("record", {"RecordingDuration": "30"}))
+
+async def one_call(client: httpx.AsyncClient, prefix: str, interview_id: int, questions: int, latencies: dict):
+    for q in range(questions):
+        for step, data in STEPS:
+            started = time.perf_counter()
+            r = await client.post(f"{prefix}/{step}?interview_id={interview_id}&q_index={q}", data=data)
+            latencies[step].append(time.perf_counter() - started)
+            latencies["all"].append(latencies[step][-1])
+            r.raise_for_status()
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+async def run(prefix: str, ids, questions: int):
+    latencies = {"all": [], **{step: [] for step, _ in STEPS}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up connections / pools outside the measurement
+        await one_call(client, prefix, ids[0], 1, {"all": [], **{step: [] for step, _ in STEPS}})
+        started = time.perf_counter()
+        await asyncio.gather(*(one_call(client, prefix, i, questions, latencies) for i in ids[1:]))
+        elapsed = time.perf_counter() - started
+    return elapsed, {name: sorted(values) for name, values in latencies.items()}
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    ids = seed(calls + 1, questions)
+    latency = f"+{DB_LATENCY * 1000:.0f} ms per statement" if DATABASE_URL.startswith("sqlite") else DATABASE_URL.split("://")[0]
+    print(f"{calls} simultaneous calls x {questions} questions, {latency}, call state cache {os.environ['CALL_STATE_CACHE']}")
+
+    async def both():
+        for mode, prefix in (("sync", "/legacy"), ("async", "/voice")):
+            elapsed, latencies = await run(prefix, ids, questions)
+            print(f"{mode:>5}: {len(latencies['all'])} webhooks in {elapsed:.2f}s")
+            for name, values in latencies.items():
+                print(f"       {name:<9} p50 {percentile(values, 0.50):6.0f} ms  p99 {percentile(values, 0.99):6.0f} ms")
+
+    # One loop for both runs: the async engine's pool is bound to it
+    asyncio.run(both())
+
+if __name__ == "__main__":
+    main()
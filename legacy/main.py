@@ -3,14 +3,15 @@ import json
 import asyncio
 import websockets
 import time
-import audioop
-import base64
+import binascii
 import asyncio
 from datetime import datetime, timezone, timedelta
 from fastapi import FastAPI, WebSocket, Request, Response
 from fastapi.responses import HTMLResponse
 from twilio.twiml.voice_response import VoiceResponse, Connect
 from dotenv import load_dotenv
+from app.services.audio import EnergyVAD
+from app.services.stream_relay import parse_twilio, parse_openai, openai_append, TwilioMessages, PacedSender, upstream_queue, pump
 
 load_dotenv()
 
@@ -281,79 +282,67 @@ async def voice_stream(websocket: WebSocket):
             
             is_speaking = False
             last_speech_time = 0
-            consecutive_voice_count = 0  # 連続で閾値を超えた回数
+            # 連続検知・音量判定は EnergyVAD (audioop は Python 3.13 で削除)
+            vad = EnergyVAD(threshold=VOICE_THRESHOLD, onset=CONSECUTIVE_VOICE_REQUIRED, hangover=0)
             
             # AI発話中フラグ（割り込み音声はバッファに入れるが、commitはしない）
             ai_is_speaking = False
             latest_media_timestamp = 0
 
+            # Twilio -> OpenAI: 上限付きキュー経由で順番どおり送信（OpenAI が詰まったら Twilio の受信を待たせる）
+            upstream = upstream_queue()
+            # OpenAI -> Twilio: まとめて届く音声を実時間ペースで送信（start 受信時に作成）
+            paced = None
+
             async def receive_from_twilio():
-                nonlocal stream_sid
-                nonlocal is_speaking, last_speech_time, consecutive_voice_count
+                nonlocal stream_sid, paced
+                nonlocal is_speaking, last_speech_time
                 nonlocal ai_is_speaking, latest_media_timestamp
                 
                 try:
                     while True:
-                        data = await websocket.receive_text()
-                        msg = json.loads(data)
-                        
-                        event_type = msg.get("event")
+                        # media はJSONを解析せずペイロードだけ切り出す
+                        event_type, msg = parse_twilio(await websocket.receive_text())
                         
                         if event_type == "media":
-                            track = msg["media"].get("track")
-
-                            if track == "inbound":
-                                audio_payload = msg["media"]["payload"]
-                                
-                                # 常にバッファには送る（割り込み音声も記録するため）
-                                await openai_ws.send(json.dumps({
-                                    "type": "input_audio_buffer.append",
-                                    "audio": audio_payload
-                                }))
+                            audio_payload = msg
+                            
+                            # 常にバッファには送る（割り込み音声も記録するため）
+                            await upstream.put(openai_append(audio_payload))
+                            
+                            # --- 簡易VAD (音量検知) ---
+                            try:
+                                chunk = binascii.a2b_base64(audio_payload)
                                 
-                                # --- 簡易VAD (音量検知) ---
-                                try:
-                                    chunk = base64.b64decode(audio_payload)
-                                    pcm_chunk = audioop.ulaw2lin(chunk, 2)
-                                    rms = audioop.rms(pcm_chunk, 2)
-                                    
-                                    if rms > VOICE_THRESHOLD:
-                                        # 連続検知カウンターを増やす
-                                        consecutive_voice_count += 1
-                                        
-                                        # 連続で規定回数以上検知したら発話開始
-                                        if consecutive_voice_count >= CONSECUTIVE_VOICE_REQUIRED:
-                                            if not is_speaking:
-                                                print(f"[VAD] Speech Detected (RMS: {rms}, consecutive: {consecutive_voice_count})")
-                                                is_speaking = True
-                                            last_speech_time = time.time() * 1000
-                                    else:
-                                        # 静寂：カウンターをリセット
-                                        consecutive_voice_count = 0
-                                        
-                                        if is_speaking:
-                                            # 話し終わったかも判定
-                                            silence_duration = (time.time() * 1000) - last_speech_time
-                                            if silence_duration > SILENCE_DURATION_MS:
-                                                print(f"[VAD] Silence detected ({silence_duration}ms) -> Committing")
-                                                is_speaking = False
-                                                
-                                                # AI発話中でなければコミット＆レスポンス生成
-                                                if not ai_is_speaking:
-                                                    await openai_ws.send(json.dumps({"type": "input_audio_buffer.commit"}))
-                                                    await openai_ws.send(json.dumps({"type": "response.create"}))
-                                                else:
-                                                    print("[VAD] AI is speaking, buffering user input for later")
-                                                
-                                except Exception as e:
-                                    pass
-
-                            else:
+                                # 連続で規定回数以上検知したら発話開始
+                                if vad.push(chunk):
+                                    if not is_speaking:
+                                        print(f"[VAD] Speech Detected (RMS: {vad.rms:.0f}, consecutive: {vad.run})")
+                                        is_speaking = True
+                                    last_speech_time = time.time() * 1000
+                                elif vad.run == 0:
+                                    # 静寂
+                                    if is_speaking:
+                                        # 話し終わったかも判定
+                                        silence_duration = (time.time() * 1000) - last_speech_time
+                                        if silence_duration > SILENCE_DURATION_MS:
+                                            print(f"[VAD] Silence detected ({silence_duration}ms) -> Committing")
+                                            is_speaking = False
+                                            
+                                            # AI発話中でなければコミット＆レスポンス生成（append と同じキューで順序を保つ）
+                                            if not ai_is_speaking:
+                                                await upstream.put('{"type":"input_audio_buffer.commit"}')
+                                                await upstream.put('{"type":"response.create"}')
+                                            else:
+                                                print("[VAD] AI is speaking, buffering user input for later")
+                                            
+                            except Exception as e:
                                 pass
                         
                         elif event_type == "start":
                             stream_sid = msg["start"]["streamSid"]
                             print(f"[INFO] Stream started: {stream_sid}")
+                            paced = PacedSender(websocket.send_text, TwilioMessages(stream_sid))
                         
                         elif event_type == "stop":
                             print("[INFO] Stream stopped")
@@ -363,6 +352,8 @@ async def voice_stream(websocket: WebSocket):
                     print(f"[ERROR] Twilio receive error: {e}")
                     import traceback
                     print(f"[ERROR] Traceback: {traceback.format_exc()}")
+                finally:
+                    await upstream.put(None)  # 送信側を終了
 
             async def receive_from_openai():
                 nonlocal stream_sid
@@ -373,20 +364,15 @@ async def voice_stream(websocket: WebSocket):
                 
                 try:
                     while True:
-                        data = await openai_ws.recv()
-                        msg = json.loads(data)
-                        event_type = msg.get("type")
+                        # 音声 delta はJSONを解析せず base64 部分だけ切り出す
+                        event_type, msg = parse_openai(await openai_ws.recv())
 
                         if event_type == "response.audio.delta":
                             ai_is_speaking = True
                             latest_media_timestamp = time.time() * 1000
-                            audio_delta = msg.get("delta")
-                            if audio_delta and stream_sid:
-                                await websocket.send_json({
-                                    "event": "media",
-                                    "streamSid": stream_sid,
-                                    "media": {"payload": audio_delta}
-                                })
+                            audio_delta = msg
+                            if audio_delta and paced:
+                                await paced.write_b64(audio_delta)
                         
                         elif event_type == "response.audio.done":
                             ai_is_speaking = False
@@ -395,6 +381,8 @@ async def voice_stream(websocket: WebSocket):
                             # 通話終了が要求されていたら、話し終わった後に切断
                             if call_end_requested:
                                 print("[INFO] Closing call after AI finished goodbye")
+                                if paced:
+                                    await paced.drain()  # 送信待ちの音声を流し切る
                                 await asyncio.sleep(1)  # 念のため1秒待つ
                                 await websocket.close()
                                 break
@@ -594,7 +582,11 @@ async def voice_stream(websocket: WebSocket):
                     import traceback
                     print(f"[ERROR] Traceback: {traceback.format_exc()}")
 
-            await asyncio.gather(receive_from_twilio(), receive_from_openai())
+            try:
+                await asyncio.gather(receive_from_twilio(), receive_from_openai(), pump(upstream, openai_ws.send))
+            finally:
+                if paced:
+                    paced.clear()
 
     except Exception as e:
         print(f"[CRITICAL] WebSocket Connection Failed: {e}")
@@ -0,0 +1,24 @@
+"""
+Standalone STT worker: transcribes queued interview answers (stt_jobs).
+
+Run as many as needed next to the web process (Procfile `worker:`); each
+runs STT_WORKERS jobs at a time. Set STT_WORKER_IN_WEB=off on the web
+process when a separate worker is running.
+
+Usage: python stt_worker.py
+"""
+import signal
+import threading
+
+from app.database import create_db_and_tables
+from app.services.stt_queue import stt_workers
+
+if __name__ == "__main__":
+    create_db_and_tables()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set()) # redeploy
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stt_workers.start()
+    stop.wait()
+    print("[INFO] STT worker stopping...")
+    stt_workers.stop()
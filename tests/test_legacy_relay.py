@@ -0,0 +1,83 @@
+"""
+Relay test for legacy/main.py: once Twilio's "start" event has arrived,
+audio deltas from OpenAI must be forwarded to Twilio as media messages.
+
+Usage: python -m pytest tests/test_legacy_relay.py
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("websockets") # legacy/main.py's own dependency, not in requirements.txt
+import legacy.main as relay
+
+STREAM_SID = "MZ-test"
+
+class FakeTwilio:
+    def __init__(self):
+        self.sent = []
+        self.started = asyncio.Event()
+        self.media_sent = asyncio.Event()
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        self.received += 1
+        if self.received == 1:
+            return json.dumps({"event": "start", "start": {"streamSid": STREAM_SID}})
+        # The start event has been handled by now
+        self.started.set()
+        await self.media_sent.wait()
+        return json.dumps({"event": "stop"})
+
+    async def send_text(self, text):
+        self.sent.append(text)
+        if '"media"' in text:
+            self.media_sent.set()
+
+    async def close(self):
+        pass
+
+class FakeOpenAI:
+    def __init__(self, twilio):
+        self.twilio = twilio
+        self.sent = []
+        self.delivered = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def recv(self):
+        if self.delivered:
+            await self.twilio.media_sent.wait()
+            raise ConnectionError("closed")
+        await self.twilio.started.wait()
+        self.delivered = True
+        delta = base64.b64encode(b"\xff" * 1600).decode()
+        return json.dumps({"type": "response.audio.delta", "delta": delta})
+
+def test_openai_audio_reaches_twilio(monkeypatch):
+    async def run():
+        twilio = FakeTwilio()
+        monkeypatch.setattr(relay.websockets, "connect", lambda *args, **kwargs: FakeOpenAI(twilio))
+        await asyncio.wait_for(relay.voice_stream(twilio), timeout=5)
+        return twilio
+
+    twilio = asyncio.run(run())
+    media = [json.loads(text) for text in twilio.sent if '"media"' in text]
+    assert media, "no AI audio was forwarded to Twilio"
+    assert media[0]["streamSid"] == STREAM_SID